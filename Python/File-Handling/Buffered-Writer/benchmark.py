@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Compares VectorWriter (source.py) with the ways of writing lines shown in
+../Write-File:
+
+    write           for line in lines: f.write(line)
+    writelines      f.writelines(lines)
+    join            f.write("".join(lines))   - one huge str, then one write
+    vector-write    for line in lines: out.write(line)
+    vector-lines    out.writelines(lines)
+
+Every method writes the same short lines to a file in the temp directory.
+The best of --repeat runs is reported, together with the number of write
+system calls it made (read from /proc/self/io on Linux).
+
+Usage:
+    python benchmark.py                     # 10 million lines
+    python benchmark.py --lines 1000000 --repeat 5
+    python benchmark.py --methods write vector-lines --dir /mnt/data
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from source import VectorWriter
+
+METHODS = ("write", "writelines", "join", "vector-write", "vector-lines")
+
+
+def run_method(method, path, lines):
+    if method == "write":
+        with open(path, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line)
+    elif method == "writelines":
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+    elif method == "join":
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("".join(lines))
+    elif method == "vector-write":
+        with VectorWriter(path) as out:
+            for line in lines:
+                out.write(line)
+    elif method == "vector-lines":
+        with VectorWriter(path) as out:
+            out.writelines(lines)
+    else:
+        raise ValueError(f"unknown method {method!r}")
+
+
+def write_syscalls():
+    """The number of write system calls this process has made, or None."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("syscw:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark VectorWriter against the Write-File methods.")
+    parser.add_argument("--lines", type=int, default=10_000_000, help="number of lines (default: 10 million)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method; the best is reported (default: 3)")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--dir", help="directory for the output file (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    print(f"Creating {args.lines} lines ...")
+    lines = [f"2024-05-01 12:00:00 id={i} status=ok\n" for i in range(args.lines)]
+    fd, path = tempfile.mkstemp(prefix="writer-benchmark-", suffix=".txt", dir=args.dir)
+    os.close(fd)
+
+    try:
+        print(f"{'method':<13} {'seconds':>8} {'M lines/s':>10} {'MB/s':>7} {'syscalls':>9}")
+        for method in args.methods:
+            best = None
+            for _ in range(args.repeat):
+                before = write_syscalls()
+                start = time.perf_counter()
+                run_method(method, path, lines)
+                elapsed = time.perf_counter() - start
+                after = write_syscalls()
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, None if before is None else after - before)
+            elapsed, syscalls = best
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            print(f"{method:<13} {elapsed:>8.2f} {args.lines / elapsed / 1e6:>10.1f} "
+                  f"{size_mb / elapsed:>7.0f} {'-' if syscalls is None else syscalls:>9}")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Writing millions of short lines fast: batching writes and flushing them with
+os.writev().
+
+Write-File (see ../Write-File) calls file.write() once per line. A job that
+emits tens of millions of short lines pays for that call tens of millions of
+times, and file.writelines() is no better: it still calls write() for every
+item. The file object then copies the bytes into an 8 KiB buffer and makes
+one system call per 8 KiB.
+
+VectorWriter does as little as possible per line and the rest per batch:
+- writelines() takes whole slices of the input without a Python call per
+  line. This is the fast path. (write() also just appends to a list, but a
+  method written in Python costs more per call than file.write(), which is
+  written in C: a write() loop is about 2.5x slower than with a file object.
+  Use it for occasional lines, and writelines() for many.)
+- every `segment_size` lines (or sooner, once `buffer_size` bytes are
+  pending) the list is joined and encoded in one go, giving one large bytes
+  segment;
+- every `buffer_size` bytes all segments are handed to the operating system
+  with a single os.writev() system call, without joining them first.
+
+Nothing reaches the file before a flush point: a full buffer, flush(), or
+close(). Call flush() wherever the data has to be on disk (or visible to
+another process), e.g. after every finished record batch.
+
+This script demonstrates:
+1.  Writing lines with VectorWriter and explicit flush points.
+2.  How few system calls it takes.
+3.  A quick comparison with file.write() and file.writelines() (benchmark.py
+    has the full one).
+"""
+
+import io
+import itertools
+import os
+import time
+
+DEFAULT_BUFFER_SIZE = 1 << 20  # bytes handed to one os.writev() call
+DEFAULT_SEGMENT_SIZE = 4096  # write() calls joined and encoded at a time
+
+# os.writev() accepts at most IOV_MAX buffers per call (1024 on Linux).
+try:
+    IOV_MAX = os.sysconf("SC_IOV_MAX")
+except (AttributeError, ValueError, OSError):
+    IOV_MAX = 1024
+if IOV_MAX <= 0:
+    IOV_MAX = 1024
+
+_OPEN_FLAGS = {
+    "w": os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+    "a": os.O_WRONLY | os.O_CREAT | os.O_APPEND,
+    "x": os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+}
+
+
+class VectorWriter:
+    """
+    A file writer that batches small writes and flushes them with os.writev().
+
+    Args:
+        path (str): The file to write.
+        mode (str): 'w' (overwrite), 'a' (append) or 'x' (create, fail if it
+            exists), optionally with 'b' to write bytes instead of str.
+        encoding (str): Used to encode str in text mode.
+        buffer_size (int): Bytes collected before they are written out.
+            Pieces not yet encoded are counted by their length, so in text
+            mode this counts characters until they are encoded.
+        segment_size (int): The most write() calls (or writelines() items)
+            joined into one segment; a segment also ends when the buffer
+            is full.
+
+    Attributes:
+        syscalls (int): How many write system calls were made so far.
+        bytes_written (int): How many bytes reached the file so far.
+
+    Usage:
+        with VectorWriter('out.txt') as out:
+            for record in records:
+                out.writelines(format_lines(record))
+            out.flush()  # explicit flush point
+    """
+
+    def __init__(self, path, mode="w", encoding="utf-8",
+                 buffer_size=DEFAULT_BUFFER_SIZE, segment_size=DEFAULT_SEGMENT_SIZE):
+        base = mode.replace("b", "")
+        if base not in _OPEN_FLAGS or mode.count("b") > 1:
+            raise ValueError(f"invalid mode {mode!r}: expected 'w', 'a' or 'x', optionally with 'b'")
+        if buffer_size <= 0 or segment_size <= 0:
+            raise ValueError("buffer_size and segment_size must be positive")
+        self.path = path
+        self.binary = "b" in mode
+        self.encoding = encoding
+        self.buffer_size = buffer_size
+        self.segment_size = segment_size
+        self.syscalls = 0
+        self.bytes_written = 0
+        self._pending = []  # str (or bytes) not yet joined into a segment
+        self._lines_per_batch = 1  # writelines(): learned from the line lengths seen so far
+        self._room = buffer_size  # bytes until the buffer is full, less the pending pieces' lengths
+        self._segments = []  # encoded segments waiting for writev()
+        self._buffered = 0
+        self._fd = os.open(path, _OPEN_FLAGS[base] | getattr(os, "O_BINARY", 0), 0o666)
+
+    @property
+    def closed(self):
+        return self._fd is None
+
+    # --- Writing ---
+
+    def write(self, data):
+        """
+        Buffers `data` (str, or bytes in 'b' mode).
+
+        For many lines, writelines() is much faster: each write() call is a
+        Python method call.
+        """
+        if self._fd is None:
+            raise ValueError("I/O operation on closed file")
+        pending = self._pending
+        pending.append(data)
+        self._room -= len(data)
+        if self._room <= 0 or len(pending) >= self.segment_size:
+            self._seal()
+
+    def writelines(self, lines):
+        """
+        Buffers every item of `lines`; like file.writelines(), adds no newlines.
+
+        The lines are joined segment_size at a time without a Python call per
+        line, which makes this the fastest way to write many lines at once.
+        Long lines make the batches smaller, so that a batch stays within
+        about buffer_size.
+        """
+        if self._fd is None:
+            raise ValueError("I/O operation on closed file")
+        self._seal()  # keep the order of earlier write() calls
+        lines = iter(lines)
+        while True:
+            batch = list(itertools.islice(lines, self._lines_per_batch))
+            if not batch:
+                break
+            self._pending = batch
+            size = self._seal()
+            # As many lines as fit in the buffer at this batch's average length.
+            self._lines_per_batch = max(1, min(self.segment_size, self.buffer_size * len(batch) // max(size, 1)))
+
+    def _seal(self):
+        """Joins and encodes the pending pieces into one segment; returns its size."""
+        if self._fd is None:
+            raise ValueError("I/O operation on closed file")
+        if not self._pending:
+            return 0
+        if self.binary:
+            segment = b"".join(self._pending)
+        else:
+            segment = "".join(self._pending).encode(self.encoding)
+        self._pending = []
+        self._segments.append(segment)
+        self._buffered += len(segment)
+        self._room = self.buffer_size - self._buffered
+        if self._buffered >= self.buffer_size:
+            self._write_segments()
+        return len(segment)
+
+    def _write_segments(self):
+        """Hands every buffered segment to the OS, IOV_MAX buffers per call."""
+        segments = self._segments
+        while segments:
+            batch = segments[:IOV_MAX]
+            if hasattr(os, "writev"):
+                written = os.writev(self._fd, batch)
+            else:  # Windows has no writev(): one joined write instead
+                written = os.write(self._fd, b"".join(batch))
+            self.syscalls += 1
+            self.bytes_written += written
+            # A write may be partial (e.g. a full disk or a signal): drop what
+            # was written and keep the rest, possibly part of a segment.
+            done = 0
+            for segment in batch:
+                if written < len(segment):
+                    break
+                written -= len(segment)
+                done += 1
+            del segments[:done]
+            if written:
+                segments[0] = memoryview(segments[0])[written:]
+        self._buffered = 0
+        self._room = self.buffer_size
+
+    def flush(self):
+        """A flush point: everything written so far is passed to the OS."""
+        self._seal()
+        self._write_segments()
+
+    def fsync(self):
+        """Flushes, then waits until the OS has put the data on disk."""
+        self.flush()
+        os.fsync(self._fd)
+
+    # --- Closing ---
+
+    def close(self):
+        if self._fd is None:
+            return
+        try:
+            self.flush()
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    filename = "output.txt"
+
+    # --- 1. Writing with explicit flush points ---
+    print("--- 1. Writing lines ---")
+    with VectorWriter(filename) as out:
+        out.write("Hello from VectorWriter!\n")
+        out.writelines(["Line two.\n", "Line three: naïve café ☕\n"])
+        print(f"Before flush(): {os.path.getsize(filename)} bytes in the file")
+        out.flush()
+        print(f"After flush():  {os.path.getsize(filename)} bytes in the file")
+        out.write("This line is written by close().\n")
+    with open(filename, "r", encoding="utf-8") as f:
+        print(f.read(), end="")
+
+    # Appending works like open(..., 'a').
+    with VectorWriter(filename, "a") as out:
+        out.write("Appended line.\n")
+    with open(filename, "r", encoding="utf-8") as f:
+        print(f"Line count after appending: {len(f.readlines())}")
+
+    # --- 2. System calls ---
+    print("\n--- 2. System calls ---")
+    line_total = 500_000
+    with VectorWriter(filename, buffer_size=1 << 20) as out:
+        out.writelines(f"event {i} status=ok\n" for i in range(line_total))
+    size = os.path.getsize(filename)
+    print(f"{line_total} lines, {size / 1e6:.1f} MB: {out.syscalls} writev() calls "
+          f"(one per {out.bytes_written // out.syscalls // 1024} KiB)")
+    print(f"A file object with its default buffer makes about {size // io.DEFAULT_BUFFER_SIZE} write() calls for the same data.")
+
+    # --- 3. Compared with a file object ---
+    print("\n--- 3. file.write() / file.writelines() vs. VectorWriter ---")
+    lines = [f"event {i} status=ok\n" for i in range(line_total)]
+
+    def write_per_line():
+        with open(filename, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line)
+
+    def file_writelines():
+        with open(filename, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+
+    def vector_writelines():
+        with VectorWriter(filename) as out:
+            out.writelines(lines)
+
+    for label, write_all in [("file.write() per line", write_per_line),
+                             ("file.writelines()", file_writelines),
+                             ("VectorWriter.writelines()", vector_writelines)]:
+        # Best of three, so the first method doesn't pay for warming up.
+        timings = []
+        for _ in range(3):
+            start = time.perf_counter()
+            write_all()
+            timings.append(time.perf_counter() - start)
+        print(f"{label + ':':<27} {min(timings):.3f}s")
+
+    # --- Clean up ---
+    os.remove(filename)
+    print(f"\nRemoved '{filename}'.")
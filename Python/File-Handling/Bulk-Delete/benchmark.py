@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Compares ways of deleting a large tree of small files:
+
+    exists-remove   os.walk(), then exists() + remove() per file (Delete-File)
+    rmtree          shutil.rmtree()
+    delete-tree     delete_tree() from source.py, once per --workers value
+
+Before every method the same tree is created again: --files files spread
+over directories of --per-directory files each. Creating the tree takes
+longer than deleting it, so start small.
+
+Usage:
+    python benchmark.py                           # 200,000 files
+    python benchmark.py --files 1000000 --workers 1 8 32
+    python benchmark.py --dir /mnt/nfs/scratch    # where deleting is slow
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from source import delete_tree, delete_with_exists_check, make_tree
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark deleting a large tree of small files.")
+    parser.add_argument("--files", type=int, default=200_000, help="number of files (default: 200000)")
+    parser.add_argument("--per-directory", type=int, default=1000, help="files per directory (default: 1000)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64],
+                        help="thread counts for delete-tree (default: 1 4 16 64)")
+    parser.add_argument("--skip", nargs="+", choices=("exists-remove", "rmtree"), default=[],
+                        help="leave out these methods")
+    parser.add_argument("--dir", help="where to create the tree (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    methods = []
+    if "exists-remove" not in args.skip:
+        methods.append(("exists-remove", delete_with_exists_check))
+    if "rmtree" not in args.skip:
+        methods.append(("rmtree", shutil.rmtree))
+    for workers in args.workers:
+        methods.append((f"delete-tree x{workers}", lambda root, workers=workers: delete_tree(root, workers)))
+
+    parent = tempfile.mkdtemp(prefix="delete-benchmark-", dir=args.dir)
+    root = os.path.join(parent, "tree")
+    try:
+        print(f"{args.files} files, {args.per_directory} per directory, in {parent}")
+        print(f"{'method':<18} {'seconds':>8} {'files/s':>10}")
+        for label, delete in methods:
+            make_tree(root, args.files, args.per_directory)
+            start = time.perf_counter()
+            report = delete(root)
+            elapsed = time.perf_counter() - start
+            note = ""
+            if report is not None and report.failed:
+                note = f"  ({report.failed} failed: {dict(report.failures)})"
+            print(f"{label:<18} {elapsed:>8.2f} {args.files / elapsed:>10,.0f}{note}")
+    finally:
+        shutil.rmtree(parent, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Reads a multi-member gzip file line by line:
+
+    gzip.open       the standard library, one core
+    parallel xN     ParallelGzipReader from source.py with N processes,
+                    as used by open_compressed(workers=N)
+
+The file is written once with write_multi_member() (--megabytes of log
+lines, in members of --member-size bytes). Every method must produce the
+same lines in the same order. With --binary the data is read in 1 MiB
+blocks instead of lines, which shows the decompression alone.
+
+Parallel decompression needs several CPU cores: on one core the processes
+take turns, and sending the data between processes only adds work.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --megabytes 1000 --workers 2 4 8 16
+    python benchmark.py --binary
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from source import MEMBER_SIZE, ParallelGzipReader, write_multi_member
+
+
+def log_lines(megabytes):
+    size, i = 0, 0
+    while size < megabytes * 1e6:
+        line = f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO user={i % 9973} action=view item={i}\n"
+        size += len(line)
+        i += 1
+        yield line
+
+
+def consume(f, binary):
+    """Reads `f` to the end; returns (lines or blocks, a digest of the content)."""
+    digest = hashlib.blake2b()
+    count = 0
+    if binary:
+        while block := f.read(1 << 20):
+            digest.update(block)
+            count += 1
+    else:
+        for line in f:
+            count += 1
+            if count % 1000 == 0:
+                digest.update(line.encode("utf-8"))
+    return count, digest.hexdigest()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parallel multi-member gzip reading.")
+    parser.add_argument("--megabytes", type=int, default=300, help="uncompressed size (default: 300)")
+    parser.add_argument("--member-size", type=int, default=MEMBER_SIZE, help="bytes per member (default: 1 MiB)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4],
+                        help="process counts for the parallel reader (default: 1 2 4)")
+    parser.add_argument("--binary", action="store_true", help="read 1 MiB blocks instead of lines")
+    parser.add_argument("--dir", help="where to create the file (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="gzip-benchmark-", dir=args.dir)
+    path = os.path.join(directory, "data.gz")
+    try:
+        write_multi_member(path, log_lines(args.megabytes), args.member_size)
+        print(f"{args.megabytes} MB in members of {args.member_size:,} bytes, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB compressed, {os.cpu_count()} CPUs")
+        print(f"{'method':<14} {'seconds':>8} {'MB/s':>8}")
+
+        def parallel(workers):
+            raw = io.BufferedReader(ParallelGzipReader(path, workers), buffer_size=1 << 20)
+            return raw if args.binary else io.TextIOWrapper(raw, encoding="utf-8")
+
+        def serial():
+            return gzip.open(path, "rb") if args.binary else gzip.open(path, "rt", encoding="utf-8")
+
+        methods = [("gzip.open", serial)]
+        for workers in args.workers:
+            methods.append((f"parallel x{workers}", lambda workers=workers: parallel(workers)))
+        reference = None
+        for label, opener in methods:
+            start = time.perf_counter()
+            with opener() as f:
+                result = consume(f, args.binary)
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = result
+            elif result != reference:
+                print(f"{label}: different content", file=sys.stderr)
+                return 1
+            print(f"{label:<14} {elapsed:>8.2f} {args.megabytes / elapsed:>8.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Reading gzip, bz2 and xz files like plain text files, and gzip in parallel.
+
+Read-File (see ../Read-File) opens text files with open(). Data often
+arrives compressed instead, and then every reader has to know which of
+gzip.open(), bz2.open() or lzma.open() to call. The file name isn't a
+reliable hint (.gz, .gzip, .tgz, or no extension at all), but the first
+bytes are: every format starts with its own "magic number".
+
+open_compressed() looks at those bytes and returns a file that iterates
+over lines like open() does, whatever the format.
+
+gzip is decompressed by one CPU core, and for large inputs that is often
+the slowest step. A gzip file may consist of several "members" - complete
+gzip streams one after another, as produced by `cat a.gz b.gz`, by bgzip,
+or by write_multi_member() below. Members can be decompressed independently,
+so for such files open_compressed() splits the file into byte ranges,
+decompresses the members of each range in a separate process, and puts the
+results back together in the original order.
+
+This script demonstrates:
+1.  Detecting the format by its magic bytes, and reading every format the same way.
+2.  Decompressing a multi-member gzip file in parallel, in order.
+3.  Single-member files, which are decompressed the normal way.
+
+A benchmark is in benchmark.py.
+"""
+
+import bz2
+import collections
+import gzip
+import io
+import lzma
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 8 << 20  # compressed bytes per parallel task
+MEMBER_SIZE = 1 << 20  # uncompressed bytes per member written by write_multi_member()
+_READ_SIZE = 1 << 20
+
+# The first bytes of each format. bz2 adds the block size, '1' to '9'.
+_MAGIC = (
+    (b"\x1f\x8b", "gzip"),
+    (b"\xfd7zXZ\x00", "lzma"),  # .xz
+    (b"\x5d\x00\x00", "lzma"),  # the older .lzma format
+) + tuple((b"BZh%d" % level, "bz2") for level in range(1, 10))
+_OPENERS = {"gzip": gzip.open, "bz2": bz2.open, "lzma": lzma.open}
+_GZIP_MEMBER_START = b"\x1f\x8b\x08"  # magic + 'deflate', the only method in use
+
+
+def detect(path):
+    """Returns 'gzip', 'bz2', 'lzma', or None for a file that isn't compressed."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, name in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+# --- Parallel gzip ---
+
+def _members_from(f, offset, stop):
+    """
+    Decompresses the gzip members that start at `offset` and before `stop`.
+
+    The last one may end after `stop`. Returns (list of data, where the last
+    member ends). zlib checks every member's CRC and length.
+    """
+    f.seek(offset)
+    parts = []
+    position = offset
+    data = b""
+    while position < stop:
+        decompressor = zlib.decompressobj(wbits=31)  # 31: expect a gzip header
+        while not decompressor.eof:
+            if not data:
+                data = f.read(_READ_SIZE)
+                if not data:
+                    raise EOFError("compressed file ended before the end-of-stream marker was reached")
+            parts.append(decompressor.decompress(data))
+            position += len(data) - len(decompressor.unused_data)
+            data = decompressor.unused_data
+        if not data:
+            data = f.read(_READ_SIZE)
+            if not data:
+                break  # the end of the file
+        if not data.startswith(_GZIP_MEMBER_START[:2]):
+            raise gzip.BadGzipFile(f"not a gzip member at byte {position}")
+    return parts, position
+
+
+def _candidates(f, start, stop):
+    """Yields the offsets in [start, stop) where a gzip member could start."""
+    offset = start
+    while offset < stop:
+        f.seek(offset)
+        block = f.read(min(_READ_SIZE, stop - offset) + len(_GZIP_MEMBER_START) - 1)
+        found = block.find(_GZIP_MEMBER_START)
+        while found >= 0 and offset + found < stop:
+            yield offset + found
+            found = block.find(_GZIP_MEMBER_START, found + 1)
+        offset += _READ_SIZE
+
+
+def _decompress_range(path, start, stop, known_start):
+    """
+    Worker: decompresses the members that start in the byte range [start, stop).
+
+    Unless `known_start`, we don't know where the first member in the range
+    begins. We try every place where the gzip magic appears until one
+    decompresses without errors - the CRC check makes a false match fail.
+
+    Returns:
+        tuple: (where the first member starts or None, where the last one
+        ends, the decompressed bytes).
+    """
+    with open(path, "rb") as f:
+        if known_start:
+            parts, end = _members_from(f, start, stop)
+            return start, end, b"".join(parts)
+        for candidate in _candidates(f, start, stop):
+            try:
+                parts, end = _members_from(f, candidate, stop)
+            except (zlib.error, EOFError, gzip.BadGzipFile):
+                continue
+            return candidate, end, b"".join(parts)
+    return None, None, b""
+
+
+class ParallelGzipReader(io.RawIOBase):
+    """
+    Reads a multi-member gzip file, decompressing byte ranges in a process pool.
+
+    The data comes out in the original order. Files whose first member is
+    larger than `chunk_size` (single-member files, like those of gzip and
+    pigz) are decompressed the normal way, by gzip.GzipFile.
+
+    Args:
+        path (str): The gzip file.
+        workers (int | None): Processes; defaults to the number of CPUs.
+        chunk_size (int): Compressed bytes per task.
+
+    Usage:
+        with io.TextIOWrapper(io.BufferedReader(ParallelGzipReader('big.gz'))) as f:
+            for line in f:
+                ...
+    Or simply: open_compressed('big.gz', workers=8).
+    """
+
+    def __init__(self, path, workers=None, chunk_size=CHUNK_SIZE):
+        super().__init__()
+        self.name = path
+        self._path = path
+        self._size = os.path.getsize(path)
+        self._workers = workers or os.cpu_count() or 1
+        self._chunk_size = chunk_size
+        self._file = open(path, "rb")
+        self._pool = None
+        self._tasks = collections.deque()
+        self._serial = None  # gzip.GzipFile when we don't decompress in parallel
+        self._buffer = b""
+        self._pos = 0
+        self.fallbacks = 0
+
+        # Look at the first member. If it ends within the first chunk, the
+        # file is made of small members and worth splitting.
+        data = self._file.read(chunk_size)
+        decompressor = zlib.decompressobj(wbits=31)
+        first = decompressor.decompress(data)
+        if not decompressor.eof:
+            self._file.seek(0)
+            self._serial = gzip.GzipFile(fileobj=self._file)
+            return
+        self._buffer = first
+        self._expected = len(data) - len(decompressor.unused_data)  # where the next member starts
+        self._ranges = iter([(start, min(start + chunk_size, self._size))
+                             for start in range(self._expected, self._size, chunk_size)])
+        self._known_start = True  # the first range starts where the first member ended
+        self._pool = ProcessPoolExecutor(max_workers=self._workers)
+
+    @property
+    def parallel(self):
+        return self._serial is None
+
+    def readable(self):
+        return True
+
+    def _submit(self):
+        # Only a few ranges ahead: their results wait in memory until read.
+        while len(self._tasks) < self._workers * 2:
+            bounds = next(self._ranges, None)
+            if bounds is None:
+                return
+            self._tasks.append(self._pool.submit(_decompress_range, self._path, *bounds, self._known_start))
+            self._known_start = False
+
+    def _next_chunk(self):
+        """Moves on to the next range's data; returns False at the end."""
+        self._submit()
+        if not self._tasks:
+            if self._expected < self._size:
+                raise gzip.BadGzipFile(f"not a gzip member at byte {self._expected}")
+            return False
+        start, end, data = self._tasks.popleft().result()
+        if start is None:
+            return True  # no member starts in this range: the previous one covered it
+        if start != self._expected:
+            # A worker found a valid member inside another member (e.g. a .gz
+            # file stored in a .gz file). Continue from the last real boundary
+            # the normal way.
+            self._fall_back()
+            return True
+        self._buffer, self._pos, self._expected = data, 0, end
+        return True
+
+    def _fall_back(self):
+        self.fallbacks += 1
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        self._file.seek(self._expected)
+        self._serial = gzip.GzipFile(fileobj=self._file)
+
+    def readinto(self, buffer):
+        while self._serial is None and self._pos >= len(self._buffer):
+            if not self._next_chunk():
+                return 0
+        if self._serial is not None and self._pos >= len(self._buffer):
+            return self._serial.readinto(buffer)
+        n = min(len(buffer), len(self._buffer) - self._pos)
+        buffer[:n] = self._buffer[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+            if self._serial is not None:
+                self._serial.close()
+            self._file.close()
+        super().close()
+
+
+def open_compressed(path, mode="rt", encoding=None, errors=None, newline=None, workers=1):
+    """
+    Opens a file for reading, decompressing it if it is gzip, bz2 or xz.
+
+    Args:
+        path (str): The file.
+        mode (str): 'rt' (text, the default) or 'rb' (bytes).
+        encoding, errors, newline: As for open(), in text mode.
+        workers (int | None): Processes for multi-member gzip files. 1
+            decompresses in this process; None uses one per CPU.
+
+    Returns:
+        A file object: `for line in f` works the same for every format.
+
+    Usage:
+        with open_compressed('events.log.gz', encoding='utf-8') as f:
+            for line in f:
+                ...
+    """
+    if mode not in ("r", "rt", "rb"):
+        raise ValueError(f"open_compressed() only reads: mode {mode!r}")
+    binary = mode == "rb"
+    kind = detect(path)
+    if kind is None:
+        if binary:
+            return open(path, "rb")
+        return open(path, "r", encoding=encoding, errors=errors, newline=newline)
+    if kind == "gzip" and workers != 1:
+        raw = io.BufferedReader(ParallelGzipReader(path, workers), buffer_size=_READ_SIZE)
+        if binary:
+            return raw
+        return io.TextIOWrapper(raw, encoding=encoding, errors=errors, newline=newline)
+    if binary:
+        return _OPENERS[kind](path, "rb")
+    return _OPENERS[kind](path, "rt", encoding=encoding, errors=errors, newline=newline)
+
+
+def write_multi_member(path, lines, member_size=MEMBER_SIZE, encoding="utf-8", compresslevel=6):
+    """
+    Writes `lines` as a gzip file of independent members of about `member_size` bytes.
+
+    Any gzip reader reads it like a normal gzip file; open_compressed() can
+    decompress its members in parallel. The file is a few percent bigger,
+    because every member starts compressing from scratch.
+    """
+    with open(path, "wb") as f:
+        batch, size = [], 0
+        for line in lines:
+            data = line.encode(encoding)
+            batch.append(data)
+            size += len(data)
+            if size >= member_size:
+                f.write(gzip.compress(b"".join(batch), compresslevel))
+                batch, size = [], 0
+        if batch:
+            f.write(gzip.compress(b"".join(batch), compresslevel))
+
+
+if __name__ == "__main__":
+    import time
+
+    sample_lines = [f"Line {i}: héllo from a compressed file\n" for i in range(10_000)]
+    text = "".join(sample_lines)
+
+    # --- 1. Any format ---
+    print("--- 1. Detecting the format ---")
+    files = {"sample.txt": None, "sample.txt.gz": gzip.open,
+             "sample.txt.bz2": bz2.open, "sample.xz": lzma.open,  # the name doesn't matter
+             "sample.data": gzip.open}
+    for name, opener in files.items():
+        with (opener(name, "wt", encoding="utf-8") if opener else open(name, "w", encoding="utf-8")) as f:
+            f.write(text)
+    for name in files:
+        with open_compressed(name, encoding="utf-8") as f:
+            lines = list(f)
+        print(f"{name:<15} {detect(name) or 'plain':<6} {os.path.getsize(name):>7} bytes, "
+              f"{len(lines)} lines, same as written: {lines == sample_lines}")
+
+    # --- 2. Multi-member gzip in parallel ---
+    print("\n--- 2. A multi-member gzip file, in parallel ---")
+    big_lines = (f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO user={i % 9973} action=view item={i}\n"
+                 for i in range(600_000))
+    write_multi_member("multi.gz", big_lines)
+    print(f"multi.gz: {os.path.getsize('multi.gz') / 1e6:.1f} MB compressed")
+
+    start = time.perf_counter()
+    with gzip.open("multi.gz", "rt", encoding="utf-8") as f:
+        expected = list(f)
+    print(f"gzip.open():                 {time.perf_counter() - start:.2f}s, {len(expected)} lines")
+    workers = min(os.cpu_count() or 1, 4)
+    for size in (4 << 20, 1 << 20):
+        start = time.perf_counter()
+        reader = ParallelGzipReader("multi.gz", workers=workers, chunk_size=size)
+        with io.TextIOWrapper(io.BufferedReader(reader), encoding="utf-8") as f:
+            lines = list(f)
+        print(f"{workers} processes, {size >> 20} MiB chunks: {time.perf_counter() - start:.2f}s, "
+              f"same lines in the same order: {lines == expected}")
+    print(f"(this machine has {os.cpu_count()} CPU{'s' if os.cpu_count() != 1 else ''})")
+
+    # --- 3. Single member ---
+    print("\n--- 3. A single-member gzip file ---")
+    with open("multi.gz", "rb") as f:
+        single = gzip.compress(gzip.decompress(f.read()))
+    with open("single.gz", "wb") as f:
+        f.write(single)
+    reader = ParallelGzipReader("single.gz", workers=workers, chunk_size=64 * 1024)
+    with io.TextIOWrapper(io.BufferedReader(reader), encoding="utf-8") as f:
+        print(f"parallel: {reader.parallel}, same lines: {list(f) == expected}")
+
+    # --- Clean up ---
+    for name in list(files) + ["multi.gz", "single.gz"]:
+        os.remove(name)
+    print("\nRemoved the demo files.")
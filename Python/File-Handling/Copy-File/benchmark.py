@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Merges --shards shard files of --size bytes into one file, in several ways:
+
+    text             read() into a str, write() the str (Read-File/Write-File)
+    bytes            read() into bytes, write() the bytes
+    copyfileobj      shutil.copyfileobj() between binary files
+    readinto         concat_files() from source.py, readinto() fallback only
+    sendfile         concat_files(), os.sendfile() only
+    copy_file_range  concat_files(), os.copy_file_range() only
+
+Each method runs --repeat times and the fastest run is reported, with the
+CPU time the process used (user + system) for it. All shards are read once
+beforehand, so every method reads them from the page cache.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --shards 200 --size 8388608      # fewer, bigger shards
+    python benchmark.py --dir /mnt/nfs/job               # where the shards live
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from source import concat_as_text, concat_files, make_shards
+
+
+def concat_as_bytes(paths, dst_path):
+    with open(dst_path, "wb") as dst:
+        for path in paths:
+            with open(path, "rb") as src:
+                dst.write(src.read())
+
+
+def concat_copyfileobj(paths, dst_path):
+    with open(dst_path, "wb") as dst:
+        for path in paths:
+            with open(path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+
+
+METHODS = {
+    "text": concat_as_text,
+    "bytes": concat_as_bytes,
+    "copyfileobj": concat_copyfileobj,
+    "readinto": lambda paths, dst: concat_files(paths, dst, ("readinto",)),
+    "sendfile": lambda paths, dst: concat_files(paths, dst, ("sendfile",)),
+    "copy_file_range": lambda paths, dst: concat_files(paths, dst, ("copy_file_range",)),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark merging many shard files into one.")
+    parser.add_argument("--shards", type=int, default=2000, help="number of shard files (default: 2000)")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per shard (default: 65536)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method; the best counts (default: 3)")
+    parser.add_argument("--methods", nargs="+", choices=list(METHODS), default=list(METHODS))
+    parser.add_argument("--dir", help="where to create the files (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="copy-benchmark-", dir=args.dir)
+    try:
+        paths = make_shards(os.path.join(directory, "shards"), args.shards, args.size)
+        total = sum(os.path.getsize(path) for path in paths)
+        reference = os.path.join(directory, "reference.txt")
+        concat_files(paths, reference)  # also warms the page cache
+        output = os.path.join(directory, "merged.txt")
+
+        print(f"{args.shards} shards, {total / 1e6:,.1f} MB in total")
+        print(f"{'method':<16} {'seconds':>8} {'MB/s':>8} {'CPU s':>7}")
+        for name in args.methods:
+            best = None
+            for _ in range(args.repeat):
+                if os.path.exists(output):
+                    os.remove(output)
+                cpu = os.times()
+                start = time.perf_counter()
+                METHODS[name](paths, output)
+                elapsed = time.perf_counter() - start
+                after = os.times()
+                used = (after.user - cpu.user) + (after.system - cpu.system)
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, used)
+            if not filecmp.cmp(reference, output, shallow=False):
+                print(f"{name}: the merged file is wrong", file=sys.stderr)
+                return 1
+            elapsed, used = best
+            print(f"{name:<16} {elapsed:>8.3f} {total / elapsed / 1e6:>8,.0f} {used:>7.2f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Copying and concatenating files without passing the data through Python.
+
+Read-File and Write-File (see ../Read-File, ../Write-File) move content the
+obvious way: read() it into a str, write() the str out again. To copy a file
+that means decoding every byte into characters and encoding them back, and
+the data is copied from the kernel into Python and from Python into the
+kernel - for bytes that we never look at.
+
+On Linux the kernel can copy between two files itself:
+- os.copy_file_range() copies inside the kernel; on file systems like XFS
+  and Btrfs it can even share the blocks instead of copying them, and on
+  NFS the server copies without sending the data over the network at all;
+- os.sendfile() was made for sending files to sockets, but since Linux
+  2.6.33 it also writes to regular files.
+Where neither works (another OS, special files, some file system
+combinations) we fall back to a readinto() loop. It still avoids str: one
+bytearray is allocated once and reused for every chunk of every file.
+
+concat_files() uses this to merge thousands of shard files into one.
+
+This script demonstrates:
+1.  Copying through str vs. copy_file().
+2.  Merging shard files with concat_files(), and which method was used.
+3.  The readinto() fallback, for files the kernel can't copy.
+"""
+
+import collections
+import errno
+import os
+import time
+from dataclasses import dataclass, field
+
+BUFFER_SIZE = 1 << 20  # 1 MiB, for the readinto() fallback
+MAX_CHUNK = 1 << 30  # bytes per copy_file_range()/sendfile() call
+METHODS = ("copy_file_range", "sendfile", "readinto")
+
+# Errors that mean "this method doesn't work for these two files", not
+# "the copy failed": try the next method. copy_file_range() gives EBADF
+# for an output file opened with 'a' (O_APPEND), and EXDEV across file
+# systems on kernels before 5.3.
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                errno.ENOTSUP, errno.ETXTBSY, errno.ENOTSOCK, errno.EBADF}
+# Methods that don't exist on this system at all (missing from os, or ENOSYS).
+_unavailable = {name for name in METHODS[:2] if not hasattr(os, name)}
+
+
+@dataclass
+class CopyReport:
+    """What copy_file() or concat_files() did."""
+
+    files: int = 0
+    bytes: int = 0
+    methods: collections.Counter = field(default_factory=collections.Counter)  # method -> files
+    seconds: float = 0.0
+
+    @property
+    def megabytes_per_second(self):
+        return self.bytes / self.seconds / 1e6 if self.seconds else 0.0
+
+    def summary(self):
+        methods = ", ".join(f"{name}: {count}" for name, count in self.methods.most_common())
+        return (f"{self.files} files, {self.bytes:,} bytes in {self.seconds:.3f}s "
+                f"({self.megabytes_per_second:,.0f} MB/s) using {methods}")
+
+
+# Each of these copies one chunk, moves both positions past it and returns
+# its size (0 at the end of the file), so that copy_fd() can count every
+# byte, even when a method fails part-way and the next one takes over.
+
+def _copy_file_range(src, dst, buffer):
+    return os.copy_file_range(src, dst, MAX_CHUNK)
+
+
+def _sendfile(src, dst, buffer):
+    # os.sendfile() needs the reading position; it doesn't move the file's.
+    offset = os.lseek(src, 0, os.SEEK_CUR)
+    sent = os.sendfile(dst, src, offset, MAX_CHUNK)
+    os.lseek(src, offset + sent, os.SEEK_SET)
+    return sent
+
+
+def _readinto(src, dst, buffer):
+    view = memoryview(buffer)
+    # os.readv() with one buffer is readinto() for a file descriptor: the
+    # data goes into the existing bytearray, no new bytes object is made.
+    n = os.readv(src, [view])
+    written = 0
+    while written < n:  # write() may write less than asked
+        written += os.write(dst, view[written:n])
+    return n
+
+
+_COPY_CHUNK = {"copy_file_range": _copy_file_range, "sendfile": _sendfile, "readinto": _readinto}
+
+
+def copy_fd(src, dst, methods=METHODS, buffer=None):
+    """
+    Copies from file descriptor `src` (from its position to the end) to `dst`.
+
+    Tries the methods in order and falls back to the next one if the kernel
+    can't use it for these files. Both positions move on, as with read() and
+    write(), so several calls append one file after another.
+
+    Args:
+        src (int): A file descriptor opened for reading.
+        dst (int): A file descriptor opened for writing.
+        methods (tuple): Which of METHODS to try, in order.
+        buffer (bytearray | None): The buffer for the readinto() fallback.
+            Pass the same one for many files to allocate it only once.
+
+    Returns:
+        tuple: (bytes copied, name of the method that did it).
+    """
+    copied = 0
+    used = None
+    for method in methods:
+        if method in _unavailable:
+            continue
+        if method not in _COPY_CHUNK:
+            raise ValueError(f"unknown copy method {method!r}")
+        if method == "readinto" and buffer is None:
+            buffer = bytearray(BUFFER_SIZE)
+        copy_chunk = _COPY_CHUNK[method]
+        try:
+            while True:
+                sent = copy_chunk(src, dst, buffer)
+                if sent == 0:
+                    break
+                copied += sent
+        except OSError as error:
+            # The kernel may refuse these files at any chunk, not only the
+            # first. The positions are past everything copied so far, so the
+            # next method carries on from there. readinto() is the last
+            # resort: its errors (EBADF: not readable) are real.
+            if error.errno not in _UNSUPPORTED or method == "readinto":
+                raise
+            if error.errno == errno.ENOSYS:
+                _unavailable.add(method)
+            continue
+        used = method
+        if copied:
+            return copied, method
+        # 0 bytes: either the file is empty, or it is one of the files in
+        # /proc and /sys that only read() can read. Let the next method try.
+    if used is None:
+        raise OSError(errno.ENOTSUP, f"none of the copy methods {methods} worked")
+    return copied, used
+
+
+def copy_file(src_path, dst_path, methods=METHODS):
+    """
+    Copies the file `src_path` to `dst_path` (overwritten if it exists).
+
+    Returns:
+        CopyReport: Bytes copied and the method used.
+    """
+    start = time.perf_counter()
+    report = CopyReport()
+    with open(src_path, "rb", buffering=0) as src, open(dst_path, "wb", buffering=0) as dst:
+        copied, method = copy_fd(src.fileno(), dst.fileno(), methods)
+    report.files, report.bytes = 1, copied
+    report.methods[method] += 1
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def concat_files(src_paths, dst_path, methods=METHODS, append=False):
+    """
+    Writes the files in `src_paths` one after another into `dst_path`.
+
+    Args:
+        src_paths (iterable): The files to merge, in order.
+        dst_path (str): The output file.
+        methods (tuple): Which of METHODS to try, in order.
+        append (bool): Add to the end of `dst_path` instead of replacing it.
+
+    Returns:
+        CopyReport: Files, bytes, the methods used and the time taken.
+
+    Usage:
+        shards = sorted(glob.glob('out/part-*.csv'))
+        print(concat_files(shards, 'out/all.csv').summary())
+    """
+    start = time.perf_counter()
+    report = CopyReport()
+    buffer = bytearray(BUFFER_SIZE) if "readinto" in methods else None  # shared by all files
+    # Not 'ab' for appending: copy_file_range() and sendfile() refuse files
+    # opened with O_APPEND. We move to the end ourselves instead.
+    flags = os.O_WRONLY | os.O_CREAT | (0 if append else os.O_TRUNC)
+    with open(os.open(dst_path, flags, 0o666), "wb", buffering=0) as dst:
+        dst.seek(0, os.SEEK_END)
+        for path in src_paths:
+            with open(path, "rb", buffering=0) as src:
+                copied, method = copy_fd(src.fileno(), dst.fileno(), methods, buffer)
+            report.files += 1
+            report.bytes += copied
+            report.methods[method] += 1
+    report.seconds = time.perf_counter() - start
+    return report
+
+
+def concat_as_text(src_paths, dst_path):
+    """The Read-File/Write-File way: read() every file into a str and write() it out."""
+    with open(dst_path, "w", encoding="utf-8") as dst:
+        for path in src_paths:
+            with open(path, "r", encoding="utf-8") as src:
+                dst.write(src.read())
+
+
+def make_shards(directory, count, size):
+    """Creates `count` text files of about `size` bytes each; returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for shard in range(count):
+        line = f"shard {shard:05d}, record with some text: héllo wörld\n"
+        path = os.path.join(directory, f"part-{shard:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(line * (size // len(line.encode("utf-8")) + 1))
+        paths.append(path)
+    return paths
+
+
+if __name__ == "__main__":
+    import filecmp
+    import shutil
+
+    shard_dir = "shards"
+    shards = make_shards(shard_dir, 500, 64 * 1024)
+    total = sum(os.path.getsize(path) for path in shards)
+
+    # --- 1. Copying one file ---
+    print("--- 1. Copying one file ---")
+    start = time.perf_counter()
+    with open(shards[0], "r", encoding="utf-8") as src, open("copy_text.txt", "w", encoding="utf-8") as dst:
+        dst.write(src.read())  # decode to str, encode back
+    print(f"through str:  {time.perf_counter() - start:.5f}s")
+    report = copy_file(shards[0], "copy_fast.txt")
+    print(f"copy_file():  {report.seconds:.5f}s via {next(iter(report.methods))}")
+    print(f"Identical: {filecmp.cmp(shards[0], 'copy_fast.txt', shallow=False)}")
+
+    # --- 2. Merging shards ---
+    print(f"\n--- 2. Merging {len(shards)} shards ({total / 1e6:.1f} MB) ---")
+    start = time.perf_counter()
+    concat_as_text(shards, "merged_text.txt")
+    elapsed = time.perf_counter() - start
+    print(f"through str: {elapsed:.3f}s ({total / elapsed / 1e6:,.0f} MB/s)")
+    for methods in (METHODS, ("sendfile",), ("readinto",)):
+        report = concat_files(shards, "merged.txt", methods)
+        print(report.summary())
+    print(f"Identical to the str version: {filecmp.cmp('merged_text.txt', 'merged.txt', shallow=False)}")
+
+    # --- 3. Falling back ---
+    print("\n--- 3. Falling back ---")
+    # Files in /proc report a size of 0 and are generated as they are read;
+    # the kernel's copy functions give up on them, readinto() works.
+    if os.path.exists("/proc/self/status"):
+        report = copy_file("/proc/self/status", "status_copy.txt")
+        print(f"/proc/self/status: {report.bytes} bytes via {next(iter(report.methods))}")
+        os.remove("status_copy.txt")
+    report = copy_file(shards[1], "copy_fast.txt", methods=("readinto",))
+    print(f"readinto() only:   {report.bytes} bytes via {next(iter(report.methods))}")
+
+    # --- Clean up ---
+    for name in ("copy_text.txt", "copy_fast.txt", "merged_text.txt", "merged.txt"):
+        os.remove(name)
+    shutil.rmtree(shard_dir)
+    print("\nRemoved the demo files.")
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Compares durable appends with an fsync() per record against DurableLog's
+group commit (source.py), from threads and from processes:
+
+    fsync-each      every appender: write() + fsync() per record
+    group           DurableLog, committing as soon as the last fsync() is done
+    group-delay     DurableLog with a latency bound (--max-delay)
+
+Every appender appends --records records and waits until each one is
+durable before it sends the next, like a server confirming requests. The
+report shows the throughput, how many records shared each fsync(), and
+the append latency (median and 99th percentile).
+
+On virtual machines and with battery-backed disk caches, fsync() can take
+well under a millisecond, and group commit has little to save. --fsync-delay
+adds a sleep after every fsync() (in both methods) to model a disk where it
+takes milliseconds, as on many SSDs and every spinning disk. Like a real
+disk, the model flushes for one caller at a time.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --fsync-delay 2      # model a 2 ms fsync()
+    python benchmark.py --appenders 16 --records 200 --max-delay 0.002
+    python benchmark.py --dir /mnt/data --mode processes
+"""
+
+import argparse
+import fcntl
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from source import DurableLog, read_records, remove_log
+
+METHODS = ("fsync-each", "group", "group-delay")
+
+
+def slow_fsync(delay, disk_lock):
+    """
+    An fsync() that takes `delay` seconds longer, for a slower disk.
+
+    The file `disk_lock` is locked during the delay, so that concurrent
+    fsync() calls from all threads and processes wait for each other.
+    """
+    if not delay:
+        return os.fsync
+
+    def fsync(fd):
+        os.fsync(fd)
+        lock_fd = os.open(disk_lock, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            time.sleep(delay)
+        finally:
+            os.close(lock_fd)
+    return fsync
+
+
+def append_records(method, path, worker, count, max_delay, fsync_delay, log=None):
+    """Appends `count` records; returns (latencies, fsyncs made here)."""
+    latencies = []
+    fsync = slow_fsync(fsync_delay, path + ".disk")
+    if method == "fsync-each":
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+        try:
+            for i in range(count):
+                start = time.perf_counter()
+                os.write(fd, f"appender {worker} record {i}\n".encode())
+                fsync(fd)
+                latencies.append(time.perf_counter() - start)
+        finally:
+            os.close(fd)
+        return latencies, count
+
+    own_log = log is None
+    if own_log:
+        log = DurableLog(path, max_delay=max_delay if method == "group-delay" else 0.0, fsync=fsync)
+    try:
+        for i in range(count):
+            start = time.perf_counter()
+            log.append(f"appender {worker} record {i}".encode())
+            latencies.append(time.perf_counter() - start)
+    finally:
+        if own_log:
+            log.close()
+    return latencies, log.fsyncs if own_log else 0
+
+
+def run_threads(method, path, appenders, count, max_delay, fsync_delay):
+    log = None
+    if method != "fsync-each":
+        log = DurableLog(path, max_delay=max_delay if method == "group-delay" else 0.0,
+                         fsync=slow_fsync(fsync_delay, path + ".disk"))
+    results = [None] * appenders
+
+    def worker(n):
+        results[n] = append_records(method, path, n, count, max_delay, fsync_delay, log)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(appenders)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if log is not None:
+        log.close()
+        fsyncs = log.fsyncs
+    else:
+        fsyncs = sum(result[1] for result in results)
+    return elapsed, [latency for result in results for latency in result[0]], fsyncs
+
+
+def run_processes(method, path, appenders, count, max_delay, fsync_delay):
+    context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    with context.Pool(appenders) as pool:
+        start = time.perf_counter()
+        results = pool.starmap(append_records,
+                               [(method, path, n, count, max_delay, fsync_delay) for n in range(appenders)])
+        elapsed = time.perf_counter() - start
+    return elapsed, [latency for result in results for latency in result[0]], sum(result[1] for result in results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark group commit against fsync() per record.")
+    parser.add_argument("--appenders", type=int, default=8, help="threads or processes appending (default: 8)")
+    parser.add_argument("--records", type=int, default=500, help="records per appender (default: 500)")
+    parser.add_argument("--max-delay", type=float, default=0.001,
+                        help="latency bound for group-delay, in seconds (default: 0.001)")
+    parser.add_argument("--fsync-delay", type=float, default=0.0,
+                        help="extra milliseconds per fsync(), to model a slower disk (default: 0)")
+    parser.add_argument("--mode", choices=("threads", "processes", "both"), default="both")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--dir", help="directory for the log (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    tmp_dir = tempfile.mkdtemp(prefix="group-commit-", dir=args.dir)
+    path = os.path.join(tmp_dir, "bench.log")
+    modes = ("threads", "processes") if args.mode == "both" else (args.mode,)
+    total = args.appenders * args.records
+
+    try:
+        extra = f", fsync() slowed down by {args.fsync_delay} ms" if args.fsync_delay else ""
+        print(f"{args.appenders} appenders x {args.records} records, log in {tmp_dir}{extra}")
+        print(f"{'mode':<10} {'method':<12} {'records/s':>10} {'fsyncs':>7} {'rec/fsync':>10} "
+              f"{'p50 ms':>7} {'p99 ms':>7}")
+        for mode in modes:
+            runner = run_threads if mode == "threads" else run_processes
+            for method in args.methods:
+                remove_log(path)
+                elapsed, latencies, fsyncs = runner(method, path, args.appenders, args.records, args.max_delay,
+                                                  args.fsync_delay / 1000)
+                if method != "fsync-each":
+                    assert len(read_records(path)) == total, "records went missing"
+                latencies.sort()
+                p50 = statistics.median(latencies) * 1000
+                p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+                print(f"{mode:<10} {method:<12} {total / elapsed:>10.0f} {fsyncs:>7} "
+                      f"{total / max(fsyncs, 1):>10.1f} {p50:>7.2f} {p99:>7.2f}")
+    finally:
+        remove_log(path)
+        if os.path.exists(path + ".disk"):
+            os.remove(path + ".disk")
+        os.rmdir(tmp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,504 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+A durable append-only log with group commit.
+
+Create-File and Write-File (see ../Write-File) append with open(..., 'a').
+write() returns as soon as the data is in the operating system's cache: if
+the machine loses power a moment later, the "written" lines are gone. Only
+os.fsync() waits until the data is on the disk, but an fsync() per line
+makes appending hundreds of times slower.
+
+Group commit gets durability without paying for it per record. Appenders
+hand their records to a committer and wait; the committer writes everything
+that has queued up with one write() and makes it durable with one fsync().
+While that fsync() runs, the next batch is already queuing. The more
+appenders there are, the more records share each fsync().
+
+This works across processes too. Every process has its own committer, and
+after writing its batch it checks a small shared '.sync' file: if another
+process's fsync() already covered our bytes, we don't need one of our own.
+
+Every record is framed with its length and a CRC32. A crash in the middle of
+a batch can leave a torn record at the end of the file; opening the log
+finds the last complete record and cuts the rest off.
+
+This script demonstrates:
+1.  Appending from threads, and how many records share each fsync().
+2.  Appending from several processes.
+3.  Recovering after a crash in the middle of a batch.
+4.  fsync() per record vs. group commit.
+"""
+
+import collections
+import errno
+import os
+import struct
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+try:
+    import fcntl  # Unix only; needed to share the log between processes
+except ImportError:
+    fcntl = None
+
+# A record on disk: length (4 bytes), CRC32 (4 bytes), then the payload.
+# The CRC also covers the length, so a run of zero bytes (what a crash can
+# leave at the end of a file) is not a valid empty record.
+_FRAME = struct.Struct("<II")
+
+# The '.sync' file next to the log: the log's inode, the offset up to which
+# it is known to be on disk, and how often (and where, the last time) a
+# failed fsync() cut batches off the end.
+SYNC_SUFFIX = ".sync"
+_SYNCED = struct.Struct("<QQQQ")
+
+
+def _checksum(header_length, payload):
+    return zlib.crc32(payload, zlib.crc32(header_length))
+
+
+def frame(payload):
+    """Returns `payload` with its length and CRC32 in front."""
+    length = struct.pack("<I", len(payload))
+    return _FRAME.pack(len(payload), _checksum(length, payload)) + payload
+
+
+def _records(f, start):
+    """Yields (payload, end offset) for the complete records of open file `f` from offset `start`."""
+    size = os.fstat(f.fileno()).st_size
+    position = start
+    f.seek(start)
+    while position + _FRAME.size <= size:
+        header = f.read(_FRAME.size)
+        length, crc = _FRAME.unpack(header)
+        end = position + _FRAME.size + length
+        if end > size:
+            break  # the record was cut off (or the length is garbage)
+        payload = f.read(length)
+        if len(payload) < length or _checksum(header[:4], payload) != crc:
+            break  # torn or garbage bytes
+        yield payload, end
+        position = end
+
+
+def scan(path, start=0):
+    """
+    Reads the complete records of a log, one at a time.
+
+    Args:
+        path (str): The log.
+        start (int): Where a record starts; scanning begins there.
+
+    Returns:
+        tuple: (list of payloads, offset where the valid records end).
+    """
+    records = []
+    position = start
+    with open(path, "rb") as f:
+        for payload, position in _records(f, start):
+            records.append(payload)
+    return records, position
+
+
+def read_records(path):
+    """Returns the payloads of every complete record."""
+    return scan(path)[0]
+
+
+def recover(path, start=0):
+    """
+    Cuts off everything after the last complete record.
+
+    Args:
+        path (str): The log.
+        start (int): An offset up to which the log is known to be complete,
+            e.g. the last fsync()ed offset. Only the bytes after it are
+            read, so opening a large log doesn't mean reading all of it.
+            The whole log is read only if there is something to cut off.
+
+    Returns:
+        int: How many bytes were removed (0 if the log was clean).
+    """
+    with open(path, "r+b") as f:
+        size = os.fstat(f.fileno()).st_size
+        valid_end = min(start, size)
+        for _, valid_end in _records(f, valid_end):
+            pass
+        if size > valid_end and start:
+            # Before cutting anything, make sure `start` was right (a stale
+            # .sync file could point into the middle of a record): scan all.
+            valid_end = 0
+            for _, valid_end in _records(f, 0):
+                pass
+        if size > valid_end:
+            f.truncate(valid_end)
+            f.flush()
+            os.fsync(f.fileno())
+    return size - valid_end
+
+
+class _Pending:
+    __slots__ = ("data", "future", "queued_at")
+
+    def __init__(self, data):
+        self.data = data
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class DurableLog:
+    """
+    An append-only log: append() returns once the record is on disk.
+
+    Args:
+        path (str): The log file; created if missing.
+        max_delay (float): The latency bound, in seconds. After the first
+            record of a batch arrives, the committer waits at most this long
+            for more records before it writes. 0 commits as soon as the
+            previous fsync() is done, which already batches everything that
+            arrived during it.
+        max_batch (int): Commit at once when this many records are queued.
+        fsync (callable): Makes the file durable, given its descriptor.
+            os.fsync by default; os.fdatasync skips metadata such as the
+            modification time, and on macOS only fcntl(fd, F_FULLFSYNC)
+            reaches the platter.
+
+    A log can be shared by the threads of one process. Every process opens
+    its own DurableLog (after fork(), not before: the committer thread is not
+    copied into the child).
+
+    Usage:
+        with DurableLog('events.log', max_delay=0.002) as log:
+            log.append(b'order 17 paid')        # durable when this returns
+            future = log.submit(b'order 18 paid')  # don't wait
+    """
+
+    def __init__(self, path, max_delay=0.0, max_batch=4096, fsync=os.fsync):
+        self.path = path
+        self.max_delay = max_delay
+        self.max_batch = max_batch
+        self._fsync = fsync
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o666)
+        self._sync_fd = os.open(path + SYNC_SUFFIX, os.O_RDWR | os.O_CREAT, 0o666)
+        self._inode = os.fstat(self._fd).st_ino
+        # Nobody else may write while we look for a torn tail. The locks are
+        # taken in the same order as in _commit() - the .sync file first -
+        # so that a process opening the log can't deadlock with one committing.
+        self._lock(self._sync_fd, exclusive=True)
+        try:
+            self._lock(self._fd, exclusive=True)
+            try:
+                # Everything up to the last fsync()ed offset is complete (it
+                # is always the end of a batch): only the tail after it is read.
+                synced, cuts, cut_at = self._read_synced()
+                self.recovered_bytes = recover(path, synced)
+                if self.recovered_bytes and synced > os.fstat(self._fd).st_size:
+                    # The offset in the .sync file points past the cut.
+                    self._write_synced(0, cuts, cut_at)
+            finally:
+                self._unlock(self._fd)
+        finally:
+            self._unlock(self._sync_fd)
+
+        # Statistics
+        self.records = 0
+        self.batches = 0
+        self.fsyncs = 0  # fsync() calls made by this process
+        self.batch_sizes = collections.Counter()  # records per batch -> batches
+
+        self._queue = []
+        self._condition = threading.Condition()
+        self._closing = False
+        self._broken = None  # the error that left a failed batch in the file
+        self._committer = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._committer.start()
+
+    # --- Appending ---
+
+    def submit(self, data):
+        """Queues one record (bytes) and returns a Future that is done once it is durable."""
+        pending = _Pending(bytes(data))
+        with self._condition:
+            if self._closing:
+                raise ValueError("append to a closed log")
+            if self._broken is not None:
+                raise OSError(errno.EIO, "a failed batch could not be removed from the log", self.path) \
+                    from self._broken
+            self._queue.append(pending)
+            self._condition.notify()
+        return pending.future
+
+    def append(self, data):
+        """Appends one record and waits until it is on disk."""
+        self.submit(data).result()
+
+    # --- The committer ---
+
+    def _next_batch(self):
+        with self._condition:
+            while not self._queue and not self._closing:
+                self._condition.wait()
+            if self.max_delay > 0:
+                # The latency bound: wait for company, but not for longer than
+                # max_delay after the oldest record arrived.
+                deadline = self._queue[0].queued_at + self.max_delay if self._queue else 0
+                while not self._closing and len(self._queue) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            batch = self._queue[:self.max_batch]
+            del self._queue[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # closing and nothing left
+            try:
+                self._commit(b"".join(frame(pending.data) for pending in batch))
+            except BaseException as error:
+                for pending in batch:
+                    pending.future.set_exception(error)
+                continue
+            self.records += len(batch)
+            self.batches += 1
+            self.batch_sizes[len(batch)] += 1
+            for pending in batch:
+                pending.future.set_result(None)
+
+    def _commit(self, data):
+        """
+        Writes one batch and makes sure it is on disk.
+
+        A batch that fails - a write() that stops half-way (ENOSPC) or an
+        fsync() error - is cut off again, so that the next batches don't
+        follow broken bytes (readers stop there, and recovery would cut the
+        committed records after them) and records reported as failed don't
+        stay in the log.
+        """
+        if self._broken is not None:
+            raise OSError(errno.EIO, "a failed batch could not be removed from the log", self.path)
+        # An exclusive lock, so that `start` is where our batch begins: no
+        # other process writes in between, and nobody recovers meanwhile.
+        self._lock(self._fd, exclusive=True)
+        try:
+            start = os.fstat(self._fd).st_size
+            _, cuts, _ = self._read_synced()  # only changes under this lock
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self._fd, view):]
+            except BaseException:
+                self._cut(start)
+                raise
+            end = start + len(data)
+        finally:
+            self._unlock(self._fd)
+
+        # Whoever holds the .sync file's lock either finds that another process's
+        # fsync() covered our bytes already, or does one for everybody.
+        self._lock(self._sync_fd, exclusive=True)
+        try:
+            synced, now_cuts, cut_at = self._read_synced()
+            if now_cuts != cuts and (now_cuts - cuts > 1 or cut_at < end):
+                raise OSError(errno.EIO, "the batch was cut off after another process's fsync() failed",
+                              self.path)
+            if synced >= end:
+                return
+            # Wait for writes in flight, so that `size` only counts bytes
+            # that are fully in the file before fsync() starts.
+            self._lock(self._fd, exclusive=True)
+            size = os.fstat(self._fd).st_size
+            self._unlock(self._fd)
+            try:
+                self._fsync(self._fd)
+            except BaseException:
+                # Everything after `start` is unconfirmed, including batches
+                # other processes wrote since; they find out from the count
+                # of cuts.
+                self._lock(self._fd, exclusive=True)
+                try:
+                    self._cut(start)
+                    if self._broken is None:
+                        self._write_synced(synced, now_cuts + 1, start)
+                finally:
+                    self._unlock(self._fd)
+                raise
+            self.fsyncs += 1
+            self._write_synced(size, now_cuts, cut_at)
+        finally:
+            self._unlock(self._sync_fd)
+
+    def _cut(self, offset):
+        """Truncates the log back to `offset`, or marks the log broken if that fails too."""
+        try:
+            os.ftruncate(self._fd, offset)
+        except OSError as error:
+            self._broken = error
+
+    def _read_synced(self):
+        """Returns (synced offset, number of cuts, offset of the last cut)."""
+        os.lseek(self._sync_fd, 0, os.SEEK_SET)
+        data = os.read(self._sync_fd, _SYNCED.size)
+        if len(data) < _SYNCED.size:
+            return 0, 0, 0
+        inode, offset, cuts, cut_at = _SYNCED.unpack(data)
+        # A different inode: the log was deleted and created again.
+        return (offset, cuts, cut_at) if inode == self._inode else (0, 0, 0)
+
+    def _write_synced(self, offset, cuts, cut_at):
+        os.lseek(self._sync_fd, 0, os.SEEK_SET)
+        os.write(self._sync_fd, _SYNCED.pack(self._inode, offset, cuts, cut_at))
+
+    @staticmethod
+    def _lock(fd, exclusive):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    @staticmethod
+    def _unlock(fd):
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    # --- Statistics and closing ---
+
+    def stats(self):
+        """How many records and batches were committed, and how many shared an fsync()."""
+        return {
+            "records": self.records,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "records_per_fsync": self.records / self.fsyncs if self.fsyncs else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+        }
+
+    def close(self):
+        """Commits what is still queued and closes the log."""
+        if self._fd is None:
+            return
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._committer.join()
+        os.close(self._fd)
+        os.close(self._sync_fd)
+        self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _process_appender(path, worker, count):
+    """Appends `count` records from a separate process (used by demo 2)."""
+    with DurableLog(path) as log:
+        for i in range(count):
+            log.append(f"process {worker} record {i}".encode())
+        return log.stats()
+
+
+def remove_log(path):
+    for name in (path, path + SYNC_SUFFIX):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+
+    filename = "events.log"
+    remove_log(filename)
+
+    # --- 1. Threads ---
+    print("--- 1. Appending from 8 threads ---")
+    def appender(log, worker, count):
+        for i in range(count):
+            log.append(f"thread {worker} record {i}".encode())
+
+    with DurableLog(filename) as log:
+        threads = [threading.Thread(target=appender, args=(log, n, 200)) for n in range(8)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    stats = log.stats()
+    print(f"{stats['records']} durable records in {elapsed:.3f}s with {stats['fsyncs']} fsync() calls "
+          f"({stats['records_per_fsync']:.1f} records per fsync)")
+    print(f"Biggest batch: {max(stats['batch_sizes'])} records")
+
+    # A latency bound trades a little waiting for bigger batches.
+    with DurableLog(filename, max_delay=0.005) as log:
+        futures = [log.submit(f"burst {i}".encode()) for i in range(500)]
+        for future in futures:
+            future.result()
+    print(f"With max_delay=5 ms: 500 records, {log.fsyncs} fsync() call(s)")
+
+    # --- 2. Processes ---
+    print("\n--- 2. Appending from 4 processes ---")
+    context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    with context.Pool(4) as pool:
+        results = pool.starmap(_process_appender, [(filename, n, 300) for n in range(4)])
+    total_records = sum(result["records"] for result in results)
+    total_fsyncs = sum(result["fsyncs"] for result in results)
+    print(f"{total_records} records, {total_fsyncs} fsync() calls in all processes "
+          f"({total_records / max(total_fsyncs, 1):.1f} records per fsync)")
+    records = read_records(filename)
+    print(f"The log holds {len(records)} complete records; last: {records[-1]!r}")
+
+    # --- 3. A crash in the middle of a batch ---
+    print("\n--- 3. Crash recovery ---")
+    # Simulate a crash: only the first part of a batch reached the disk.
+    torn_batch = frame(b"complete record") + frame(b"this record was cut off")[:13]
+    with open(filename, "ab") as f:
+        f.write(torn_batch)
+    with DurableLog(filename) as log:
+        print(f"Removed a torn tail of {log.recovered_bytes} bytes on open")
+        log.append(b"first record after the crash")
+    print(f"Last records: {[bytes(r) for r in read_records(filename)[-2:]]}")
+
+    # --- 4. fsync() per record vs. group commit ---
+    print("\n--- 4. fsync() per record vs. group commit (8 threads x 100 records) ---")
+    remove_log(filename)
+    lock = threading.Lock()
+
+    def fsync_each(worker):
+        for i in range(100):
+            with lock:
+                f.write(f"thread {worker} record {i}\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    with open(filename, "a", encoding="utf-8") as f:
+        threads = [threading.Thread(target=fsync_each, args=(n,)) for n in range(8)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        naive = time.perf_counter() - start
+
+    remove_log(filename)
+    with DurableLog(filename) as log:
+        threads = [threading.Thread(target=appender, args=(log, n, 100)) for n in range(8)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        grouped = time.perf_counter() - start
+    print(f"'a' mode + fsync() per record: {800 / naive:>8.0f} records/s (800 fsyncs)")
+    print(f"DurableLog group commit:       {log.records / grouped:>8.0f} records/s ({log.fsyncs} fsyncs)")
+
+    # --- Clean up ---
+    remove_log(filename)
+    print(f"\nRemoved '{filename}'.")
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Following a file that another program appends to, like `tail -F`.
+
+Write-File and Create-File (see ../Write-File, ../Create-File) append to
+logs with open(name, 'a'). The simple way to watch such a log is to read it
+again every few seconds and look for lines we haven't seen. That rereads the
+whole file on every poll, so a 1 GB log costs 1 GB of reading each time,
+for a handful of new lines.
+
+A follower remembers how far it got - the byte offset after the last
+complete line - and on every poll reads only what was added after it:
+- a line without its '\\n' is still being written; it is held back until the
+  writer finishes it;
+- a file that got shorter than our offset was truncated: start again at 0;
+- a file whose inode changed was rotated (renamed away and replaced by a new
+  file): finish reading the old file, then follow the new one from 0;
+- polls back off from 10 ms to 1 s while nothing happens, and speed up again
+  as soon as new lines arrive;
+- the position (inode and offset) can be saved, so after a restart the
+  follower continues where it stopped instead of rereading the file.
+
+This script demonstrates:
+1.  Following lines as a writer appends them, and held-back partial lines.
+2.  Truncation and rotation.
+3.  Resuming from a saved position.
+4.  Following vs. rereading the whole file on every poll.
+"""
+
+import json
+import os
+import time
+from collections import namedtuple
+
+MIN_INTERVAL = 0.01  # seconds between polls while lines are arriving
+MAX_INTERVAL = 1.0  # longest wait between polls of a quiet file
+_CHUNK_SIZE = 1 << 20  # read 1 MiB at a time
+_MAX_BATCH = 8 << 20  # bytes read by one poll at most
+
+Position = namedtuple("Position", "inode offset")
+
+
+class Follower:
+    """
+    Yields the complete lines appended to a file, surviving truncation and rotation.
+
+    Args:
+        path (str): The file to follow. It doesn't have to exist yet.
+        state_path (str | None): Where the position is saved. If the file
+            exists, following resumes from the position in it.
+        from_end (bool): Without a saved position, skip what is already in
+            the file and only follow new lines.
+        encoding (str): Used to decode lines.
+        errors (str): How to handle bytes that can't be decoded. 'replace'
+            keeps one broken line from stopping the follower.
+
+    Usage:
+        follower = Follower('app.log', state_path='app.log.pos')
+        for line in follower.follow():
+            handle(line)          # the position is saved after every batch
+    """
+
+    def __init__(self, path, state_path=None, from_end=False, encoding="utf-8", errors="replace"):
+        self.path = path
+        self.state_path = state_path
+        self.encoding = encoding
+        self.errors = errors
+        self._file = None
+        self._inode = None
+        self.offset = 0  # bytes up to the end of the last complete line returned
+        self._partial = b""  # the start of a line that hasn't got its '\n' yet
+        self.truncations = 0
+        self.rotations = 0
+        self.bytes_read = 0
+        saved = self._load_state()
+        self._open(saved.offset if saved else None, from_end, saved.inode if saved else None)
+
+    # --- Position ---
+
+    @property
+    def position(self):
+        return Position(self._inode, self.offset)
+
+    def _load_state(self):
+        if not self.state_path:
+            return None
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return Position(**json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def save(self):
+        """Saves the position to state_path (atomically, via a temporary file)."""
+        if not self.state_path:
+            raise ValueError("no state_path given")
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.position._asdict(), f)
+        os.replace(temp_path, self.state_path)
+
+    # --- Opening, truncation and rotation ---
+
+    def _open(self, offset=None, from_end=False, inode=None):
+        """Opens the file; returns False if it doesn't exist (yet)."""
+        try:
+            self._file = open(self.path, "rb")
+        except FileNotFoundError:
+            self._file, self._inode = None, None
+            return False
+        info = os.fstat(self._file.fileno())
+        self._inode = info.st_ino
+        self._partial = b""
+        if offset is not None and not self._resumable(inode, offset, info.st_size):
+            offset = None  # the saved position belongs to another file, or a longer one
+        if offset is None:
+            offset = info.st_size if from_end else 0
+        self.offset = offset
+        self._file.seek(offset)
+        return True
+
+    def _resumable(self, inode, offset, size):
+        """Whether a saved position still points to the end of a line in this file."""
+        if inode != self._inode or offset > size:
+            return False
+        if offset == 0:
+            return True
+        # We only ever stop after a '\n'. If the byte before the offset isn't
+        # one, the file was rewritten while we were away.
+        self._file.seek(offset - 1)
+        return self._file.read(1) == b"\n"
+
+    def _check_file(self):
+        """Notices truncation and rotation before we read."""
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None  # rotated away, new file not created yet: keep reading the old one
+        if info.st_ino != self._inode:
+            self.rotations += 1
+            return "rotated"
+        if info.st_size < self.offset + len(self._partial):
+            self.truncations += 1
+            self._partial = b""
+            self.offset = 0
+            self._file.seek(0)
+        return None
+
+    # --- Reading ---
+
+    def _read_new(self, final=False):
+        """Reads what was appended since the last call and returns the complete lines."""
+        chunks = [self._partial]
+        size = 0
+        # A long backlog (following a big file from 0) is returned a few MiB
+        # per poll, not all at once.
+        while final or size < _MAX_BATCH:
+            chunk = self._file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            chunks.append(chunk)
+        self.bytes_read += size
+        data = b"".join(chunks)
+        end = len(data) if final else data.rfind(b"\n") + 1
+        self._partial = data[end:]
+        if end == 0:
+            return []
+        self.offset += end
+        # Split at '\n' only: str.splitlines() would also split at '\r', form
+        # feeds and other characters that don't end a line here.
+        lines = data[:end].decode(self.encoding, self.errors).split("\n")
+        last = lines.pop()  # '' unless `final` and the last line has no '\n'
+        lines = [line + "\n" for line in lines]
+        if last:
+            lines.append(last)
+        return lines
+
+    def poll(self):
+        """
+        Checks the file once, without waiting.
+
+        Returns:
+            list: The new complete lines (with their '\\n'), maybe empty.
+        """
+        if self._file is None and not self._open():
+            return []
+        if self._check_file() == "rotated":
+            # Whatever the writer put into the old file before it switched is
+            # still ours. Its last line may lack a '\n': nobody will finish it.
+            lines = self._read_new(final=True)
+            self._file.close()
+            self._open()
+            return lines + self.poll()
+        return self._read_new()
+
+    def follow(self, idle_timeout=None):
+        """
+        Yields new lines as they are appended, polling with back-off.
+
+        Args:
+            idle_timeout (float | None): Stop after this many seconds without
+                a new line. None follows forever.
+
+        After every batch of lines has been consumed, the position is saved
+        (if a state_path was given). A crash while handling a batch means the
+        batch is handled again after the restart, but never skipped.
+        """
+        interval = MIN_INTERVAL
+        last_line = time.monotonic()
+        while True:
+            lines = self.poll()
+            if lines:
+                yield from lines
+                if self.state_path:
+                    self.save()
+                interval = MIN_INTERVAL
+                last_line = time.monotonic()
+                continue
+            if idle_timeout is not None and time.monotonic() - last_line >= idle_timeout:
+                return
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_INTERVAL)  # quiet file: poll less often
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    import threading
+
+    log_name = "app.log"
+    state_name = "app.log.pos"
+
+    def append(text):
+        with open(log_name, "a", encoding="utf-8") as f:  # the Write-File way
+            f.write(text)
+
+    # --- 1. Following ---
+    print("--- 1. Following a file while it is appended to ---")
+    append("old line 1\nold line 2\n")
+
+    def writer():
+        for i in range(1, 4):
+            time.sleep(0.05)
+            append(f"new line {i}\n")
+        append("a line still being writ")  # no '\n' yet
+        time.sleep(0.1)
+        append("ten\n")
+
+    threading.Thread(target=writer).start()
+    with Follower(log_name, from_end=True) as follower:
+        for line in follower.follow(idle_timeout=0.5):
+            print(f"  got {line!r} (offset now {follower.offset})")
+
+        # --- 2. Truncation and rotation ---
+        print("\n--- 2. Truncation and rotation ---")
+        with open(log_name, "w", encoding="utf-8") as f:  # truncate and start over
+            f.write("after truncation\n")
+        print(f"  {follower.poll()}  (truncations: {follower.truncations})")
+        append("last line in the old file\n")
+        os.replace(log_name, log_name + ".1")  # what logrotate does
+        append("first line in the new file\n")
+        print(f"  {follower.poll()}  (rotations: {follower.rotations})")
+
+    # --- 3. Resuming ---
+    print("\n--- 3. Resuming from a saved position ---")
+    with Follower(log_name, state_path=state_name) as follower:
+        lines = list(follower.follow(idle_timeout=0.05))
+        print(f"  first run: {lines}, saved {follower.position}")
+    append("written while we were stopped\n")
+    with Follower(log_name, state_path=state_name) as follower:
+        lines = list(follower.follow(idle_timeout=0.05))
+        print(f"  after a restart: {lines} ({follower.bytes_read} bytes read)")
+
+    # --- 4. Following vs. rereading ---
+    print("\n--- 4. 100 polls of a 20 MB log, 10 new lines each ---")
+    with open(log_name, "w", encoding="utf-8") as f:
+        f.writelines(f"2024-05-01 12:00:00 INFO request {i} handled in 12 ms\n" for i in range(400_000))
+
+    seen = os.path.getsize(log_name)
+    reread_bytes = 0
+    start = time.perf_counter()
+    for poll in range(100):
+        append("".join(f"poll {poll} line {i}\n" for i in range(10)))
+        with open(log_name, "rb") as f:  # the usual way: read it all, keep what's new
+            data = f.read()
+        reread_bytes += len(data)
+        new_lines = data[seen:].splitlines()
+        seen = len(data)
+    reread = time.perf_counter() - start
+
+    follower = Follower(log_name, from_end=True)
+    start = time.perf_counter()
+    for poll in range(100):
+        append("".join(f"poll {poll} line {i}\n" for i in range(10)))
+        new_lines = follower.poll()
+    followed = time.perf_counter() - start
+    follower.close()
+    print(f"Rereading: {reread:.3f}s, {reread_bytes / 1e6:,.0f} MB read")
+    print(f"Following: {followed:.3f}s, {follower.bytes_read / 1e3:,.1f} KB read ({reread / followed:.0f}x faster)")
+
+    # --- Clean up ---
+    for name in (log_name, log_name + ".1", state_name):
+        os.remove(name)
+    print("\nRemoved the demo files.")
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Random access to any line of a (huge) text file with a line-offset index.
+
+read(), readline() loops and readlines() (see ../Read-File) all have to read
+the file from the beginning to find line number N. For a multi-GB log that
+means reading gigabytes to show one line.
+
+A line index fixes that. We scan the file once and remember where every
+line starts (its byte offset) in a compact array('Q') - 8 bytes per line.
+After that, line N is one seek() and one small read() away. The index is
+saved next to the file ('app.log' -> 'app.log.lineidx'), so the next program
+that opens the file doesn't have to scan it again.
+
+Log files usually only grow. When the file got longer since the index was
+saved, only the new part is scanned and the new offsets are appended to the
+saved index instead of rewriting it.
+
+This script demonstrates:
+1.  Building and saving an index for a log file.
+2.  get_line(n), line ranges and line counts without rescanning.
+3.  Appending to the file ('a' mode) and updating the index incrementally.
+4.  How much faster this is than reading up to line N.
+"""
+
+import array
+import itertools
+import os
+import struct
+import sys
+import time
+import zlib
+
+# --- The index file format ---
+# A fixed-size header followed by the offsets, little-endian:
+#   magic, version, inode of the text file, bytes of the file indexed,
+#   its modification time (ns), number of offsets, CRC32 of the last
+#   indexed bytes.
+# The inode, the time and the CRC tell us whether the file is still the one
+# we indexed (and has only grown) or was replaced or rewritten.
+INDEX_SUFFIX = ".lineidx"
+_HEADER = struct.Struct("<4sHxxQQQQI")
+_MAGIC = b"LIDX"
+_VERSION = 2
+_TAIL_BYTES = 4096  # how much of the indexed end the CRC covers
+_CHUNK_SIZE = 1 << 20  # read 1 MiB at a time while scanning
+
+
+def _plus_one(n):
+    return n + 1
+
+
+class LineIndex:
+    """
+    Byte offsets of the line starts of a text file, for O(1) access to line N.
+
+    Lines are numbered from 0, like list items, and are returned as str with
+    their line ending, like readline() returns them.
+
+    Args:
+        path (str): The text file.
+        index_path (str | None): Where the index is saved; defaults to the
+            file name plus '.lineidx'.
+        encoding (str): Used to decode lines.
+
+    Usage:
+        with LineIndex('app.log') as index:
+            print(len(index), index.get_line(5_000_000))
+    """
+
+    def __init__(self, path, index_path=None, encoding="utf-8"):
+        self.path = path
+        self.index_path = index_path or path + INDEX_SUFFIX
+        self.encoding = encoding
+        # starts[i] is the offset of line i. The last entry may equal the
+        # indexed size: that's where the next line will start once text is appended.
+        self.starts = array.array("Q", [0])
+        self.indexed_size = 0
+        self._tail = 0  # CRC32 of the last _TAIL_BYTES indexed bytes
+        self._inode = 0
+        self._mtime = 0  # st_mtime_ns of the file when it was indexed
+        self._saved_count = 0  # offsets already in the index file
+        self._file = open(path, "rb")
+        self.loaded_from_disk = self._load()
+        self.refresh()
+
+    # --- Reading lines ---
+
+    def __len__(self):
+        """The number of lines (a last line without '\\n' counts too)."""
+        count = len(self.starts)
+        if self.starts[-1] == self.indexed_size:
+            count -= 1
+        return count
+
+    def _line_span(self, n):
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f"line {n} out of range (file has {len(self)} lines)")
+        start = self.starts[n]
+        end = self.starts[n + 1] if n + 1 < len(self.starts) else self.indexed_size
+        return start, end
+
+    def get_line(self, n):
+        """Returns line `n` (0-based; negative counts from the end)."""
+        start, end = self._line_span(n)
+        self._file.seek(start)
+        return self._file.read(end - start).decode(self.encoding)
+
+    def get_lines(self, start, stop):
+        """Returns lines start..stop-1 as a list, with a single read."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        first, _ = self._line_span(start)
+        _, last = self._line_span(stop - 1)
+        self._file.seek(first)
+        data = self._file.read(last - first)
+        # Cut at our own offsets: str.splitlines() would also split at '\r',
+        # form feeds and other characters that don't end a line here.
+        bounds = [offset - first for offset in self.starts[start:stop]] + [last - first]
+        return [data[a:b].decode(self.encoding) for a, b in zip(bounds, bounds[1:])]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("line slices do not support a step")
+            return self.get_lines(item.start, item.stop)
+        return self.get_line(item)
+
+    # --- Building and updating ---
+
+    def _scan(self, start):
+        """Adds the line starts found from byte `start` to the end of the file."""
+        self._file.seek(start)
+        base = start
+        while True:
+            chunk = self._file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+            # Every '\n' ends a line and the next one starts right after it.
+            # Splitting and adding up the lengths runs in C, which is several
+            # times faster than a find() loop in Python.
+            lengths = map(_plus_one, map(len, chunk.split(b"\n")[:-1]))
+            self.starts.extend(itertools.islice(itertools.accumulate(lengths, initial=base), 1, None))
+            base += len(chunk)
+        self.indexed_size = base
+        self._tail = self._tail_crc(base)
+
+    def _tail_crc(self, size):
+        self._file.seek(max(0, size - _TAIL_BYTES))
+        return zlib.crc32(self._file.read(min(size, _TAIL_BYTES)))
+
+    def rebuild(self):
+        """Scans the whole file again."""
+        self.starts = array.array("Q", [0])
+        self._saved_count = 0
+        stat = os.fstat(self._file.fileno())
+        self._inode, self._mtime = stat.st_ino, stat.st_mtime_ns
+        self._scan(0)
+
+    def refresh(self):
+        """
+        Brings the index up to date with the file.
+
+        Returns:
+            str: 'unchanged', 'appended' (only the new bytes were scanned)
+            or 'rebuilt' (the file was replaced, truncated or rewritten).
+        """
+        stat = os.stat(self.path)
+        if stat.st_ino != self._inode:
+            # The file was replaced (e.g. by log rotation): open the new one.
+            self._file.close()
+            self._file = open(self.path, "rb")
+            self.rebuild()
+            return "rebuilt"
+        # The tail's CRC is checked in every case: a file rewritten in place
+        # may have the same size. Appending changes the time, so it only
+        # counts when the size is the same as well.
+        if (stat.st_size < self.indexed_size or self._tail_crc(self.indexed_size) != self._tail
+                or (stat.st_size == self.indexed_size and stat.st_mtime_ns != self._mtime)):
+            self.rebuild()
+            return "rebuilt"
+        if stat.st_size == self.indexed_size:
+            return "unchanged"
+        self._mtime = stat.st_mtime_ns
+        self._scan(self.indexed_size)
+        return "appended"
+
+    # --- Saving and loading ---
+
+    def _load(self):
+        try:
+            f = open(self.index_path, "rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return False
+            magic, version, inode, size, mtime, count, crc = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION or count == 0:
+                return False
+            starts = array.array("Q")
+            try:
+                starts.fromfile(f, count)
+            except EOFError:
+                return False
+        if sys.byteorder == "big":
+            starts.byteswap()
+        self.starts, self.indexed_size, self._inode, self._saved_count = starts, size, inode, count
+        self._mtime, self._tail = mtime, crc
+        return True
+
+    def save(self):
+        """
+        Writes the index next to the file.
+
+        If the saved index is a prefix of this one (the file only grew), the
+        new offsets are appended and the header is rewritten; otherwise the
+        whole index is written to a temporary file that replaces the old one.
+        """
+        header = _HEADER.pack(_MAGIC, _VERSION, self._inode, self.indexed_size, self._mtime, len(self.starts),
+                              self._tail)
+        new = self.starts[self._saved_count:]
+        if sys.byteorder == "big":
+            new.byteswap()
+
+        if self._saved_count and os.path.exists(self.index_path):
+            with open(self.index_path, "r+b") as f:
+                # Offsets first, header last: if we crash in between, the old
+                # header still describes a valid (shorter) index.
+                f.seek(_HEADER.size + self._saved_count * self.starts.itemsize)
+                new.tofile(f)
+                f.truncate()
+                f.flush()
+                f.seek(0)
+                f.write(header)
+        else:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(header)
+                new.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        self._saved_count = len(self.starts)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_line_by_scanning(path, n, encoding="utf-8"):
+    """Reads line `n` the usual way, by reading every line before it."""
+    with open(path, "r", encoding=encoding) as f:
+        for number, line in enumerate(f):
+            if number == n:
+                return line
+    raise IndexError(n)
+
+
+if __name__ == "__main__":
+    filename = "app.log"
+    line_total = 200_000
+
+    # --- 1. Create a log file and index it ---
+    print("--- 1. Building the index ---")
+    with open(filename, "w", encoding="utf-8") as f:
+        for i in range(line_total):
+            f.write(f"2024-05-01 12:{i // 60 % 60:02d}:{i % 60:02d} INFO request {i} handled in {i % 97} ms\n")
+    print(f"Wrote {line_total} lines ({os.path.getsize(filename) / 1e6:.1f} MB) to '{filename}'.")
+
+    start = time.perf_counter()
+    with LineIndex(filename) as index:
+        index.save()
+    print(f"Indexed {len(index)} lines in {time.perf_counter() - start:.3f}s; "
+          f"index file is {os.path.getsize(filename + INDEX_SUFFIX) / 1e6:.1f} MB (8 bytes per line).")
+
+    # --- 2. Random access without rescanning ---
+    print("\n--- 2. Reading lines by number ---")
+    start = time.perf_counter()
+    index = LineIndex(filename)  # loads the saved index, no scan
+    print(f"Loaded the saved index: {index.loaded_from_disk} ({(time.perf_counter() - start) * 1000:.2f} ms)")
+    print(f"Line count: {len(index)}")
+    print(f"get_line(0):       {index.get_line(0)!r}")
+    print(f"get_line(150_000): {index.get_line(150_000)!r}")
+    print(f"get_line(-1):      {index.get_line(-1)!r}")
+    print(f"Lines 10..12:      {index[10:13]}")
+
+    # --- 3. Appending ('a' mode) and incremental updates ---
+    print("\n--- 3. Appending to the file ---")
+    with open(filename, "a", encoding="utf-8") as f:
+        f.write("2024-05-01 13:00:00 WARN disk almost full\n")
+        f.write("2024-05-01 13:00:01 ERROR disk full")  # no newline yet
+    print(f"refresh() -> {index.refresh()!r}, line count now {len(index)}")
+    print(f"Last line: {index.get_line(-1)!r}")
+    with open(filename, "a", encoding="utf-8") as f:
+        f.write(" (retrying)\n")
+    print(f"refresh() -> {index.refresh()!r}, line count still {len(index)}")
+    print(f"Last line: {index.get_line(-1)!r}")
+    index.save()  # appends the new offsets to the index file
+    index.close()
+
+    with LineIndex(filename) as reloaded:
+        print(f"Reloaded index has {len(reloaded)} lines, same as before: {len(reloaded) == len(index)}")
+
+    # Rewriting the file is detected and the index is rebuilt.
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("a fresh log\n")
+    with LineIndex(filename) as rewritten:
+        print(f"After rewriting the file: {len(rewritten)} line(s): {rewritten[0]!r}")
+
+    # --- 4. Index vs. scanning ---
+    print("\n--- 4. Index vs. scanning to line N ---")
+    with open(filename, "w", encoding="utf-8") as f:
+        for i in range(line_total):
+            f.write(f"line {i}\n")
+    with LineIndex(filename) as index:
+        target = line_total - 1
+        start = time.perf_counter()
+        scanned = read_line_by_scanning(filename, target)
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        indexed = index.get_line(target)
+        index_time = time.perf_counter() - start
+        print(f"Scanning to line {target}: {scan_time * 1000:.2f} ms")
+        print(f"Index lookup:              {index_time * 1000:.3f} ms (same line: {scanned == indexed})")
+
+    # --- Clean up ---
+    os.remove(filename)
+    os.remove(filename + INDEX_SUFFIX)
+    print("\nRemoved the demo files.")
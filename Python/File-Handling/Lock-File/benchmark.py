@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Stress test for LockFile and claim_job (source.py): N processes race for
+the same files at the same time.
+
+    lock    Every process takes the same LockFile, increments a counter file
+            inside the lock, releases it, and starts over, for --duration
+            seconds. A lost update would show that two processes held the
+            lock at once.
+    claim   --jobs jobs are claimed by N processes that each try all of
+            them, in their own random order. Every job must be claimed
+            exactly once.
+
+For both it reports the throughput and how fairly the work was spread:
+the fewest and most per process, and Jain's fairness index (1.0 = all
+processes got the same share, 1/N = one process got everything). For
+'lock' it also reports how long processes waited for the lock.
+
+Usage:
+    python benchmark.py                         # 64 processes, both scenarios
+    python benchmark.py --processes 16 --duration 5 --hold 0.001
+    python benchmark.py --scenario claim --jobs 50000 --dir /mnt/shared
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from source import LockFile, claim_job
+
+
+def jain_index(counts):
+    """(sum x)^2 / (n * sum x^2): 1.0 when every process got the same share."""
+    squares = sum(count * count for count in counts)
+    return sum(counts) ** 2 / (len(counts) * squares) if squares else 0.0
+
+
+def lock_worker(directory, duration, hold, barrier, results):
+    lock = LockFile(os.path.join(directory, "bench.lock"), stale_after=60)
+    counter = os.path.join(directory, "counter")
+    waits, attempts = [], 0
+    barrier.wait()
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        start = time.perf_counter()
+        lock.acquire()
+        waits.append(time.perf_counter() - start)
+        attempts += lock.attempts
+        # Read-modify-write without any other protection: only correct if
+        # nobody else is inside the lock at the same time.
+        with open(counter, "r+") as f:
+            value = int(f.read() or 0)
+            f.seek(0)
+            f.write(str(value + 1))
+            f.truncate()
+        if hold:
+            time.sleep(hold)
+        lock.release()
+    results.put((len(waits), attempts, waits))
+
+
+def claim_worker(directory, jobs, barrier, results):
+    order = random.sample(range(jobs), jobs)
+    barrier.wait()
+    start = time.perf_counter()
+    claimed = [job for job in order if claim_job(directory, job)]
+    results.put((claimed, time.perf_counter() - start))
+
+
+def run_workers(processes, target, args):
+    context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    barrier = context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=target, args=(*args, barrier, results)) for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()  # everybody starts at the same moment
+    start = time.perf_counter()
+    collected = [results.get() for _ in workers]
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    return collected, elapsed
+
+
+def bench_lock(directory, processes, duration, hold):
+    with open(os.path.join(directory, "counter"), "w") as f:
+        f.write("0")
+    results, elapsed = run_workers(processes, lock_worker, (directory, duration, hold))
+    counts = [count for count, _, _ in results]
+    waits = sorted(wait for _, _, worker_waits in results for wait in worker_waits)
+    with open(os.path.join(directory, "counter")) as f:
+        counter = int(f.read())
+    total = sum(counts)
+    print(f"lock:  {total} acquisitions in {elapsed:.2f}s = {total / elapsed:.0f}/s, "
+          f"{sum(attempts for _, attempts, _ in results) / max(total, 1):.1f} attempts each")
+    print(f"       per process: min {min(counts)}, max {max(counts)}, Jain's fairness index {jain_index(counts):.3f}")
+    if waits:
+        print(f"       wait for the lock: median {statistics.median(waits) * 1000:.2f} ms, "
+              f"p99 {waits[min(len(waits) - 1, math.ceil(len(waits) * 0.99) - 1)] * 1000:.2f} ms, max {waits[-1] * 1000:.2f} ms")
+    print(f"       counter = {counter}: {'no lost updates' if counter == total else 'LOST UPDATES'}")
+
+
+def bench_claim(directory, processes, jobs):
+    results, elapsed = run_workers(processes, claim_worker, (directory, jobs))
+    counts = [len(claimed) for claimed, _ in results]
+    all_claims = sorted(job for claimed, _ in results for job in claimed)
+    print(f"claim: {jobs} jobs in {elapsed:.2f}s = {jobs / elapsed:.0f} claims/s, "
+          f"{processes * jobs / elapsed:.0f} attempts/s")
+    print(f"       per process: min {min(counts)}, max {max(counts)}, Jain's fairness index {jain_index(counts):.3f}")
+    print(f"       every job claimed exactly once: {all_claims == list(range(jobs))}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stress test LockFile and claim_job with many processes.")
+    parser.add_argument("--processes", type=int, default=64, help="processes racing (default: 64)")
+    parser.add_argument("--scenario", choices=("lock", "claim", "both"), default="both")
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds for 'lock' (default: 3)")
+    parser.add_argument("--hold", type=float, default=0.0, help="seconds to hold the lock each time (default: 0)")
+    parser.add_argument("--jobs", type=int, default=10_000, help="jobs for 'claim' (default: 10000)")
+    parser.add_argument("--dir", help="directory for the lock and claim files (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="lock-benchmark-", dir=args.dir)
+    try:
+        print(f"{args.processes} processes, files in {directory}")
+        if args.scenario in ("lock", "both"):
+            bench_lock(directory, args.processes, args.duration, args.hold)
+        if args.scenario in ("claim", "both"):
+            bench_claim(directory, args.processes, args.jobs)
+    finally:
+        shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Lock files and job claiming between processes with O_CREAT | O_EXCL.
+
+Create-File shows open(..., 'x') raising FileExistsError. It first checks
+os.path.exists() and calls os.remove(): between that check and the open(),
+another process may create or delete the file. 'x' mode itself has no such
+gap. It asks the operating system for O_CREAT | O_EXCL, which creates the
+file only if it doesn't exist, as one atomic step. Of any number of
+processes trying at the same moment, exactly one succeeds.
+
+That makes the file a lock that works between processes:
+- acquire: create the lock file with O_EXCL and write who we are into it;
+- release: delete it.
+
+Two problems remain, and LockFile handles both:
+- A process that dies while holding the lock never deletes it. The lock is
+  "stale": its owner no longer exists (same machine) or it hasn't been
+  refreshed for `stale_after` seconds. Stale locks are removed, carefully,
+  so that two processes don't both remove it and both think they got it.
+- Processes that find the lock taken retry after a randomized, growing
+  pause (exponential backoff with jitter). Retrying at once would keep the
+  CPU busy; retrying at fixed intervals makes waiters collide again and again.
+
+This script demonstrates:
+1.  Exclusive creation and why exists() + open() is a race.
+2.  LockFile: acquire, release, timeouts.
+3.  Detecting and breaking a stale lock.
+4.  Claiming jobs from several processes.
+"""
+
+import json
+import os
+import random
+import socket
+import time
+import uuid
+
+DEFAULT_STALE_AFTER = 30.0  # seconds without a refresh before a lock is stale
+BACKOFF_START = 0.0005  # first pause between attempts, in seconds
+BACKOFF_MAX = 0.05  # longest pause between attempts
+STALE_CHECK_INTERVAL = 0.1  # how often a waiter looks for a stale lock
+BREAK_SUFFIX = ".break"
+
+_HOST = socket.gethostname()
+
+
+def exclusive_create(path, data=b""):
+    """
+    Creates `path` only if it doesn't exist yet, and writes `data` into it.
+
+    Returns:
+        bool: True if we created the file, False if it already existed.
+    """
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    except FileExistsError:
+        return False
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    return True
+
+
+def _read_owner(path):
+    """The owner information in a lock file; None if it is missing, {} if unreadable."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    try:
+        return json.loads(data)
+    except ValueError:
+        return {}  # empty or half-written: the owner is still writing, or died doing it
+
+
+def _process_alive(pid):
+    if os.name == "nt":
+        return _windows_process_alive(pid)
+    try:
+        os.kill(pid, 0)  # signal 0 checks that the process exists
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, but belongs to another user
+    except OSError:
+        return True  # can't tell: assume it is alive
+    return True
+
+
+def _windows_process_alive(pid):
+    # On Windows, os.kill(pid, 0) doesn't check anything: signal 0 is
+    # CTRL_C_EVENT, which would interrupt the owner's whole process group.
+    import ctypes
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.restype = ctypes.c_void_p
+    kernel32.GetExitCodeProcess.argtypes = (ctypes.c_void_p, ctypes.POINTER(ctypes.c_ulong))
+    kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+    process_query_limited_information, still_active, error_invalid_parameter = 0x1000, 259, 87
+    handle = kernel32.OpenProcess(process_query_limited_information, False, pid)
+    if not handle:
+        # No such process; any other error (access denied): assume it is alive.
+        return ctypes.get_last_error() != error_invalid_parameter
+    try:
+        code = ctypes.c_ulong()
+        if not kernel32.GetExitCodeProcess(handle, ctypes.byref(code)):
+            return True
+        return code.value == still_active  # otherwise it exited, someone just holds a handle
+    finally:
+        kernel32.CloseHandle(handle)
+
+
+class LockFile:
+    """
+    A lock between processes, held as long as the lock file exists.
+
+    Args:
+        path (str): The lock file, e.g. 'job-17.lock'.
+        stale_after (float): Seconds after which a lock that wasn't refreshed
+            is considered abandoned. Long holders call refresh() in between.
+        timeout (float | None): How long acquire() waits by default; None
+            waits forever.
+
+    Attributes:
+        attempts (int): How many times the last acquire() tried to create the file.
+        broken (int): How many stale locks this object has removed.
+
+    Usage:
+        with LockFile('reports.lock', timeout=10):
+            build_reports()
+    """
+
+    def __init__(self, path, stale_after=DEFAULT_STALE_AFTER, timeout=None):
+        self.path = path
+        self.stale_after = stale_after
+        self.timeout = timeout
+        self.token = None  # set while we hold the lock
+        self.attempts = 0
+        self.broken = 0
+
+    @property
+    def locked(self):
+        return self.token is not None
+
+    # --- Acquiring ---
+
+    def acquire(self, blocking=True, timeout=None):
+        """
+        Takes the lock.
+
+        Args:
+            blocking (bool): False makes a single attempt.
+            timeout (float | None): Overrides the timeout given to __init__.
+
+        Returns:
+            bool: True once we hold the lock; False if it is taken and we
+            don't block.
+
+        Raises:
+            TimeoutError: If the lock wasn't free within the timeout.
+        """
+        if self.token is not None:
+            raise RuntimeError(f"{self.path} is already held by this LockFile")
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pause = BACKOFF_START
+        next_stale_check = 0.0
+        self.attempts = 0
+        token = uuid.uuid4().hex
+        owner = json.dumps({"pid": os.getpid(), "host": _HOST, "token": token, "created": time.time()}).encode()
+        while True:
+            self.attempts += 1
+            if exclusive_create(self.path, owner):
+                self.token = token
+                return True
+            # Reading and checking the owner costs far more than an attempt,
+            # so waiters only do it now and then.
+            if time.monotonic() >= next_stale_check:
+                next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+                if self._break_if_stale():
+                    continue  # try again at once
+            if not blocking:
+                return False
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"could not lock {self.path} within {timeout} seconds")
+            # Full jitter: a random pause up to the current limit, which doubles
+            # every time. Waiters spread out instead of retrying in lockstep.
+            sleep = random.uniform(0, pause)
+            if deadline is not None:
+                sleep = min(sleep, max(0.0, deadline - time.monotonic()))
+            time.sleep(sleep)
+            pause = min(pause * 2, BACKOFF_MAX)
+
+    # --- Stale locks ---
+
+    def is_stale(self, owner=None):
+        """True if the current lock file's owner is gone or stopped refreshing it."""
+        owner = _read_owner(self.path) if owner is None else owner
+        if owner is None:
+            return False  # no lock at all
+        try:
+            age = time.time() - os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if owner.get("host") == _HOST and "pid" in owner:
+            if not _process_alive(owner["pid"]):
+                return True
+        return age > self.stale_after
+
+    def _break_if_stale(self):
+        """
+        Removes the lock file if it is stale. Returns True if it did.
+
+        Checking and deleting are two steps. If two waiters both saw the stale
+        lock, the second could delete the fresh lock the first one just
+        created. So breaking a lock needs a lock of its own: only the holder of
+        'path.break' may delete, and it checks again that the lock file is the
+        same stale one it saw.
+        """
+        owner = _read_owner(self.path)
+        if owner is None or not self.is_stale(owner):
+            return False
+        guard = self.path + BREAK_SUFFIX
+        if not exclusive_create(guard, str(os.getpid()).encode()):
+            # Someone else is breaking it. If they died doing that, the guard
+            # itself goes stale after a while.
+            try:
+                if time.time() - os.stat(guard).st_mtime > self.stale_after:
+                    os.remove(guard)
+            except FileNotFoundError:
+                pass
+            return False
+        try:
+            current = _read_owner(self.path)
+            if current == owner and self.is_stale(current):
+                os.remove(self.path)
+                self.broken += 1
+                return True
+            return False
+        finally:
+            os.remove(guard)
+
+    # --- Holding and releasing ---
+
+    def refresh(self):
+        """Tells other processes we are still alive (for locks held longer than stale_after)."""
+        self._check_owner()
+        os.utime(self.path)
+
+    def _check_owner(self):
+        if self.token is None:
+            raise RuntimeError(f"{self.path} is not held by this LockFile")
+        owner = _read_owner(self.path)
+        if not owner or owner.get("token") != self.token:
+            self.token = None
+            raise RuntimeError(f"{self.path} was broken as stale by another process")
+
+    def release(self):
+        """Deletes the lock file, after checking that it is still ours."""
+        self._check_owner()
+        os.remove(self.path)
+        self.token = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+def claim_job(claims_dir, job_id):
+    """
+    Claims job `job_id` for this process. Only one process ever gets True.
+
+    Claims are never released: the claim file records who took the job.
+    """
+    owner = {"pid": os.getpid(), "host": _HOST, "claimed": time.time()}
+    return exclusive_create(os.path.join(claims_dir, f"{job_id}.claim"), json.dumps(owner).encode())
+
+
+def _claim_worker(claims_dir, jobs):
+    """Claims as many of `jobs` as it can; returns the ids it got (used by demo 4)."""
+    return [job for job in jobs if claim_job(claims_dir, job)]
+
+
+def _die_holding_lock(path):
+    """Takes the lock at `path` and exits without releasing it (used by demo 3)."""
+    LockFile(path).acquire()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    import shutil
+
+    lock_name = "demo.lock"
+
+    # --- 1. Exclusive creation ---
+    print("--- 1. Exclusive creation ---")
+    print(f"First exclusive_create():  {exclusive_create(lock_name, b'first')}")
+    print(f"Second exclusive_create(): {exclusive_create(lock_name, b'second')}")
+    with open(lock_name, "rb") as f:
+        print(f"Content: {f.read()!r} (the second call didn't touch the file)")
+    os.remove(lock_name)
+    # The racy way: another process can create the file between the check and
+    # the open(), and then both think they created it.
+    #     if not os.path.exists(lock_name):
+    #         with open(lock_name, "w") as f: ...
+
+    # --- 2. Acquire, release, timeouts ---
+    print("\n--- 2. LockFile ---")
+    lock = LockFile(lock_name, timeout=0.2)
+    with lock:
+        print(f"Locked: {lock.locked}; lock file says {_read_owner(lock_name)['pid']} (our pid: {os.getpid()})")
+        other = LockFile(lock_name)
+        print(f"Non-blocking attempt from another LockFile: {other.acquire(blocking=False)}")
+        start = time.perf_counter()
+        try:
+            other.acquire(timeout=0.1)
+        except TimeoutError as e:
+            print(f"{e} (waited {time.perf_counter() - start:.2f}s, {other.attempts} attempts)")
+    print(f"After the with block the file exists: {os.path.exists(lock_name)}")
+
+    # --- 3. Stale locks ---
+    print("\n--- 3. Stale locks ---")
+    # A child process takes the lock and dies without releasing it.
+    context = multiprocessing.get_context("fork" if hasattr(os, "fork") else "spawn")
+    child = context.Process(target=_die_holding_lock, args=(lock_name,))
+    child.start()
+    child.join()
+    dead_pid = _read_owner(lock_name)["pid"]
+    waiter = LockFile(lock_name, timeout=1)
+    print(f"Lock left behind by process {dead_pid}; stale: {waiter.is_stale()}")
+    with waiter:
+        print(f"Acquired after breaking {waiter.broken} stale lock(s), in {waiter.attempts} attempts")
+
+    # --- 4. Claiming jobs from several processes ---
+    print("\n--- 4. Claiming 200 jobs from 8 processes ---")
+    claims_dir = "claims"
+    os.makedirs(claims_dir, exist_ok=True)
+    jobs = list(range(200))
+    with context.Pool(8) as pool:
+        # Every worker tries every job, in its own random order.
+        orders = [random.sample(jobs, len(jobs)) for _ in range(8)]
+        claimed = pool.starmap(_claim_worker, [(claims_dir, order) for order in orders])
+    all_claims = [job for worker_jobs in claimed for job in worker_jobs]
+    print(f"Jobs claimed per worker: {[len(worker_jobs) for worker_jobs in claimed]}")
+    print(f"Every job claimed exactly once: {sorted(all_claims) == jobs}")
+
+    # --- Clean up ---
+    shutil.rmtree(claims_dir)
+    print("\nRemoved the demo files.")
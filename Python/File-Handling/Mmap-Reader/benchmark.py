@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Compares MappedReader (source.py) with the four ways of reading a file shown
+in ../Read-File:
+
+    read        f.read()                 - the whole file as one str
+    readline    while line := f.readline()
+    readlines   f.readlines()            - a list of every line
+    iterate     for line in f
+
+and three ways of using MappedReader:
+
+    mmap-lines      text_lines()  - every line decoded to str
+    mmap-chunks     text_chunks() - 1 MiB str chunks
+    mmap-bytes      lines()       - memoryview lines, never decoded
+
+Every method reads the same UTF-8 file (mostly ASCII with some multi-byte
+characters), counts lines and characters (mmap-bytes only lines, as it
+never decodes), and runs in its own process so that its peak memory (max
+RSS) can be measured on its own.
+
+Usage:
+    python benchmark.py                     # 1 GB file in the temp directory
+    python benchmark.py --size-mb 100
+    python benchmark.py --file huge.log --methods iterate mmap-lines
+
+Warning: 'read' and 'readlines' need several times the file size in memory.
+Leave them out (--methods) on machines with less memory than that.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from source import MappedReader, peak_memory_mb
+
+METHODS = ("read", "readline", "readlines", "iterate", "mmap-lines", "mmap-chunks", "mmap-bytes")
+
+SAMPLE_LINES = (
+    "2024-05-01 12:00:00 INFO request handled, status 200, 12 ms\n",
+    "2024-05-01 12:00:01 WARN slow query on table 'orders', 870 ms\n",
+    "2024-05-01 12:00:02 INFO user 'naïve_café' logged in ☕\n",
+    "2024-05-01 12:00:03 ERROR upload failed for '🐍.png', retrying\n",
+)
+
+
+def create_file(path, size_mb):
+    block = "".join(SAMPLE_LINES * 1000).encode("utf-8")
+    target = size_mb * 1024 * 1024
+    with open(path, "wb") as f:
+        written = 0
+        while written < target:
+            f.write(block)
+            written += len(block)
+
+
+def run_method(method, path):
+    """Reads `path` with `method`; returns (lines, characters), characters None for mmap-bytes."""
+    lines = characters = 0
+    if method == "read":
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        lines, characters = content.count("\n"), len(content)
+    elif method == "readline":
+        with open(path, "r", encoding="utf-8") as f:
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                lines += 1
+                characters += len(line)
+    elif method == "readlines":
+        with open(path, "r", encoding="utf-8") as f:
+            all_lines = f.readlines()
+        lines, characters = len(all_lines), sum(map(len, all_lines))
+    elif method == "iterate":
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                characters += len(line)
+    elif method == "mmap-lines":
+        with MappedReader(path) as reader:
+            for line in reader.text_lines():
+                lines += 1
+                characters += len(line)
+    elif method == "mmap-chunks":
+        with MappedReader(path) as reader:
+            for chunk in reader.text_chunks():
+                lines += chunk.count("\n")
+                characters += len(chunk)
+    elif method == "mmap-bytes":
+        # Only bytes, no decoding, so there are no characters to count.
+        characters = None
+        with MappedReader(path) as reader:
+            for _ in reader.lines():
+                lines += 1
+    else:
+        raise ValueError(f"unknown method {method!r}")
+    return lines, characters
+
+
+def measure(method, path):
+    """Runs one method in a fresh process and returns its report."""
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", method, path],
+        capture_output=True, text=True,
+    )
+    if completed.returncode < 0:
+        # SIGKILL with no output is almost always the kernel's OOM killer.
+        return {"method": method, "error": f"killed by signal {-completed.returncode} (out of memory?)"}
+    if completed.returncode != 0:
+        return {"method": method, "error": (completed.stderr.strip().splitlines() or ["no output"])[-1]}
+    return json.loads(completed.stdout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MappedReader against the Read-File methods.")
+    parser.add_argument("--size-mb", type=int, default=1024, help="size of the generated file (default: 1024)")
+    parser.add_argument("--file", help="use this file instead of generating one")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--run", nargs=2, metavar=("METHOD", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run:
+        method, path = args.run
+        start = time.perf_counter()
+        lines, characters = run_method(method, path)
+        print(json.dumps({"method": method, "seconds": time.perf_counter() - start,
+                          "lines": lines, "characters": characters, "peak_mb": peak_memory_mb()}))
+        return 0
+
+    path = args.file
+    tmp_dir = None
+    if path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="mmap-benchmark-")
+        path = os.path.join(tmp_dir, "input.log")
+        print(f"Creating a {args.size_mb} MB file in {tmp_dir} ...")
+        create_file(path, args.size_mb)
+    size_mb = os.path.getsize(path) / 1024 / 1024
+
+    try:
+        # Read it once so every method starts with the file in the page cache.
+        with open(path, "rb") as f:
+            while f.read(1 << 24):
+                pass
+        print(f"{'method':<12} {'seconds':>8} {'MB/s':>8} {'peak MB':>8} {'lines':>10}")
+        for method in args.methods:
+            report = measure(method, path)
+            if "error" in report:
+                print(f"{method:<12} failed: {report['error']}")
+                continue
+            peak = f"{report['peak_mb']:.0f}" if report["peak_mb"] is not None else "-"
+            print(f"{method:<12} {report['seconds']:>8.2f} {size_mb / report['seconds']:>8.0f} {peak:>8} {report['lines']:>10}")
+    finally:
+        if tmp_dir is not None:
+            os.remove(path)
+            os.rmdir(tmp_dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
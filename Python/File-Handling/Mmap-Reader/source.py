@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Reading huge text files with a memory map, in constant memory.
+
+read() and readlines() (see ../Read-File) load the whole file into memory.
+On a file bigger than the machine's memory that ends with the process being
+killed. Iterating over the file object is safe, but every line is copied from
+the file's buffer into a new str object whether we need it or not.
+
+mmap maps the file into the process's address space: the file's bytes look
+like one big bytes object, but the operating system only loads the pages we
+touch, and can drop them again at any time because they are backed by the
+file. On top of that this script builds a reader that:
+- hands out lines or fixed-size chunks as memoryview slices of the map, so
+  nothing is copied until we decide to,
+- decodes UTF-8 lazily, only for the pieces we actually turn into str, and
+  never cuts a multi-byte character in half at a chunk boundary,
+- tells the operating system to drop the pages it has finished with, so the
+  memory used stays the same for a 1 MB or a 100 GB file.
+
+This script demonstrates:
+1.  Reading a file as memoryview chunks and as lines.
+2.  Lazy decoding and multi-byte characters at chunk boundaries.
+3.  Memory use staying flat while reading a large file.
+
+A benchmark against the four Read-File methods is in benchmark.py.
+"""
+
+import mmap
+import os
+import sys
+import time
+
+try:
+    import resource  # Unix only; used to show the memory use in the demo
+except ImportError:
+    resource = None
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# madvise() lets us give pages back; it is missing on Windows.
+_CAN_RELEASE = hasattr(mmap.mmap, "madvise") and hasattr(mmap, "MADV_DONTNEED")
+
+
+def utf8_boundary(data, end):
+    """
+    Moves `end` back to the start of the UTF-8 character it falls into.
+
+    In UTF-8 every byte of a multi-byte character after the first looks like
+    0b10xxxxxx. If data[end] is such a continuation byte, the character
+    started earlier and we step back (at most 3 bytes) to its first byte.
+    """
+    for back in range(4):  # a UTF-8 character is at most 4 bytes long
+        if end - back <= 0 or (data[end - back] & 0xC0) != 0x80:
+            return max(end - back, 0)
+    return end  # not valid UTF-8 here: cut anyway
+
+
+class MappedReader:
+    """
+    Reads a file through mmap as memoryview chunks or lines.
+
+    The views point into the mapping: they cost nothing to create, but they
+    are only valid while the reader is open. Turn the ones you keep into
+    bytes (bytes(view)) or str (str(view, 'utf-8')).
+
+    Args:
+        path (str): The file to read.
+        chunk_size (int): Bytes per chunk, and how often pages that have been
+            read are handed back to the operating system.
+        release (bool): Drop pages that were read (madvise(MADV_DONTNEED)).
+            Keeps memory flat; turn it off if you read the file several times.
+
+    Usage:
+        with MappedReader('huge.log') as reader:
+            for line in reader.text_lines():
+                ...
+    """
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE, release=True):
+        if chunk_size < 4:
+            raise ValueError("chunk_size must be at least 4 bytes (the longest UTF-8 character)")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.release = release and _CAN_RELEASE
+        self.size = os.path.getsize(path)
+        self._map = None
+        if self.size:
+            with open(path, "rb") as f:
+                # The map keeps its own reference to the file; we can close ours.
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(self._map, "madvise"):
+                # We read front to back: let the OS read ahead aggressively.
+                self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def _release(self, start, end):
+        """Gives the pages in [start, end) back to the operating system."""
+        if not self.release:
+            return
+        start -= start % mmap.PAGESIZE
+        end -= end % mmap.PAGESIZE
+        if end > start:
+            self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    # --- Chunks ---
+
+    def chunks(self, align_utf8=True):
+        """
+        Yields the file as memoryview slices of about chunk_size bytes.
+
+        Args:
+            align_utf8 (bool): End every chunk on a UTF-8 character boundary,
+                so each one can be decoded on its own.
+        """
+        if self._map is None:
+            return
+        view = memoryview(self._map)
+        position = released = 0
+        while position < self.size:
+            end = min(position + self.chunk_size, self.size)
+            if align_utf8 and end < self.size:
+                boundary = utf8_boundary(self._map, end)
+                if boundary > position:  # never an empty chunk, even for invalid UTF-8
+                    end = boundary
+            yield view[position:end]
+            position = end
+            if position - released >= self.chunk_size:
+                self._release(released, position)
+                released = position
+
+    def text_chunks(self, errors="strict"):
+        """Yields the file as str chunks; each one is decoded only when it is reached."""
+        for chunk in self.chunks(align_utf8=True):
+            yield str(chunk, "utf-8", errors)
+
+    # --- Lines ---
+
+    def lines(self):
+        """Yields every line as a memoryview, including its b'\\n'."""
+        if self._map is None:
+            return
+        data = self._map
+        view = memoryview(data)
+        find = data.find
+        position = released = 0
+        while position < self.size:
+            newline = find(b"\n", position)
+            end = self.size if newline == -1 else newline + 1
+            yield view[position:end]
+            position = end
+            if position - released >= self.chunk_size:
+                self._release(released, position)
+                released = position
+
+    def text_lines(self, errors="strict"):
+        """
+        Yields every line as str, including its '\\n'.
+
+        Decoding and splitting a whole chunk at a time runs in C; creating a
+        memoryview per line (lines()) and decoding each one separately is
+        about twice as slow. Only the part of a line that continues into the
+        next chunk is carried over.
+        """
+        carry = ""
+        for text in self.text_chunks(errors):
+            pieces = text.split("\n")
+            pieces[0] = carry + pieces[0]
+            carry = pieces.pop()
+            for piece in pieces:
+                yield piece + "\n"
+        if carry:
+            yield carry
+
+    # --- Closing ---
+
+    def close(self):
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A view handed out earlier is still alive (e.g. the loop
+                # variable of the last `for line in reader.lines()`). The map
+                # is closed once that view is gone.
+                pass
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def peak_memory_mb():
+    """The peak resident memory of this process in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def current_memory_mb():
+    """The current resident memory in MB (Linux only), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * mmap.PAGESIZE / 1024 / 1024
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    filename = "big_text.txt"
+
+    # --- 1. Chunks and lines as memoryviews ---
+    print("--- 1. Chunks and lines ---")
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write("Line 1: Hello Python!\nLine 2: Memory maps are fun.\nLine 3: No newline at the end")
+
+    with MappedReader(filename, chunk_size=16) as reader:
+        for chunk in reader.chunks():
+            print(f"chunk of {len(chunk):>2} bytes: {bytes(chunk)!r}")
+        for number, line in enumerate(reader.lines(), 1):
+            # A memoryview is not a copy; bytes() or str() makes one.
+            print(f"line {number}: {type(line).__name__} of {len(line)} bytes -> {str(line, 'utf-8')!r}")
+
+    # --- 2. Multi-byte characters at chunk boundaries ---
+    print("\n--- 2. Multi-byte characters ---")
+    text = "café ☕ naïve 🐍 " * 3
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(text)
+    # 7-byte chunks cut right through '☕' (3 bytes) and '🐍' (4 bytes)...
+    with MappedReader(filename, chunk_size=7) as reader:
+        raw = [bytes(chunk) for chunk in reader.chunks(align_utf8=False)]
+        aligned = list(reader.text_chunks())
+    broken = [piece for piece in raw if piece.decode("utf-8", "replace") != piece.decode("utf-8", "ignore")]
+    print(f"Unaligned 7-byte chunks that can't be decoded alone: {len(broken)} of {len(raw)}, e.g. {broken[0]!r}")
+    print(f"Aligned chunks (each decoded alone): {aligned[:4]}")
+    print(f"Joined text is unchanged: {''.join(aligned) == text}")
+
+    # --- 3. Memory stays flat ---
+    print("\n--- 3. Reading a larger file ---")
+    line = "2024-05-01 12:00:00 INFO request handled, status 200, user naïve ☕\n"
+    with open(filename, "w", encoding="utf-8") as f:
+        for _ in range(20):
+            f.write(line * 10_000)
+    size_mb = os.path.getsize(filename) / 1024 / 1024
+
+    start_memory = current_memory_mb()
+    start = time.perf_counter()
+    count = characters = 0
+    highest = start_memory or 0
+    with MappedReader(filename) as reader:
+        for text_line in reader.text_lines():
+            count += 1
+            characters += len(text_line)
+            if count % 50_000 == 0 and start_memory is not None:
+                highest = max(highest, current_memory_mb())
+    elapsed = time.perf_counter() - start
+    print(f"Read {count} lines, {characters} characters, {size_mb:.1f} MB in {elapsed:.3f}s")
+    if start_memory is not None:
+        print(f"Resident memory: {start_memory:.1f} MB before, at most {highest:.1f} MB while reading")
+
+    # --- Clean up ---
+    os.remove(filename)
+    print(f"\nRemoved '{filename}'.")
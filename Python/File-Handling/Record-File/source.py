@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+A random-access file of fixed-size binary records, built on seek() and tell().
+
+File-Methods (see ../../Methods/File-Methods) shows read(10), tell() and
+seek(0). With text those are of limited use: lines have different lengths,
+so we can't compute where line N starts. If every record has the same size,
+we can. Record N starts at
+
+    header size + N * record size
+
+so reading or updating record N is one seek() and one read() or write(),
+no matter how big the file is. Changing a counter or a status no longer
+means rewriting the whole file: only the few bytes of that record change.
+
+The records are packed with the struct module ('<I8sd' = a 4-byte unsigned
+int, 8 bytes of text, an 8-byte float), which gives every record exactly the
+same size. A small header at the start of the file stores the format, so the
+file describes itself.
+
+This script demonstrates:
+1.  Creating a record file and appending records in batches.
+2.  Reading and updating record N in place with seek().
+3.  Reading a range of records with a single read().
+4.  Updating in place vs. rewriting the whole file.
+"""
+
+import collections
+import os
+import struct
+
+_FORMAT_SIZE = 56  # bytes for the struct format in the header
+_HEADER = struct.Struct(f"<4sHH{_FORMAT_SIZE}s")  # magic, version, record size, struct format
+_MAGIC = b"RECF"
+_VERSION = 1
+APPEND_BATCH = 1024  # records collected before append() writes them
+
+
+class RecordFile:
+    """
+    Fixed-size binary records with O(1) read and update by record number.
+
+    Args:
+        path (str): The record file.
+        fmt (str | None): A struct format for one record, e.g. '<I8sd'.
+            Needed to create a file; for an existing file it must match the
+            stored format, or be None to use the stored one.
+        fields (str | list | None): Field names, e.g. 'id status score'.
+            Records are then returned as namedtuples instead of tuples.
+        create (bool): Create a new, empty file (overwriting an existing one).
+
+    Usage:
+        with RecordFile('jobs.rec', '<I8sd', 'id status seconds', create=True) as jobs:
+            jobs.append((1, b'queued', 0.0))
+            jobs.update(0, status=b'done')
+    """
+
+    def __init__(self, path, fmt=None, fields=None, create=False):
+        self.path = path
+        if create or not os.path.exists(path):
+            if fmt is None:
+                raise ValueError(f"{path} doesn't exist: a struct format is needed to create it")
+            self._struct = struct.Struct(fmt)
+            encoded = fmt.encode("ascii")
+            # Checked before the file is opened, so an existing file isn't
+            # truncated for nothing (the header would cut the format short).
+            if len(encoded) > _FORMAT_SIZE:
+                raise ValueError(f"struct format {fmt!r} is longer than {_FORMAT_SIZE} characters")
+            if self._struct.size > 0xFFFF:
+                raise ValueError(f"records of {self._struct.size} bytes are larger than 65535 bytes")
+            self._file = open(path, "w+b")
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, self._struct.size, encoded))
+        else:
+            self._file = open(path, "r+b")
+            magic, version, size, stored = _HEADER.unpack(self._file.read(_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"{path} is not a record file")
+            stored = stored.rstrip(b"\0").decode("ascii")
+            if fmt is not None and struct.Struct(fmt).format != stored:
+                raise ValueError(f"{path} holds records of format {stored!r}, not {fmt!r}")
+            self._struct = struct.Struct(stored)
+            if self._struct.size != size:
+                raise ValueError(f"{path}: stored record size {size} doesn't match {stored!r}")
+        self.record_size = self._struct.size
+        self._record = collections.namedtuple("Record", fields) if fields else None
+        # Records on disk. A crash in the middle of an append can leave part
+        # of a record at the end; it is ignored (and overwritten by the next append).
+        self._file.seek(0, os.SEEK_END)
+        self._count = (self._file.tell() - _HEADER.size) // self.record_size
+        self._pending = []  # appended records not yet written
+
+    @property
+    def format(self):
+        return self._struct.format
+
+    def __len__(self):
+        return self._count + len(self._pending)
+
+    def _offset(self, n):
+        """Where record `n` starts (negative numbers count from the end)."""
+        if n < 0:
+            n += len(self)
+        if not 0 <= n < len(self):
+            raise IndexError(f"record {n} out of range (file has {len(self)} records)")
+        if n >= self._count:
+            self.flush()  # it is still in the append buffer
+        return n, _HEADER.size + n * self.record_size
+
+    def _make(self, values):
+        return self._record._make(values) if self._record else values
+
+    # --- Reading ---
+
+    def read(self, n):
+        """Returns record `n`."""
+        _, offset = self._offset(n)
+        self._file.seek(offset)
+        return self._make(self._struct.unpack(self._file.read(self.record_size)))
+
+    def read_range(self, start, stop):
+        """Returns records start..stop-1 with a single read()."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return []
+        self._offset(stop - 1)  # flushes pending appends if needed
+        self._file.seek(_HEADER.size + start * self.record_size)
+        data = self._file.read((stop - start) * self.record_size)
+        return [self._make(values) for values in self._struct.iter_unpack(data)]
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item.step not in (None, 1):
+                raise ValueError("record slices do not support a step")
+            return self.read_range(item.start, item.stop)
+        return self.read(item)
+
+    def __iter__(self):
+        # A few thousand records per read(), not one read() per record.
+        for start in range(0, len(self), APPEND_BATCH * 4):
+            yield from self.read_range(start, start + APPEND_BATCH * 4)
+
+    # --- Writing ---
+
+    def write(self, n, record):
+        """Overwrites record `n` in place; nothing else in the file changes."""
+        _, offset = self._offset(n)
+        self._file.seek(offset)
+        self._file.write(self._struct.pack(*record))
+
+    def __setitem__(self, n, record):
+        self.write(n, record)
+
+    def update(self, n, **changes):
+        """Changes some fields of record `n` (needs field names): read, modify, write back."""
+        if self._record is None:
+            raise TypeError("update() needs field names; use write() for plain tuples")
+        record = self.read(n)._replace(**changes)
+        self.write(n, record)
+        return record
+
+    def append(self, record):
+        """Adds a record at the end. Appends are written in batches; returns the record number."""
+        self._pending.append(self._struct.pack(*record))
+        if len(self._pending) >= APPEND_BATCH:
+            self.flush()
+        return len(self) - 1
+
+    def extend(self, records):
+        """Appends many records."""
+        for record in records:
+            self.append(record)
+
+    def flush(self):
+        """Writes pending appends (one write() for the whole batch) and flushes the file."""
+        if self._pending:
+            self._file.seek(_HEADER.size + self._count * self.record_size)
+            self._file.write(b"".join(self._pending))
+            self._count += len(self._pending)
+            self._pending.clear()
+        self._file.flush()
+
+    def fsync(self):
+        """Flushes, then waits until the data is on disk."""
+        self.flush()
+        os.fsync(self._file.fileno())
+
+    # --- Closing ---
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            # Cut off a torn record left at the end by an earlier crash.
+            self._file.truncate(_HEADER.size + self._count * self.record_size)
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+if __name__ == "__main__":
+    import json
+    import time
+
+    filename = "jobs.rec"
+
+    # --- 1. Creating and appending ---
+    print("--- 1. Creating a record file ---")
+    # id (unsigned int), status (8 bytes), attempts (unsigned short), seconds (double)
+    with RecordFile(filename, "<I8sHd", "id status attempts seconds", create=True) as jobs:
+        for job_id in range(100_000):
+            jobs.append((job_id, b"queued", 0, 0.0))
+        print(f"{len(jobs)} records of {jobs.record_size} bytes each")
+    print(f"File size: {os.path.getsize(filename)} bytes "
+          f"(= {_HEADER.size} header + 100000 * {jobs.record_size})")
+
+    # --- 2. Random access and in-place updates ---
+    print("\n--- 2. Reading and updating record N ---")
+    with RecordFile(filename, fields="id status attempts seconds") as jobs:
+        print(f"Stored format: {jobs.format!r}")
+        print(f"jobs[70_000]: {jobs[70_000]}")
+        jobs.update(70_000, status=b"running", attempts=1)
+        jobs.update(70_000, status=b"done", seconds=12.5)
+        print(f"after update:  {jobs[70_000]}")
+        status = jobs[70_000].status.rstrip(b"\0").decode()  # struct pads 's' fields with NUL bytes
+        print(f"status text:   {status!r}")
+        print(f"last record:   {jobs[-1]}")
+
+    # --- 3. Ranges ---
+    print("\n--- 3. A range of records ---")
+    with RecordFile(filename, fields="id status attempts seconds") as jobs:
+        for record in jobs[69_999:70_002]:
+            print(f"  {record}")
+        done = sum(1 for record in jobs if record.status.startswith(b"done"))
+        print(f"Records with status 'done': {done}")
+
+    # --- 4. In place vs. rewriting the file ---
+    print("\n--- 4. 5 status updates: in place vs. rewriting a JSON file ---")
+    table = [{"id": i, "status": "queued", "attempts": 0, "seconds": 0.0} for i in range(100_000)]
+    with open("jobs.json", "w") as f:
+        f.write(json.dumps(table))
+
+    # The usual way: load the whole table, change one row, write it all back.
+    start = time.perf_counter()
+    for i in range(0, 100_000, 20_000):
+        with open("jobs.json") as f:
+            table = json.loads(f.read())
+        table[i]["status"] = "done"
+        with open("jobs.json", "w") as f:
+            f.write(json.dumps(table))
+    rewrite = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with RecordFile(filename, fields="id status attempts seconds") as jobs:
+        for i in range(0, 100_000, 20_000):
+            jobs.update(i, status=b"done")
+    in_place = time.perf_counter() - start
+    print(f"Rewriting the whole file: {rewrite:.3f}s")
+    print(f"In place with seek():     {in_place:.4f}s ({rewrite / in_place:.0f}x faster)")
+
+    # --- Clean up ---
+    os.remove(filename)
+    os.remove("jobs.json")
+    print("\nRemoved the demo files.")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Encodes a list of records that json can't encode by itself:
+
+    default chain     json.dumps(default=...) with the usual isinstance()
+                      chain, dataclasses.asdict() for dataclasses
+    encoder.default   json.dumps(default=encoder.default): TypeEncoder's
+                      lookup, but a new JSONEncoder for every call
+    TypeEncoder       TypeEncoder.dumps() from source.py
+
+Two payloads:
+
+    dicts         dicts with a datetime, a date, a Decimal, a UUID and a set
+    dataclasses   dataclass records holding the same values, with a
+                  nested dataclass
+
+Every method must produce the same JSON. Each method is run --repeat times
+and the best time is reported.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --records 500000 --repeat 5
+"""
+
+import argparse
+import dataclasses
+import datetime
+import json
+import sys
+import time
+import uuid
+from decimal import Decimal
+
+from source import TypeEncoder
+
+
+@dataclasses.dataclass
+class Sensor:
+    name: str
+    installed: datetime.date
+
+
+@dataclasses.dataclass
+class Reading:
+    id: uuid.UUID
+    timestamp: datetime.datetime
+    value: Decimal
+    tags: set
+    sensor: Sensor
+
+
+def default_chain(obj):
+    if isinstance(obj, datetime.datetime):
+        return obj.isoformat()
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def make_payload(kind, count):
+    records = []
+    for i in range(count):
+        reading = Reading(id=uuid.UUID(int=i), timestamp=datetime.datetime(2024, 5, 1, 12, i % 60, i % 60),
+                          value=Decimal(i) / 100, tags={"indoor"} if i % 2 else set(),
+                          sensor=Sensor(f"sensor{i % 50}", datetime.date(2021, 3, 1 + i % 28)))
+        if kind == "dicts":
+            records.append({"id": reading.id, "timestamp": reading.timestamp, "value": reading.value,
+                            "tags": reading.tags, "sensor": {"name": reading.sensor.name,
+                                                             "installed": reading.sensor.installed}})
+        else:
+            records.append(reading)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark type-dispatch JSON encoding.")
+    parser.add_argument("--records", type=int, default=100_000, help="records per payload (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per method; the best counts (default: 3)")
+    args = parser.parse_args(argv)
+
+    encoder = TypeEncoder()
+    methods = [
+        ("default chain", lambda payload: json.dumps(payload, default=default_chain)),
+        ("encoder.default", lambda payload: json.dumps(payload, default=encoder.default)),
+        ("TypeEncoder", encoder.dumps),
+    ]
+    print(f"{args.records:,} records, best of {args.repeat}")
+    print(f"{'payload':<12} {'method':<16} {'seconds':>8} {'records/s':>11}")
+    for kind in ("dicts", "dataclasses"):
+        payload = make_payload(kind, args.records)
+        reference = None
+        for label, dumps in methods:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                text = dumps(payload)
+                best = min(best, time.perf_counter() - start)
+            if reference is None:
+                reference = text
+            elif text != reference:
+                print(f"{kind} / {label}: different JSON", file=sys.stderr)
+                return 1
+            print(f"{kind:<12} {label:<16} {best:>8.3f} {args.records / best:>11,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Encoding types that json can't handle, quickly.
+
+The JSON tutorial (see ../JSON) shows that json.dumps() fails on a datetime:
+
+    TypeError: Object of type datetime is not JSON serializable
+
+The usual fix is a `default` function that json calls for every object it
+can't encode:
+
+    def default(obj):
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+        if isinstance(obj, datetime.date):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return str(obj)
+        ...
+        raise TypeError(...)
+
+With millions of values, this chain of isinstance() checks runs millions of
+times, and a value near the end of the chain pays for every check before it.
+
+TypeEncoder looks the handler up by the value's exact type instead: one
+dictionary lookup per value, however many types are registered. Types that
+aren't registered themselves (subclasses, dataclasses) are resolved once and
+the result is cached under their type, so the next value of that type is
+one lookup too.
+
+This script demonstrates:
+1.  Encoding datetime, date, Decimal, set, UUID and dataclass values.
+2.  Registering a handler for your own type.
+3.  Subclasses and unknown types.
+4.  Speed compared with json.dumps(default=...).
+"""
+
+import dataclasses
+import datetime
+import json
+import uuid
+from decimal import Decimal
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+# Handlers for common types. Each returns something json can encode; json
+# calls the encoder again for anything inside it (e.g. a datetime in a set).
+BUILTIN_HANDLERS = {
+    datetime.datetime: _isoformat,
+    datetime.date: _isoformat,
+    datetime.time: _isoformat,
+    Decimal: str,  # a string keeps every digit; float() would round
+    uuid.UUID: str,
+    set: list,
+    frozenset: list,
+    # No tuple: json writes tuples and namedtuples as arrays itself and never
+    # calls `default` for them.
+}
+
+
+def _dataclass_handler(cls):
+    """Returns a handler that turns instances of the dataclass `cls` into dicts."""
+    names = tuple(field.name for field in dataclasses.fields(cls))
+
+    # Not dataclasses.asdict(): that deep-copies every value. json visits
+    # the values itself and calls us again for nested dataclasses.
+    def handler(obj):
+        return {name: getattr(obj, name) for name in names}
+    return handler
+
+
+class TypeEncoder:
+    """
+    Encodes Python objects as JSON, with handlers looked up by exact type.
+
+    Args:
+        handlers (dict | None): {type: handler} to use instead of BUILTIN_HANDLERS.
+        **options: Passed to json.JSONEncoder: indent, sort_keys, ensure_ascii,
+            separators, ...
+
+    Usage:
+        encoder = TypeEncoder()
+        encoder.register(Money, lambda m: {"amount": str(m.amount), "currency": m.currency})
+        text = encoder.dumps(records)
+    """
+
+    def __init__(self, handlers=None, **options):
+        self._handlers = dict(BUILTIN_HANDLERS if handlers is None else handlers)
+        self._cache = dict(self._handlers)  # every type seen so far -> its handler
+        # One JSONEncoder for all calls; json.dumps(default=...) creates a
+        # new one every time.
+        self._encoder = json.JSONEncoder(default=self.default, **options)
+
+    def register(self, cls, handler):
+        """Encodes instances of `cls` (and of its subclasses without their own handler) with `handler`."""
+        self._handlers[cls] = handler
+        self._cache = dict(self._handlers)  # resolved subclasses may have a better match now
+
+    def _resolve(self, cls):
+        """Finds the handler for a type that isn't in the cache yet."""
+        if dataclasses.is_dataclass(cls):
+            handler = _dataclass_handler(cls)
+        else:
+            # The closest registered base class, e.g. datetime for pandas' Timestamp.
+            handler = next((self._handlers[base] for base in cls.__mro__ if base in self._handlers), None)
+            if handler is None:
+                raise TypeError(f"Object of type {cls.__name__} is not JSON serializable")
+        self._cache[cls] = handler
+        return handler
+
+    def default(self, obj):
+        """Called by json for every object it can't encode itself."""
+        try:
+            handler = self._cache[type(obj)]
+        except KeyError:
+            handler = self._resolve(type(obj))
+        return handler(obj)
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def dump(self, obj, file):
+        for chunk in self._encoder.iterencode(obj):
+            file.write(chunk)
+
+
+if __name__ == "__main__":
+    import time
+    from collections import namedtuple
+
+    @dataclasses.dataclass
+    class Sensor:
+        name: str
+        installed: datetime.date
+
+    @dataclasses.dataclass
+    class Reading:
+        id: uuid.UUID
+        timestamp: datetime.datetime
+        value: Decimal
+        tags: set
+        sensor: Sensor
+
+    # --- 1. Common types ---
+    print("--- 1. Common types ---")
+    encoder = TypeEncoder(indent=2)
+    reading = Reading(id=uuid.UUID("12345678-1234-5678-1234-567812345678"),
+                      timestamp=datetime.datetime(2023, 10, 27, 10, 0, tzinfo=datetime.timezone.utc),
+                      value=Decimal("21.50"), tags={"indoor"},
+                      sensor=Sensor("sensorA", datetime.date(2021, 3, 1)))
+    print(encoder.dumps(reading))
+    try:
+        json.dumps(reading)
+    except TypeError as error:
+        print("json.dumps() alone:", error)
+
+    # --- 2. Your own types ---
+    print("\n--- 2. Registering a handler ---")
+
+    class Money:
+        def __init__(self, amount, currency):
+            self.amount, self.currency = Decimal(amount), currency
+
+    encoder = TypeEncoder()
+    encoder.register(Money, lambda money: {"amount": str(money.amount), "currency": money.currency})
+    print(encoder.dumps({"price": Money("9.99", "EUR"), "point": namedtuple("Point", "x y")(1, 2)}))
+    print("(json writes tuples and namedtuples as arrays by itself)")
+
+    # --- 3. Subclasses and unknown types ---
+    print("\n--- 3. Subclasses and unknown types ---")
+
+    class Timestamp(datetime.datetime):  # like pandas.Timestamp
+        pass
+
+    print(encoder.dumps([Timestamp(2024, 5, 1, 12, 0)]), "<- uses the datetime handler")
+    try:
+        encoder.dumps({"value": complex(1, 2)})
+    except TypeError as error:
+        print("TypeError:", error)
+
+    # --- 4. Speed ---
+    print("\n--- 4. Speed: 20,000 dataclass records ---")
+
+    def default_chain(obj):
+        """The usual default function: isinstance() checks, one after another."""
+        if isinstance(obj, datetime.datetime):
+            return obj.isoformat()
+        if isinstance(obj, datetime.date):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return str(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if isinstance(obj, uuid.UUID):
+            return str(obj)
+        if dataclasses.is_dataclass(obj):
+            return dataclasses.asdict(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    records = [Reading(id=uuid.UUID(int=i), timestamp=datetime.datetime(2024, 5, 1, 12, i % 60),
+                       value=Decimal(i) / 100, tags={"indoor"} if i % 2 else set(),
+                       sensor=Sensor(f"sensor{i % 50}", datetime.date(2021, 3, 1 + i % 28)))
+               for i in range(20_000)]
+    encoder = TypeEncoder()
+    timings = {}
+    for label, dumps in (("json.dumps(default=...)", lambda: json.dumps(records, default=default_chain)),
+                         ("TypeEncoder.dumps()", lambda: encoder.dumps(records))):
+        start = time.perf_counter()
+        text = dumps()
+        timings[label] = (time.perf_counter() - start, text)
+        print(f"{label:<24} {timings[label][0]:.3f}s")
+    texts = [text for _, text in timings.values()]
+    print("Same JSON:", texts[0] == texts[1])
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Reads a JSON Lines file and counts the valid records:
+
+    json.loads      for line in f: json.loads(line), the usual loop
+    read_ndjson     read_ndjson() from source.py, one process
+    ordered xN      read_ndjson_parallel() with N processes, records in file order
+    unordered xN    the same with ordered=False
+    func xN         the same, with the check done in the workers (func=...),
+                    so that only the ids of valid records are sent back
+
+The file (--megabytes of records) is written once with NDJSONWriter, and
+once with json.dumps() per line to compare the writing time. Every method
+must find the same records.
+
+Sending a record from a worker process costs about as much as decoding it,
+so the parallel reader needs several CPU cores, and gains most when the
+workers send back less than they decode.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --megabytes 1000 --workers 2 4 8
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from source import CHUNK_SIZE, NDJSONWriter, _valid_ids, read_ndjson, read_ndjson_parallel
+
+
+def make_records(megabytes):
+    size, i = 0, 0
+    while size < megabytes * 1e6:
+        record = {"id": i, "timestamp": f"2024-05-01T12:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                  "user": f"user{i % 9973}", "data": [i % 7, i % 11, i % 13],
+                  "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}}
+        size += 130  # about the length of one line
+        i += 1
+        yield record
+
+
+def valid_ids(records):
+    """Returns (count, sum of ids) of the valid records; the same for every method."""
+    count = total = 0
+    for record in records:
+        if record["metadata"]["valid"]:
+            count += 1
+            total += record["id"]
+    return count, total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JSON Lines readers.")
+    parser.add_argument("--megabytes", type=int, default=200, help="file size (default: 200)")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4],
+                        help="process counts for the parallel reader (default: 2 4)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="bytes per task (default: 8 MiB)")
+    parser.add_argument("--dir", help="where to create the file (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="ndjson-benchmark-", dir=args.dir)
+    path = os.path.join(directory, "events.jsonl")
+    try:
+        start = time.perf_counter()
+        with NDJSONWriter(path) as writer:
+            writer.write_many(make_records(args.megabytes))
+        megabytes = os.path.getsize(path) / 1e6
+        print(f"{writer.count:,} records, {megabytes:.0f} MB written in {time.perf_counter() - start:.1f}s, "
+              f"{os.cpu_count()} CPUs")
+        start = time.perf_counter()
+        with open(os.path.join(directory, "dumps.jsonl"), "w", encoding="utf-8") as f:
+            for record in make_records(args.megabytes):
+                f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        print(f"the same with json.dumps() per line: {time.perf_counter() - start:.1f}s")
+        os.remove(f.name)
+        print(f"{'method':<16} {'seconds':>8} {'MB/s':>8} {'records/s':>11}")
+
+        def loads_per_line():
+            with open(path, encoding="utf-8") as f:
+                return valid_ids(json.loads(line) for line in f)
+
+        def parallel(workers, ordered):
+            return valid_ids(read_ndjson_parallel(path, workers, ordered, chunk_size=args.chunk_size))
+
+        def parallel_func(workers):
+            ids = list(read_ndjson_parallel(path, workers, func=_valid_ids, chunk_size=args.chunk_size))
+            return len(ids), sum(ids)
+
+        methods = [("json.loads", loads_per_line), ("read_ndjson", lambda: valid_ids(read_ndjson(path)))]
+        for workers in args.workers:
+            methods.append((f"ordered x{workers}", lambda workers=workers: parallel(workers, True)))
+            methods.append((f"unordered x{workers}", lambda workers=workers: parallel(workers, False)))
+            methods.append((f"func x{workers}", lambda workers=workers: parallel_func(workers)))
+        reference = None
+        for label, method in methods:
+            start = time.perf_counter()
+            result = method()
+            elapsed = time.perf_counter() - start
+            if reference is None:
+                reference = result
+            elif result != reference:
+                print(f"{label}: different records", file=sys.stderr)
+                return 1
+            print(f"{label:<16} {elapsed:>8.2f} {megabytes / elapsed:>8.0f} {writer.count / elapsed:>11,.0f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
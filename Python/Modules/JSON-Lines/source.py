@@ -0,0 +1,345 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Writing and reading JSON Lines (also called NDJSON): one JSON document per line.
+
+The JSON tutorial (see ../JSON) writes one document with json.dump(). Data
+pipelines usually write records as JSON Lines instead:
+
+    {"id":1,"timestamp":"2024-05-01T12:00:00Z","metadata":{"valid":true}}
+    {"id":2,"timestamp":"2024-05-01T12:00:01Z","metadata":{"valid":false}}
+
+Every line is a complete document, so a file can be appended to, read one
+record at a time, and - because a newline never appears inside a JSON
+document written without indent - cut into pieces at any newline. That last
+property lets us decode a large file on several CPU cores:
+
+    read_ndjson_parallel('events.jsonl', workers=8)
+
+splits the file into byte ranges of 8 MiB. Each process moves the start and
+end of its range to the next newline, so every line belongs to exactly one
+range, and decodes the lines. The records come back in file order, or with
+ordered=False, in the order the ranges finish.
+
+This script demonstrates:
+1.  Writing records with NDJSONWriter.
+2.  Reading them back with read_ndjson().
+3.  Reading in parallel, in order and unordered, with work done in the
+    worker processes.
+4.  Errors report the byte offset of the bad line.
+"""
+
+import collections
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+CHUNK_SIZE = 8 << 20  # bytes per parallel task
+_READ_SIZE = 1 << 20  # bytes read at a time by read_ndjson()
+_BATCH = 1000  # records NDJSONWriter collects before writing
+
+# The C scanner behind json.loads(). Calling it directly skips the Python
+# code json.loads() runs around it for every line (argument handling and two
+# regular expressions for whitespace), which is most of the cost for short lines.
+_scan_once = json.JSONDecoder().scan_once
+
+
+class NDJSONError(ValueError):
+    """A line that isn't valid JSON; `offset` is the byte offset of the line in the file."""
+
+    def __init__(self, message, offset):
+        super().__init__(f"{message} (line at byte {offset})")
+        self.message = message
+        self.offset = offset
+
+    def __reduce__(self):
+        # Errors are raised in worker processes and pickled back.
+        return self.__class__, (self.message, self.offset)
+
+
+class NDJSONWriter:
+    """
+    Writes records to a JSON Lines file, one compact JSON document per line.
+
+    Records are encoded as they come and written in batches, so a writer
+    can take millions of records from a generator without keeping them.
+
+    Args:
+        path (str): The file to write.
+        append (bool): Add to the end of an existing file instead of replacing it.
+        default (callable | None): Like json.dump(default=...), for types json can't encode.
+
+    Usage:
+        with NDJSONWriter('events.jsonl') as writer:
+            for event in events:
+                writer.write(event)
+    """
+
+    def __init__(self, path, append=False, default=None):
+        self._file = open(path, "a" if append else "w", encoding="utf-8", newline="\n")
+        # One encoder for all records: json.dumps() with any options creates
+        # a new JSONEncoder on every call.
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=default).encode
+        self._lines = []
+        self.count = 0
+
+    def write(self, record):
+        self._lines.append(self._encode(record))
+        self.count += 1
+        if len(self._lines) >= _BATCH:
+            self.flush()
+
+    def write_many(self, records):
+        for record in records:
+            self.write(record)
+
+    def flush(self):
+        if self._lines:
+            self._lines.append("")  # for the final '\n'
+            self._file.write("\n".join(self._lines))
+            self._lines.clear()
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _decode_lines(data, offset, func):
+    """
+    Yields the records of the lines in `data` (bytes that start at byte
+    `offset` of the file and end with complete lines), passed through `func`
+    if given. Blank lines are skipped.
+
+    A generator, so that each record can be dropped before the next one is
+    made: holding thousands of new dicts in a list makes the garbage
+    collector run again and again.
+    """
+    text = data.decode("utf-8")
+    for line in text.split("\n"):
+        try:
+            record, end = _scan_once(line, 0)
+            if end != len(line) and not line[end:].isspace():
+                raise ValueError
+        except (StopIteration, ValueError):
+            # Leading whitespace, a blank line, or an error: let json.loads()
+            # decide, with its error message.
+            if not line or line.isspace():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise NDJSONError(f"{error.msg}: column {error.colno}",
+                                  offset + _byte_offset(text, line)) from None
+        if func is not None:
+            record = func(record)
+            if record is None:
+                continue
+        yield record
+
+
+def _byte_offset(text, line):
+    """The byte offset of `line`, a whole line of `text`. Only needed for errors, so speed doesn't matter."""
+    start = text.find(line)
+    while start > 0 and text[start - 1] != "\n":
+        start = text.find(line, start + 1)
+    return len(text[:start].encode("utf-8"))
+
+
+def read_ndjson(path, func=None):
+    """
+    Yields the records of a JSON Lines file, one at a time.
+
+    The file is read in blocks of 1 MiB. Each block is decoded to text in
+    one call and split into lines.
+
+    Args:
+        path (str): The file to read.
+        func (callable | None): Applied to every record; records for which
+            it returns None are skipped. The same as in read_ndjson_parallel().
+
+    Usage:
+        for event in read_ndjson('events.jsonl'):
+            ...
+    """
+    offset = 0
+    rest = b""
+    with open(path, "rb") as f:
+        while block := f.read(_READ_SIZE):
+            block = rest + block
+            cut = block.rfind(b"\n") + 1  # up to the last complete line
+            rest = block[cut:]
+            yield from _decode_lines(block[:cut], offset, func)
+            offset += cut
+    if rest:
+        yield from _decode_lines(rest, offset, func)  # a last line without '\n'
+
+
+def _line_start(f, position):
+    """Returns the offset of the first line that starts at or after `position`."""
+    if position == 0:
+        return 0
+    f.seek(position - 1)
+    while True:
+        block = f.read(64 * 1024)
+        if not block:
+            return f.tell()
+        newline = block.find(b"\n")
+        if newline >= 0:
+            return f.tell() - len(block) + newline + 1
+        # A line longer than 64 KiB: keep looking.
+
+
+def _read_range(path, start, stop, func):
+    """
+    Decodes the lines that start in [start, stop) of the file. Runs in a
+    worker process. Every range moves both of its ends to a line start in
+    the same way, so neighbouring ranges meet exactly.
+    """
+    with open(path, "rb") as f:
+        start = _line_start(f, start)
+        stop = _line_start(f, stop)
+        if start >= stop:
+            return []  # a line longer than the range: the previous range has it
+        f.seek(start)
+        return list(_decode_lines(f.read(stop - start), start, func))
+
+
+def read_ndjson_parallel(path, workers=None, ordered=True, func=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields the records of a JSON Lines file, decoded by a pool of processes.
+
+    The file is split into byte ranges of `chunk_size` bytes, one task each.
+    Only `workers * 2` ranges are decoded ahead of the caller, so memory use
+    stays bounded however large the file is.
+
+    Every record is pickled to send it from the worker to this process,
+    which costs about as much as decoding it. Give `func` to do the work in
+    the workers - select fields, filter, aggregate - so that less comes back.
+
+    Args:
+        path (str): The file to read.
+        workers (int | None): Processes; defaults to the number of CPUs.
+        ordered (bool): True: records in file order. False: the records of each
+            range in order, but the ranges in the order they finish, so one
+            slow range doesn't hold the others back.
+        func (callable | None): Applied to every record in the worker; records
+            for which it returns None are skipped. It must be a module-level
+            function, so that it can be sent to the processes.
+        chunk_size (int): Bytes per task.
+
+    Usage:
+        for event in read_ndjson_parallel('events.jsonl', workers=8):
+            ...
+    """
+    size = os.path.getsize(path)
+    ranges = iter([(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)])
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        def submit(tasks):
+            while len(tasks) < workers * 2:
+                bounds = next(ranges, None)
+                if bounds is None:
+                    return
+                future = pool.submit(_read_range, path, *bounds, func)
+                tasks.append(future) if ordered else tasks.add(future)
+
+        if ordered:
+            tasks = collections.deque()
+            submit(tasks)
+            while tasks:
+                records = tasks.popleft().result()
+                submit(tasks)
+                yield from records
+        else:
+            tasks = set()
+            submit(tasks)
+            while tasks:
+                done, tasks = wait(tasks, return_when=FIRST_COMPLETED)
+                submit(tasks)
+                for future in done:
+                    yield from future.result()
+
+
+def _valid_ids(record):
+    """An example `func`: keeps the ids of valid records. Module-level, so it can be pickled."""
+    return record["id"] if record["metadata"]["valid"] else None
+
+
+if __name__ == "__main__":
+    import time
+
+    # --- 1. Writing ---
+    # A few thousand records keep the demo quick; benchmark.py measures a
+    # file of 200 MB.
+    print("--- 1. Writing ---")
+    filename = "events.jsonl"
+    events = [{"id": i, "timestamp": f"2024-05-01T12:{i // 60 % 60:02d}:{i % 60:02d}Z",
+               "data": [i % 7, i % 11, i % 13], "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}}
+              for i in range(3_000)]
+    start = time.perf_counter()
+    with open(filename, "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event, ensure_ascii=False, separators=(",", ":")) + "\n")
+    print(f"json.dumps() per line: {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    with NDJSONWriter(filename) as writer:
+        writer.write_many(events)
+    print(f"NDJSONWriter:          {time.perf_counter() - start:.2f}s, "
+          f"{writer.count} records, {os.path.getsize(filename) / 1e3:.0f} KB")
+    with open(filename, encoding="utf-8") as f:
+        print("First line:", f.readline().rstrip())
+
+    # --- 2. Reading ---
+    # Count the valid records, handling each record and dropping it, the way
+    # a pipeline would.
+    print("\n--- 2. Reading ---")
+    start = time.perf_counter()
+    with open(filename, encoding="utf-8") as f:
+        valid = sum(1 for line in f if json.loads(line)["metadata"]["valid"])
+    print(f"json.loads() per line: {valid} valid, {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    valid = sum(1 for event in read_ndjson(filename) if event["metadata"]["valid"])
+    print(f"read_ndjson():         {valid} valid, {time.perf_counter() - start:.2f}s")
+    print("Same records:", list(read_ndjson(filename)) == events)
+
+    # --- 3. Parallel ---
+    print(f"\n--- 3. In parallel ({os.cpu_count()} CPUs) ---")
+    # Ranges of 64 KiB, to have several tasks with this small file.
+    for ordered in (True, False):
+        start = time.perf_counter()
+        valid = sum(1 for event in read_ndjson_parallel(filename, workers=2, ordered=ordered, chunk_size=1 << 16)
+                    if event["metadata"]["valid"])
+        print(f"ordered={ordered!s:<5}     {valid} valid, {time.perf_counter() - start:.2f}s")
+    start = time.perf_counter()
+    valid = sum(1 for _ in read_ndjson_parallel(filename, workers=2, func=_valid_ids, chunk_size=1 << 16))
+    print(f"func=_valid_ids   {valid} valid, {time.perf_counter() - start:.2f}s (only the ids are sent back)")
+    print("Same order:", list(read_ndjson_parallel(filename, workers=2, chunk_size=1 << 16)) == events)
+    unordered = list(read_ndjson_parallel(filename, workers=2, ordered=False, chunk_size=1 << 16))
+    print("Same records unordered:", sorted(unordered, key=lambda event: event["id"]) == events)
+
+    # --- 4. Errors ---
+    print("\n--- 4. Errors ---")
+    size = os.path.getsize(filename)
+    with open(filename, "a", encoding="utf-8") as f:
+        f.write('{"id": 3000, "metadata": {"valid": tru}}\n')
+    print(f"A bad line added at byte {size}:")
+    for label, read in (("read_ndjson", read_ndjson),
+                        ("read_ndjson_parallel", lambda path: read_ndjson_parallel(path, 2, chunk_size=1 << 16))):
+        try:
+            for _ in read(filename):
+                pass
+        except NDJSONError as error:
+            print(f"  {label}: {error}")
+
+    # --- Clean up ---
+    os.remove(filename)
+    print(f"\nRemoved '{filename}'.")
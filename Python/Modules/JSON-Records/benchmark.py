@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Loads a large {"data": [...]} array of records in four ways:
+
+    json.load       dicts, as json.load() returns them
+    then-convert    json.load(), then each dict replaced by a record
+    slots           RecordDecoder from source.py, __slots__ records
+    tuple           RecordDecoder, namedtuple records
+
+and reports the time, the memory kept by the result ("kept") and the most
+memory used while loading ("peak"), which includes the file's text. Each
+method runs twice: once for the time, and once under tracemalloc for the
+memory (which slows it down, so that run isn't timed).
+
+Usage:
+    python benchmark.py
+    python benchmark.py --records 1000000 --methods json.load slots
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from source import RecordDecoder, make_record, parse_timestamp
+
+METHODS = ("json.load", "then-convert", "slots", "tuple")
+
+
+def write_export(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"data": [')
+        for i in range(records):
+            f.write(("," if i else "") + json.dumps({
+                "id": f"user{i}", "timestamp": f"2024-05-01T12:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                "data": [i % 7, i % 11, i % 13],
+                "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}}))
+        f.write("]}")
+
+
+def record_types(kind):
+    metadata = make_record("Metadata", {"source": None, "valid": None}, kind)
+    reading = make_record("Reading", {"id": None, "timestamp": parse_timestamp, "data": tuple,
+                                      "metadata": metadata}, kind)
+    return reading, metadata
+
+
+def load(method, path):
+    with open(path, encoding="utf-8") as f:
+        if method == "json.load":
+            return json.load(f)["data"]
+        if method == "then-convert":
+            # All the dicts exist at once before the records replace them.
+            reading, metadata = record_types("slots")
+            data = json.load(f)["data"]
+            for i, obj in enumerate(data):
+                data[i] = reading(obj["id"], parse_timestamp(obj["timestamp"]), tuple(obj["data"]),
+                                  metadata(**obj["metadata"]))
+            return data
+        if method in ("slots", "tuple"):
+            return RecordDecoder(record_types(method)[0]).load(f)["data"]
+    raise ValueError(f"unknown method {method!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark decoding JSON records into compact objects.")
+    parser.add_argument("--records", type=int, default=100_000, help="records in the array (default: 100000)")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--dir", help="where to create the file (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    fd, path = tempfile.mkstemp(prefix="json-records-benchmark-", suffix=".json", dir=args.dir)
+    os.close(fd)
+    try:
+        write_export(path, args.records)
+        print(f"{args.records:,} records, {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'method':<14} {'seconds':>8} {'kept MB':>8} {'peak MB':>8}")
+        for method in args.methods:
+            gc.collect()
+            start = time.perf_counter()
+            data = load(method, path)
+            elapsed = time.perf_counter() - start
+            if len(data) != args.records:
+                print(f"{method}: {len(data)} records instead of {args.records}", file=sys.stderr)
+                return 1
+            del data
+            gc.collect()
+            tracemalloc.start()
+            data = load(method, path)
+            kept, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            del data
+            print(f"{method:<14} {elapsed:>8.2f} {kept / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Decoding JSON records into compact objects instead of dicts.
+
+json.load() turns every JSON object into a dict. A dict is built to grow:
+it keeps its own hash table, so an object with 4 keys costs about 180
+bytes before counting any of the values. The JSON tutorial (see ../JSON)
+reads one record like
+
+    {"id": "user123", "timestamp": "2023-10-27T10:00:00Z",
+     "data": [15, 25, 35], "metadata": {"source": "sensorA", "valid": true}}
+
+and for one record that doesn't matter. For an array of millions of them,
+the dicts are most of the process's memory.
+
+Here we declare the shape of the records once:
+
+    Metadata = make_record("Metadata", {"source": None, "valid": None})
+    Reading = make_record("Reading", {"id": None, "timestamp": parse_timestamp,
+                                      "data": tuple, "metadata": Metadata})
+
+make_record() generates a class with __slots__ (or a namedtuple), which
+stores its values in a fixed array, with no hash table and no per-object
+dict. RecordDecoder builds these objects while json parses the text and
+converts the fields (here: the timestamp to a datetime, the list to a
+tuple) in the same pass, so no dict is kept after its object is built.
+
+This script demonstrates:
+1.  Declaring records and decoding into them.
+2.  Objects that don't match a record stay dicts.
+3.  Memory compared with json.loads() (benchmark.py: time and memory on
+    a large array).
+"""
+
+import collections
+import datetime
+import json
+import keyword
+
+_MAX_CACHED_KEY_ORDERS = 1000  # limits the cache when many objects don't match any record
+
+
+def parse_timestamp(text):
+    """Converts an ISO 8601 timestamp like '2023-10-27T10:00:00Z' to an aware datetime."""
+    if text.endswith("Z"):  # fromisoformat() accepts 'Z' only from Python 3.11
+        text = text[:-1] + "+00:00"
+    return datetime.datetime.fromisoformat(text)
+
+
+def _compile(source, name, namespace):
+    """Runs generated code and returns the function `name` (as collections.namedtuple does)."""
+    exec(source, namespace)
+    return namespace[name]
+
+
+def make_record(name, fields, kind="slots"):
+    """
+    Generates a record class for JSON objects with exactly the keys of `fields`.
+
+    Args:
+        name (str): The class name.
+        fields (dict): {key: converter}. A converter is called with the JSON
+            value (e.g. parse_timestamp, tuple, Decimal), except for null,
+            which stays None; None keeps the value as it is, and a record
+            class means a nested object of that record.
+        kind (str): 'slots' for a class with __slots__, whose attributes can
+            be changed, or 'tuple' for a namedtuple, which is immutable.
+
+    Returns:
+        type: The class. Instances are created with the values in field
+            order: Metadata('sensorA', True).
+
+    Usage:
+        Point = make_record('Point', {'x': float, 'y': float})
+    """
+    names = tuple(fields)
+    for field in names:
+        if not field.isidentifier() or keyword.iskeyword(field) or field.startswith("_"):
+            raise ValueError(f"{name}: {field!r} can't be an attribute name")
+    if kind == "tuple":
+        cls = collections.namedtuple(name, names)
+    elif kind == "slots":
+        arguments = ", ".join(names)
+        body = "".join(f"\n    self.{field} = {field}" for field in names) or "\n    pass"
+        namespace = {
+            "__slots__": names,
+            "__init__": _compile(f"def __init__(self, {arguments}):{body}", "__init__", {}),
+            "__repr__": lambda self: f"{name}({', '.join(f'{field}={getattr(self, field)!r}' for field in names)})",
+            "__eq__": lambda self, other: (type(self) is type(other)
+                                           and all(getattr(self, f) == getattr(other, f) for f in names)),
+            "_asdict": lambda self: {field: getattr(self, field) for field in names},
+            "__hash__": None,  # mutable, like a dataclass
+        }
+        cls = type(name, (), namespace)
+    else:
+        raise ValueError(f"kind must be 'slots' or 'tuple', not {kind!r}")
+    cls._fields = names
+    cls._converters = dict(fields)
+    return cls
+
+
+def _is_record(converter):
+    return isinstance(converter, type) and hasattr(converter, "_converters")
+
+
+class RecordDecoder:
+    """
+    Decodes JSON, turning objects that match a record class into records.
+
+    json calls us for every object as soon as it is parsed, inner objects
+    first. An object whose keys are exactly the fields of one of the record
+    classes (in any order) becomes that record, with its fields converted.
+    Other objects stay dicts. Record classes used as converters of other
+    record classes are included automatically.
+
+    Args:
+        *records: Classes from make_record().
+
+    Usage:
+        decoder = RecordDecoder(Reading)
+        with open('export.json', encoding='utf-8') as f:
+            readings = decoder.load(f)["data"]
+    """
+
+    def __init__(self, *records):
+        self._by_keys = {}  # frozenset of keys -> (record class, builder)
+        pending = list(records)
+        while pending:
+            record = pending.pop()
+            keys = frozenset(record._fields)
+            if self._by_keys.get(keys, (record,))[0] is not record:
+                raise ValueError(f"{record.__name__} and {self._by_keys[keys][0].__name__} have the same fields")
+            self._by_keys[keys] = (record, self._builder(record))
+            pending.extend(converter for converter in record._converters.values()
+                           if _is_record(converter)
+                           and self._by_keys.get(frozenset(converter._fields), (None,))[0] is not converter)
+        # Key order -> builder (or None). Records usually come with their keys
+        # in the same order, so tuple(obj) finds the builder without a frozenset.
+        self._by_order = {}
+        self._decoder = json.JSONDecoder(object_hook=self._object_hook)
+
+    @staticmethod
+    def _builder(record):
+        """
+        Generates a function that builds `record` from a dict, e.g. for Reading:
+
+            def build(obj):
+                return Reading(obj['id'], (None if (v_1 := obj['timestamp']) is None else convert_1(v_1)), ...)
+
+        Record-class fields were already built by json (inner objects come
+        first), so they are passed as they are.
+        """
+        namespace = {"record": record}
+        values = []
+        for i, (field, converter) in enumerate(record._converters.items()):
+            if converter is None or _is_record(converter):
+                values.append(f"obj[{field!r}]")
+            else:
+                # JSON null stays None: converters only see real values.
+                namespace[f"convert_{i}"] = converter
+                values.append(f"(None if (v_{i} := obj[{field!r}]) is None else convert_{i}(v_{i}))")
+        return _compile(f"def build(obj):\n    return record({', '.join(values)})", "build", namespace)
+
+    def _object_hook(self, obj):
+        order = tuple(obj)
+        try:
+            build = self._by_order[order]
+        except KeyError:
+            build = self._by_keys.get(frozenset(order), (None, None))[1]
+            if len(self._by_order) < _MAX_CACHED_KEY_ORDERS:
+                self._by_order[order] = build
+        return obj if build is None else build(obj)
+
+    def loads(self, text):
+        return self._decoder.decode(text)
+
+    def load(self, file):
+        return self.loads(file.read())
+
+
+if __name__ == "__main__":
+    import tracemalloc
+
+    Metadata = make_record("Metadata", {"source": None, "valid": None})
+    Reading = make_record("Reading", {"id": None, "timestamp": parse_timestamp, "data": tuple,
+                                      "metadata": Metadata})
+
+    # --- 1. Decoding into records ---
+    print("--- 1. Decoding into records ---")
+    text = ('{"id": "user123", "timestamp": "2023-10-27T10:00:00Z", "data": [15, 25, 35], '
+            '"metadata": {"source": "sensorA", "valid": true}}')  # the record from ../JSON/data.json
+    reading = RecordDecoder(Reading).loads(text)
+    print(reading)
+    print("reading.timestamp.year:", reading.timestamp.year)
+    print("reading.metadata.valid:", reading.metadata.valid)
+
+    # --- 2. Other objects ---
+    print("\n--- 2. Objects that don't match stay dicts ---")
+    document = RecordDecoder(Reading).loads('{"exported": "2024-05-01", "data": [' + text + "], "
+                                            '"extra": {"id": 1}}')
+    print(document)
+
+    # --- 3. Memory ---
+    # A few thousand records keep the demo quick; benchmark.py measures
+    # time and memory on a large array, with more ways of loading it.
+    print("\n--- 3. Memory for 3,000 records ---")
+    text = '{"data": [' + ", ".join(
+        json.dumps({"id": f"user{i}", "timestamp": f"2024-05-01T12:{i // 60 % 60:02d}:{i % 60:02d}Z",
+                    "data": [i % 7, i % 11, i % 13],
+                    "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}})
+        for i in range(3_000)) + "]}"
+    decoder = RecordDecoder(Reading)
+    for label, loads in (("json.loads()", json.loads), ("RecordDecoder", decoder.loads)):
+        tracemalloc.start()
+        data = loads(text)["data"]
+        kept, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<14} kept {kept / 1e3:>6,.0f} KB, peak {peak / 1e3:>6,.0f} KB")
+        del data
+    print("(kept: memory used by the loaded records; peak: the most used while loading)")
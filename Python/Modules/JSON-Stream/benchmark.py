@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Reads a large {"exported": ..., "data": [...]} export and counts the valid
+records:
+
+    json.load       json.load(f)["data"], the whole document at once
+    items           items(f, "data.item") from source.py, one record at a time
+    parse           parse(f) from source.py, checking the events directly
+
+Every method must find the same number of records. Each method runs twice:
+once for the time, and once under tracemalloc for the peak memory (which
+slows it down, so that run isn't timed).
+
+Usage:
+    python benchmark.py
+    python benchmark.py --records 1000000 --methods json.load items
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from source import items, parse
+
+METHODS = ("json.load", "items", "parse")
+
+
+def write_export(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"exported": "2024-05-01", "data": [')
+        for i in range(records):
+            record = {"id": i, "timestamp": "2024-05-01T12:00:00Z", "data": [i % 7, i % 11, i % 13],
+                      "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}}
+            f.write(("," if i else "") + json.dumps(record))
+        f.write("]}")
+
+
+def count_valid(method, path):
+    with open(path, "rb") as f:
+        if method == "json.load":
+            return sum(1 for record in json.load(f)["data"] if record["metadata"]["valid"])
+        if method == "items":
+            return sum(1 for record in items(f, "data.item") if record["metadata"]["valid"])
+        if method == "parse":
+            return sum(1 for prefix, _, value in parse(f) if prefix == "data.item.metadata.valid" and value)
+    raise ValueError(f"unknown method {method!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark streaming JSON parsing against json.load().")
+    parser.add_argument("--records", type=int, default=200_000, help="records in the export (default: 200000)")
+    parser.add_argument("--methods", nargs="+", choices=METHODS, default=list(METHODS))
+    parser.add_argument("--dir", help="where to create the file (default: the temp directory)")
+    args = parser.parse_args(argv)
+
+    fd, path = tempfile.mkstemp(prefix="json-stream-benchmark-", suffix=".json", dir=args.dir)
+    os.close(fd)
+    try:
+        write_export(path, args.records)
+        print(f"{args.records:,} records, {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"{'method':<10} {'seconds':>8} {'peak MB':>8}")
+        reference = None
+        for method in args.methods:
+            start = time.perf_counter()
+            result = count_valid(method, path)
+            elapsed = time.perf_counter() - start
+            tracemalloc.start()
+            count_valid(method, path)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            if reference is None:
+                reference = result
+            elif result != reference:
+                print(f"{method}: {result} valid records instead of {reference}", file=sys.stderr)
+                return 1
+            print(f"{method:<10} {elapsed:>8.2f} {peak / 1e6:>8.1f}")
+    finally:
+        os.remove(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
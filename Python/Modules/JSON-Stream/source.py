@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+source.py
+
+Parsing JSON documents that are larger than memory, one piece at a time.
+
+The JSON tutorial (see ../JSON) reads files with json.load(), which builds
+the whole document as Python objects before returning. A 5 GB export like
+
+    {"data": [{"id": 1, ...}, {"id": 2, ...}, ... millions more ...]}
+
+becomes tens of GB of dicts, lists and strings - the process runs out of
+memory long before we get to the first record.
+
+This script parses the file as a stream instead. It reads 64 KiB at a time
+and reports what it finds as events, like a SAX parser for XML:
+
+    parse(f)  yields (prefix, event, value):
+        ('', 'start_map', None)
+        ('', 'map_key', 'data')
+        ('data', 'start_array', None)
+        ('data.item', 'start_map', None)
+        ('data.item', 'map_key', 'id')
+        ('data.item.id', 'number', 1)
+        ...
+
+The prefix says where in the document we are: keys joined with '.', and
+'item' for an element of an array (the same naming as the ijson library).
+
+items(f, 'data.item') builds just one element of the array at a time and
+yields it, so memory use depends on the size of one record, not the file.
+
+This script demonstrates:
+1.  The events of a small document.
+2.  Reading an export one record at a time with items(), and its memory
+    use compared with json.load() (benchmark.py: the same on a large file).
+3.  Documents split at any point between chunks.
+4.  Errors in the middle of a stream.
+"""
+
+import codecs
+import json
+import re
+from json.decoder import scanstring
+
+CHUNK_SIZE = 64 * 1024  # characters (or bytes) read at a time
+
+# One token, after optional whitespace. Strings without escapes or control
+# characters are taken as they are; all others are decoded (and checked) by
+# json's own C function.
+_TOKEN = re.compile(r"""
+    [ \t\n\r]*
+    (?:
+        ([{}\[\]:,])                                    # 1: punctuation
+      | "([^"\\\x00-\x1f]*)"                            # 2: plain string
+      | (-?(?:0|[1-9][0-9]*))(\.[0-9]+)?([eE][-+]?[0-9]+)?  # 3-5: number
+      | (true|false|null)                               # 6: literal
+      | "([^"\\]*(?:\\[\s\S][^"\\]*)*)"                # 7: any other string
+    )""", re.VERBOSE)
+# The longest text that matches no token but may still become one with the
+# next chunk: 'fals'. (An open string may be longer; it is checked separately.)
+_MAX_PARTIAL = 4
+_LITERALS = {"true": ("boolean", True), "false": ("boolean", False), "null": ("null", None)}
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def _reject_constant(name):
+    raise json.JSONDecodeError(f"{name} is not valid JSON", "", 0)
+
+
+_decoder = json.JSONDecoder(parse_constant=_reject_constant)  # the tokenizer doesn't accept NaN either
+
+
+class JSONStreamError(ValueError):
+    """Invalid JSON in a stream; `offset` is the character position in the whole document."""
+
+    def __init__(self, message, offset):
+        super().__init__(f"{message} at character {offset}")
+        self.offset = offset
+
+
+class _Tokenizer:
+    """Splits a file into JSON tokens, reading it a chunk at a time."""
+
+    def __init__(self, file, chunk_size):
+        self._file = file
+        self._chunk_size = chunk_size
+        self._decoder = None  # for files opened in binary mode
+        self.buffer = ""
+        self.pos = 0
+        self.dropped = 0  # characters removed from the front of the buffer so far
+        self.eof = False
+        self._limit = 0  # tokens must end before this position, or may continue in the next chunk
+        self._match = None  # the last token, for error messages
+
+    def offset(self, pos=None):
+        return self.dropped + (self.pos if pos is None else pos)
+
+    def _fill(self):
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+        if isinstance(chunk, bytes):
+            if self._decoder is None:
+                self._decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = self._decoder.decode(chunk, final=self.eof)
+        self.dropped += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        # '12' may be the start of '1234', and '1' of '1.5' or '1e-3' (the
+        # buffer ending in '1e-'): a token followed by fewer than 3 characters
+        # waits for the next chunk. At the end of the file every token is complete.
+        self._limit = len(self.buffer) if self.eof else len(self.buffer) - 3
+
+    def next(self):
+        """Returns (kind, value) for the next token, or None at the end."""
+        while True:
+            match = _TOKEN.match(self.buffer, self.pos)
+            if match is None or match.end() > self._limit:
+                end = _WHITESPACE.match(self.buffer, self.pos).end()
+                if self.eof:
+                    if end == len(self.buffer):
+                        self.pos = end
+                        return None
+                    raise self._invalid(end)
+                # Read more only if the rest of the buffer can still become a
+                # token: an open string, or a few characters like 'tr' or '-'.
+                # Anything else is an error now, not after reading the whole file.
+                if match is None and len(self.buffer) - end > _MAX_PARTIAL and self.buffer[end] != '"':
+                    raise self._invalid(end)
+                self.pos = end  # whitespace isn't kept
+                self._fill()
+                continue
+            self._match = match
+            self.pos = match.end()
+            group = match.lastindex
+            if group == 1:
+                return match.group(1), None
+            if group == 2:
+                return "string", match.group(2)
+            if group == 7:
+                try:
+                    return "string", scanstring(self.buffer, match.start(7), True)[0]
+                except json.JSONDecodeError as error:
+                    raise JSONStreamError(error.msg.removesuffix(" at"), self.offset(error.pos)) from None
+            if group == 6:
+                return _LITERALS[match.group(6)]
+            if group == 3:
+                return "number", int(match.group(3))
+            return "number", float(match.group(0))
+
+    def _invalid(self, pos):
+        return JSONStreamError(f"invalid JSON {self.buffer[pos:pos + 20]!r}", self.offset(pos))
+
+    def token_start(self):
+        """The offset of the last token in the whole document."""
+        return self.offset() - len(self._match.group(0).lstrip(" \t\n\r"))
+
+    def error(self, expected):
+        """A JSONStreamError for the last token, which isn't what the parser `expected`."""
+        text = self._match.group(0).lstrip(" \t\n\r")
+        return JSONStreamError(f"expected {expected}, found {text[:20]!r}", self.token_start())
+
+    def decode_container(self):
+        """
+        Decodes the object or array that starts at the current position with
+        json's C decoder, if it is complete in the buffer. Returns (True, value)
+        or (False, None) if it isn't (or is invalid): then the caller parses it
+        token by token, which reads more and reports errors exactly.
+        """
+        start = _WHITESPACE.match(self.buffer, self.pos).end()
+        try:
+            value, end = _decoder.raw_decode(self.buffer, start)
+        except json.JSONDecodeError:
+            return False, None
+        self.pos = end
+        return True, value
+
+
+def _child(prefix, name):
+    return f"{prefix}.{name}" if prefix else name
+
+
+def _events(file, chunk_size=CHUNK_SIZE, capture=None):
+    """
+    The parser behind parse() and items().
+
+    With `capture`, an object or array at that prefix is decoded in one go
+    when possible and reported as a single (prefix, 'value', obj) event.
+    """
+    tokens = _Tokenizer(file, chunk_size)
+    stack = []  # (is_map, prefix) of the open containers
+    prefix = ""  # the prefix of the next value
+    expect = "value"  # what may come next
+    while True:
+        if expect == "value" and prefix == capture and capture is not None:
+            kind = tokens.next()
+            if kind is not None and kind[0] in "{[":
+                tokens.pos = tokens.token_start() - tokens.dropped  # back to the '{' or '['
+                done, value = tokens.decode_container()
+                if done:
+                    yield prefix, "value", value
+                    expect = "comma" if stack else "end"
+                    continue
+                tokens.next()  # the '{' or '[' again; parse it token by token
+        else:
+            kind = tokens.next()
+        if kind is None:
+            if expect != "end":
+                raise JSONStreamError("unexpected end of the document", tokens.offset())
+            return
+        token, value = kind
+
+        if expect in ("value", "value_or_end"):
+            if token == "]" and expect == "value_or_end":
+                pass  # an empty array: handled with the closing brackets below
+            elif token == "{":
+                yield prefix, "start_map", None
+                stack.append((True, prefix))
+                expect = "key_or_end"
+                continue
+            elif token == "[":
+                yield prefix, "start_array", None
+                stack.append((False, prefix))
+                prefix = _child(prefix, "item")
+                expect = "value_or_end"
+                continue
+            elif token in ("string", "number", "boolean", "null"):
+                yield prefix, token, value
+                expect = "comma" if stack else "end"
+                continue
+            else:
+                raise tokens.error("a value")
+        elif expect in ("key", "key_or_end"):
+            if token == "string":
+                map_prefix = stack[-1][1]
+                yield map_prefix, "map_key", value
+                prefix = _child(map_prefix, value)
+                expect = "colon"
+                continue
+            if not (token == "}" and expect == "key_or_end"):
+                raise tokens.error("a key")
+        elif expect == "colon":
+            if token != ":":
+                raise tokens.error("':'")
+            expect = "value"
+            continue
+        elif expect == "comma":
+            is_map, container_prefix = stack[-1]
+            if token == ",":
+                if is_map:
+                    expect = "key"
+                else:
+                    prefix = _child(container_prefix, "item")
+                    expect = "value"
+                continue
+            if token != ("}" if is_map else "]"):
+                raise tokens.error("',' or '}'" if is_map else "',' or ']'")
+        else:  # expect == "end"
+            raise tokens.error("the end of the document")
+
+        # A closing bracket.
+        is_map, prefix = stack.pop()
+        yield prefix, "end_map" if is_map else "end_array", None
+        expect = "comma" if stack else "end"
+
+
+def parse(file, chunk_size=CHUNK_SIZE):
+    """
+    Yields (prefix, event, value) for every part of the JSON document in `file`.
+
+    Events: start_map, map_key (value: the key), end_map, start_array,
+    end_array, string, number, boolean, null (value: the Python value).
+
+    Args:
+        file: A file object opened for reading, in text or binary (UTF-8) mode.
+        chunk_size (int): How much is read at a time.
+
+    Usage:
+        with open('export.json', 'rb') as f:
+            for prefix, event, value in parse(f):
+                if prefix == 'data.item.id':
+                    print(value)
+    """
+    return _events(file, chunk_size)
+
+
+def _build(event, events):
+    """Builds the object or array whose start event was `event` from the following events."""
+    root = {} if event == "start_map" else []
+    stack = [root]
+    key = None
+    for _, event, value in events:
+        if event == "map_key":
+            key = value
+            continue
+        if event in ("end_map", "end_array"):
+            stack.pop()
+            if not stack:
+                return root
+            continue
+        if event == "start_map":
+            value = {}
+        elif event == "start_array":
+            value = []
+        container = stack[-1]
+        if isinstance(container, dict):
+            container[key] = value
+        else:
+            container.append(value)
+        if event in ("start_map", "start_array"):
+            stack.append(value)
+    # Not reached: _events() raises JSONStreamError if the document ends early.
+
+
+def items(file, prefix, chunk_size=CHUNK_SIZE):
+    """
+    Yields the values at `prefix` one at a time, as Python objects.
+
+    For {"data": [...]} the prefix 'data.item' yields the array's elements.
+    Only one element is in memory at a time. An element that is complete in
+    the read buffer is decoded by json's C decoder in one call; one that
+    crosses a chunk boundary is built from events.
+
+    Usage:
+        with open('export.json', 'rb') as f:
+            for record in items(f, 'data.item'):
+                process(record)
+    """
+    events = _events(file, chunk_size, capture=prefix)
+    for path, event, value in events:
+        if path != prefix:
+            continue
+        if event in ("start_map", "start_array"):
+            yield _build(event, events)
+        elif event not in ("map_key", "end_map", "end_array"):
+            yield value
+
+
+if __name__ == "__main__":
+    import io
+    import os
+    import tracemalloc
+
+    # --- 1. Events ---
+    print("--- 1. The events of a small document ---")
+    document = {"id": "user123", "timestamp": "2023-10-27T10:00:00Z", "data": [15, 25, 35],
+                "metadata": {"source": "sensorA", "valid": True}}  # like data.json in ../JSON
+    for prefix, event, value in parse(io.StringIO(json.dumps(document))):
+        print(f"  {prefix!r:<22} {event:<12} {value!r}")
+
+    # --- 2. An export, one record at a time ---
+    # A small file keeps the demo quick; benchmark.py compares the methods
+    # on a large one.
+    print("\n--- 2. An export, one record at a time ---")
+    filename = "export.json"
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write('{"exported": "2024-05-01", "data": [')
+        for i in range(3_000):
+            record = {"id": i, "timestamp": "2024-05-01T12:00:00Z", "data": [i % 7, i % 11, i % 13],
+                      "metadata": {"source": f"sensor{i % 50}", "valid": i % 3 != 0}}
+            f.write(("," if i else "") + json.dumps(record))
+        f.write("]}")
+    print(f"{filename}: {os.path.getsize(filename) / 1e3:.0f} KB")
+
+    def count_valid_with_load():
+        with open(filename, "rb") as f:
+            return sum(1 for record in json.load(f)["data"] if record["metadata"]["valid"])
+
+    def count_valid_streaming():
+        # A small chunk size, so that this small file is read in many chunks.
+        with open(filename, "rb") as f:
+            return sum(1 for record in items(f, "data.item", chunk_size=4096) if record["metadata"]["valid"])
+
+    for label, count in (("json.load()", count_valid_with_load), ("items()", count_valid_streaming)):
+        tracemalloc.start()
+        result = count()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"{label:<12} {result} valid records, peak memory {peak / 1e3:,.0f} KB")
+
+    # --- 3. Chunk boundaries ---
+    print("\n--- 3. Any chunk size gives the same result ---")
+    text = json.dumps({"a": [1, 2.5e3, -0.25, "tab\tand \"quotes\" é中", True, None, {}, []],
+                       "b": {"nested": [[{"x": "y"}]]}})
+    expected = json.loads(text)
+    for size in (1, 2, 3, 7, 64):
+        rebuilt = list(items(io.StringIO(text), "", chunk_size=size))[0]
+        from_bytes = list(items(io.BytesIO(text.encode("utf-8")), "", chunk_size=size))[0]  # splits UTF-8 too
+        print(f"  chunk_size={size:<3} same as json.loads(): {rebuilt == expected and from_bytes == expected}")
+
+    # --- 4. Errors ---
+    print("\n--- 4. Errors ---")
+    for bad in ('{"data": [1, 2,]}', '{"data": [1, 2]', '{"a" 1}', '[1, 2] 3', '["tab\tinside"]'):
+        try:
+            list(parse(io.StringIO(bad)))
+        except JSONStreamError as error:
+            print(f"  {bad!r:<22} {error}")
+
+    # --- Clean up ---
+    os.remove(filename)
+    print(f"\nRemoved '{filename}'.")
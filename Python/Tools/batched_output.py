@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+batched_output.py
+
+Runs a tutorial script with its stdout and stderr collected in one buffer
+and written out in large blocks.
+
+Normally the two streams are buffered separately: stdout in 8 KiB blocks when
+it is a pipe, stderr line by line. Each block and each stderr line is its own
+write() call, and when both go to the same place the order gets mixed up. A
+script that prints twenty lines and then dies with a traceback shows the
+traceback first, because stdout is only flushed at exit.
+
+Here both streams write into a single ordered buffer instead, which is
+written out
+- when it holds BATCHED_OUTPUT_SIZE bytes (default 64 KiB, the size of a
+  Linux pipe buffer),
+- when the script calls flush() (input() does so to show its prompt),
+- before os.fork(), and at exit.
+Consecutive output for the same stream becomes one os.write(), and the
+writes happen in the order the script produced the text, so stdout and
+stderr interleave exactly as they were written when both are sent to the
+same pipe or terminal (2>&1).
+
+Usage:
+    python Tools/batched_output.py Tutorials/Try-Except/source.py
+    BATCHED_OUTPUT_SIZE=4096 python Tools/batched_output.py Methods/String-Methods/source.py 2>&1
+    python Tools/batched_output.py Tools/lazy_imports.py Tutorials/PIP/source.py   # both bootstraps
+
+Output written to the file descriptors directly (os.write(1, ...), child
+processes) is not buffered and can overtake text still in the buffer, just
+as it can overtake Python's own stdout buffer.
+"""
+
+import _thread
+import atexit
+import io
+import os
+import sys
+
+DEFAULT_SIZE = 64 * 1024
+
+
+class BatchedSink:
+    """
+    An ordered buffer of (file descriptor, bytes) chunks shared by the streams.
+
+    Args:
+        size (int): Buffered bytes that trigger a flush.
+    """
+
+    def __init__(self, size=DEFAULT_SIZE):
+        self.size = size
+        self.chunks = []
+        self.buffered = 0
+        self.writes = 0  # os.write() calls made, for measurements
+        self._lock = _thread.allocate_lock()
+
+    def write(self, fd, data):
+        if not data:
+            return
+        with self._lock:
+            chunks = self.chunks
+            if chunks and chunks[-1][0] == fd:
+                chunks[-1][1].append(data)
+            else:
+                chunks.append((fd, [data]))
+            self.buffered += len(data)
+            if self.buffered < self.size:
+                return
+            self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        chunks, self.chunks, self.buffered = self.chunks, [], 0
+        for fd, parts in chunks:
+            data = memoryview(b"".join(parts))
+            while data:
+                written = os.write(fd, data)
+                self.writes += 1
+                data = data[written:]
+
+
+class _SinkBuffer(io.RawIOBase):
+    """The `.buffer` of a SinkStream, for scripts that write bytes."""
+
+    def __init__(self, sink, fd):
+        self._sink = sink
+        self._fd = fd
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._sink.write(self._fd, bytes(data))
+        return len(data)
+
+    def flush(self):
+        self._sink.flush()
+
+    def fileno(self):
+        return self._fd
+
+
+class SinkStream(io.TextIOBase):
+    """
+    A text stream that encodes what is written to it and hands it to a BatchedSink.
+
+    Args:
+        sink (BatchedSink): The shared buffer.
+        original (io.TextIOWrapper): The stream it replaces; its file
+            descriptor, encoding and error handler are kept.
+    """
+
+    def __init__(self, sink, original):
+        self._sink = sink
+        self._fd = original.fileno()
+        self._encoding = original.encoding
+        self._errors = original.errors
+        self._buffer = _SinkBuffer(sink, self._fd)
+        self._isatty = original.isatty()
+
+    @property
+    def encoding(self):
+        return self._encoding
+
+    @property
+    def errors(self):
+        return self._errors
+
+    @property
+    def buffer(self):
+        return self._buffer
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self._sink.write(self._fd, text.encode(self._encoding, self._errors))
+        return len(text)
+
+    def flush(self):
+        self._sink.flush()
+
+    def fileno(self):
+        return self._fd
+
+    def isatty(self):
+        return self._isatty
+
+
+def install(size=None):
+    """Replaces sys.stdout and sys.stderr with SinkStreams and returns the sink."""
+    if size is None:
+        size = int(os.environ.get("BATCHED_OUTPUT_SIZE") or DEFAULT_SIZE)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    sink = BatchedSink(size)
+    sys.stdout = SinkStream(sink, sys.stdout)
+    sys.stderr = SinkStream(sink, sys.stderr)
+    # atexit runs after an uncaught exception's traceback has been printed
+    # (into the sink), so the traceback still comes after the output before it.
+    atexit.register(sink.flush)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(before=sink.flush)
+    return sink
+
+
+def run(script, args=()):
+    """Runs `script` as __main__ with batched output, like `python script.py`."""
+    script = os.path.abspath(script)
+    with open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+    sys.argv[:] = [script, *args]
+    sys.path[0] = os.path.dirname(script)
+    main_module = type(sys)("__main__")
+    main_module.__file__ = script
+    main_module.__builtins__ = __builtins__
+    sys.modules["__main__"] = main_module
+    install()
+    exec(code, main_module.__dict__)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python batched_output.py SCRIPT [ARGS...]")
+    run(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+benchmark.py
+
+Times the tutorial scripts and guards against performance regressions.
+
+Every script is run a few times to warm up (OS file cache, imported modules'
+bytecode), then sampled repeatedly in a fresh interpreter through
+script_runner.run_script(). The median and standard deviation of the samples
+are reported. Results can be saved as a baseline JSON file and later runs
+compared against it: a script whose median grows by more than the threshold
+makes the run fail.
+
+Scripts are timed one after another on purpose; running them in parallel
+would make them compete for CPU and add noise to the numbers.
+
+Usage:
+    python Tools/benchmark.py --save baseline.json              # record a baseline
+    python Tools/benchmark.py --compare baseline.json           # gate on +10% (default)
+    python Tools/benchmark.py Methods/String-Methods --repeat 20 --compare baseline.json --threshold 0.05
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+from datetime import datetime, timezone
+
+from script_runner import DEFAULT_TIMEOUT, discover_scripts, relative_name, run_script
+
+DEFAULT_WARMUP = 1
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10  # 10% slower than the baseline median
+DEFAULT_MIN_DELTA = 0.005  # ignore regressions smaller than 5 ms (timer noise)
+
+
+def benchmark_script(script, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT, timeout=DEFAULT_TIMEOUT):
+    """
+    Times one script.
+
+    Args:
+        script (Path): The script to time.
+        warmup (int): Untimed runs before sampling.
+        repeat (int): Number of timed samples.
+        timeout (float): Per-run timeout in seconds.
+
+    Returns:
+        dict: Median/stddev/min of wall and CPU time, the raw wall samples
+        and whether every run exited successfully.
+    """
+    for _ in range(warmup):
+        run_script(script, timeout=timeout)
+
+    results = [run_script(script, timeout=timeout) for _ in range(repeat)]
+    wall = [r.wall_time for r in results]
+    cpu = [r.cpu_time for r in results]
+    return {
+        "ok": all(r.ok for r in results),
+        "samples": repeat,
+        "wall_median": statistics.median(wall),
+        "wall_stdev": statistics.stdev(wall) if repeat > 1 else 0.0,
+        "wall_min": min(wall),
+        "cpu_median": statistics.median(cpu),
+        "cpu_stdev": statistics.stdev(cpu) if repeat > 1 else 0.0,
+        "wall_samples": wall,
+    }
+
+
+def environment_info():
+    """Describes the interpreter the numbers were taken with."""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "executable": sys.executable,
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def compare(current, baseline, metric="wall", threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA):
+    """
+    Compares fresh results with a baseline.
+
+    Args:
+        current (dict): {script: stats} from this run.
+        baseline (dict): {script: stats} loaded from the baseline file.
+        metric (str): 'wall' or 'cpu'.
+        threshold (float): Allowed relative slowdown of the median (0.10 = 10%).
+        min_delta (float): Slowdowns smaller than this many seconds are ignored.
+
+    Returns:
+        list[tuple]: (script, baseline_median, current_median, relative_change,
+        regressed) for every script present in both.
+    """
+    key = f"{metric}_median"
+    rows = []
+    for script, stats in current.items():
+        if script not in baseline:
+            continue
+        old, new = baseline[script][key], stats[key]
+        change = (new - old) / old if old else 0.0
+        regressed = change > threshold and (new - old) > min_delta
+        rows.append((script, old, new, change, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Python/ tutorial scripts.")
+    parser.add_argument("paths", nargs="*", help="only benchmark scripts below these paths (relative to Python/)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="untimed runs per script")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed samples per script")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-run timeout in seconds")
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare against the baseline in FILE")
+    parser.add_argument("--metric", choices=("wall", "cpu"), default="wall", help="metric used for gating")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed relative slowdown of the median (default: 0.10)")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA,
+                        help="ignore slowdowns smaller than this many seconds (default: 0.005)")
+    args = parser.parse_args(argv)
+
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    results = {}
+    print(f"{'wall med':>9} {'± stdev':>8} {'cpu med':>9}  script")
+    for script in scripts:
+        stats = benchmark_script(script, args.warmup, args.repeat, args.timeout)
+        name = relative_name(script)
+        results[name] = stats
+        flag = "" if stats["ok"] else "  (script failed)"
+        print(f"{stats['wall_median']:>9.4f} {stats['wall_stdev']:>8.4f} {stats['cpu_median']:>9.4f}  {name}{flag}")
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nComparing {args.metric} medians with '{args.compare}' "
+              f"(Python {baseline['environment']['python']} -> {platform.python_version()}, "
+              f"threshold {args.threshold:.0%})")
+        rows = compare(results, baseline["results"], args.metric, args.threshold, args.min_delta)
+        for script, old, new, change, regressed in rows:
+            mark = "REGRESSED" if regressed else "ok"
+            print(f"{mark:<10} {old:>8.4f} -> {new:>8.4f} ({change:+7.1%})  {script}")
+        regressions = [row for row in rows if row[4]]
+        missing = sorted(set(results) - set(baseline["results"]))
+        if missing:
+            print(f"Not in baseline: {', '.join(missing)}")
+        print(f"{len(regressions)} regression(s) out of {len(rows)} compared scripts.")
+        if regressions:
+            exit_code = 1
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment_info(),
+                       "settings": {"warmup": args.warmup, "repeat": args.repeat},
+                       "results": results}, f, indent=4)
+        print(f"\nBaseline saved to '{args.save}'.")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+build_bundle.py
+
+Packs every tutorial script, compiled to bytecode, into one file that can
+run any of them by its tutorial path.
+
+`python script.py` never caches the bytecode of the script it runs, and on
+a read-only filesystem nothing else gets cached either, so every run compiles
+the tutorial from source again. The bundle is compiled once, at build time.
+
+The bundle is itself a .pyc file, which `python` runs directly:
+
+    python Tools/dist/tutorials.pyc Modules/JSON
+
+Its code is a small entry point (ENTRY_POINT) whose constants hold every
+script as marshalled bytecode. Loading the bundle only copies those bytes;
+the entry point then unmarshals the one script asked for and executes it as
+__main__ in the current working directory.
+
+The script's __file__ is the absolute path its source had when the bundle
+was built (e.g. /src/Python/Modules/JSON/source.py), as if it had been run
+from there. That file only exists if the tree is shipped along with the
+bundle, so scripts must not rely on reading files next to __file__.
+
+A zipapp would be the obvious container, but `python app.pyz` imports runpy
+and, through it, importlib.util, contextlib and collections, which costs more
+(about 8 ms) than compiling a tutorial does. A .pyc is executed without
+any of that.
+
+Bytecode only works on the Python version it was compiled for; a bundle
+built by another version stops with "Bad magic number". Build it with the
+interpreter that will run it.
+
+Usage:
+    python Tools/build_bundle.py                          # all scripts -> Tools/dist/tutorials.pyc
+    python Tools/build_bundle.py Tutorials -o tutorials.pyc --optimize 1
+    python Tools/dist/tutorials.pyc Modules/JSON          # run a bundled script
+    python Tools/dist/tutorials.pyc --list
+"""
+
+import argparse
+import importlib.util
+import marshal
+import os
+import sys
+import time
+from pathlib import Path
+
+from script_runner import PYTHON_ROOT, TOOLS_DIR, discover_scripts, relative_name
+
+DEFAULT_OUTPUT = TOOLS_DIR / "dist" / "tutorials.pyc"
+
+# Only builtin modules: the entry point's own start-up is part of every run.
+# SCRIPTS is filled in by build().
+ENTRY_POINT = '''\
+import marshal
+import sys
+
+USAGE = "usage: python tutorials.pyc [--list] SCRIPT [ARGS...]"
+SCRIPTS = {scripts}
+ROOT = {root}
+SCRIPT_NAMES = ("source.py", "src.py")
+
+
+def resolve(name):
+    name = name.replace("\\\\", "/").strip("/")
+    if name.startswith("Python/"):
+        name = name[len("Python/"):]
+    for candidate in (name, *(name + "/" + script for script in SCRIPT_NAMES)):
+        if candidate in SCRIPTS:
+            return candidate
+    return None
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] in ("-h", "--help"):
+        sys.exit(USAGE)
+    if args[0] == "--list":
+        print("\\n".join(SCRIPTS))
+        return
+    script = resolve(args[0])
+    if script is None:
+        sys.exit(f"{{args[0]}}: not in this bundle (see --list)")
+
+    main_module = type(sys)("__main__")
+    main_module.__file__ = ROOT + "/" + script
+    main_module.__builtins__ = __builtins__
+    sys.modules["__main__"] = main_module
+    sys.argv[:] = [script, *args[1:]]
+    exec(marshal.loads(SCRIPTS[script]), main_module.__dict__)
+
+
+main()
+'''
+
+
+def compile_script(script, optimize=0):
+    """
+    Compiles `script` and returns its marshalled code object.
+
+    The code object's file name is the tutorial path, which is what
+    tracebacks from the bundle show.
+    """
+    source = Path(script).read_bytes()
+    code = compile(source, relative_name(script), "exec", dont_inherit=True, optimize=optimize)
+    return marshal.dumps(code)
+
+
+def build(scripts, output=DEFAULT_OUTPUT, optimize=0):
+    """
+    Writes the bundle.
+
+    Args:
+        scripts (list[Path]): The scripts to include.
+        output (Path): The .pyc file to write.
+        optimize (int): 0 keeps everything, 1 strips assert statements,
+            2 also strips docstrings (like python -O / -OO).
+
+    Returns:
+        tuple[list[str], list[tuple[str, str]]]: The bundled tutorial paths,
+        and (path, error) for the scripts that do not compile.
+    """
+    compiled, failed = {}, []
+    for script in scripts:
+        name = relative_name(script)
+        try:
+            compiled[name] = compile_script(script, optimize)
+        except SyntaxError as e:
+            failed.append((name, f"{e.msg} (line {e.lineno})"))
+
+    source = ENTRY_POINT.format(scripts=repr(compiled), root=repr(PYTHON_ROOT.as_posix()))
+    entry = compile(source, "tutorials.pyc", "exec", dont_inherit=True, optimize=optimize)
+    # .pyc layout: magic number, flags, 8 unused bytes, marshalled code.
+    data = importlib.util.MAGIC_NUMBER + b"\0" * 12 + marshal.dumps(entry)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # Write next to the target and rename, so a half-written bundle never replaces a working one.
+    tmp = output.with_suffix(output.suffix + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, output)
+    return list(compiled), failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the tutorial scripts into one runnable .pyc bundle.")
+    parser.add_argument("paths", nargs="*", help="only bundle scripts below these paths (relative to Python/)")
+    parser.add_argument("-o", "--output", default=str(DEFAULT_OUTPUT), help="bundle to write (default: Tools/dist/tutorials.pyc)")
+    parser.add_argument("--optimize", type=int, choices=(0, 1, 2), default=0,
+                        help="1 strips asserts, 2 also docstrings; both change the output of some tutorials (default: 0)")
+    args = parser.parse_args(argv)
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    start = time.perf_counter()
+    bundled, failed = build(scripts, args.output, args.optimize)
+    elapsed = time.perf_counter() - start
+    for name, error in failed:
+        print(f"skipped {name}: {error}")
+    size = Path(args.output).stat().st_size
+    print(f"Bundled {len(bundled)} scripts for Python {sys.version.split()[0]} into '{args.output}' "
+          f"({size / 1024:.1f} KiB, optimize={args.optimize}) in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
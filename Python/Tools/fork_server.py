@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""
+fork_server.py
+
+Runs the tutorial scripts from a warm interpreter instead of starting a new
+one for each script.
+
+Starting `python` and importing the stdlib modules a tutorial needs takes
+longer than most tutorials themselves. A ForkServer pays that cost once: it
+imports the modules the tree uses (json, re, datetime, zoneinfo, ...), then
+forks one child per script and runs the script in the child with runpy.
+fork() copies the warm interpreter, so each child starts with everything
+already imported.
+
+Every child is isolated from the server and from its siblings:
+- it runs in its own temporary working directory,
+- its stdin is /dev/null and its stdout/stderr go to private files,
+- it has its own copy of all interpreter state (modules, globals, ...),
+  so whatever a script changes disappears with the child.
+
+fork() only exists on Unix, so this tool does too.
+
+Usage:
+    python Tools/fork_server.py                       # run the whole tree
+    python Tools/fork_server.py -j 8 Tutorials
+    python Tools/fork_server.py --measure-overhead    # compare startup cost with script_runner
+"""
+
+import argparse
+import importlib
+import os
+import runpy
+import selectors
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+from script_runner import DEFAULT_TIMEOUT, ScriptResult, discover_scripts, format_report, relative_name, run_script
+
+# The stdlib modules imported by the scripts in the tree. Anything that
+# fails to import here (e.g. zoneinfo without tzdata) is simply skipped.
+PRELOAD_MODULES = (
+    "json", "re", "datetime", "zoneinfo", "math", "array", "copy", "asyncio",
+    "importlib.metadata", "importlib.util", "os", "random", "string",
+    "collections", "functools", "itertools", "subprocess",
+    # runpy.run_path() imports pkgutil on first use; do it once, here.
+    "pkgutil",
+)
+
+
+def preload(modules=PRELOAD_MODULES):
+    """Imports `modules` into the server and returns the ones that worked."""
+    loaded = []
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        loaded.append(name)
+    return loaded
+
+
+def _exit_code(code):
+    """Maps a SystemExit code to a process exit status, like the interpreter does."""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _child(script, workdir, stdout_path, stderr_path):
+    """Runs in the forked child. Never returns."""
+    status = 1
+    try:
+        os.chdir(workdir)
+        for fd, path, flags in ((0, os.devnull, os.O_RDONLY),
+                                (1, stdout_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+                                (2, stderr_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)):
+            new_fd = os.open(path, flags, 0o600)
+            os.dup2(new_fd, fd)
+            os.close(new_fd)
+        # Fresh text streams on the redirected descriptors: stdout is block
+        # buffered as it would be with a pipe, stderr stays line buffered.
+        sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", errors="replace", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", errors="backslashreplace", closefd=False, buffering=1)
+        sys.argv[:] = [script]
+        sys.path[0] = os.path.dirname(script)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        try:
+            runpy.run_path(script, run_name="__main__")
+            status = 0
+        except SystemExit as e:
+            status = _exit_code(e.code)
+        except BaseException:
+            traceback.print_exc()
+            status = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+class _Job:
+    def __init__(self, script, tmp_root):
+        self.script = script
+        self.tmp_root = tmp_root
+        self.workdir = os.path.join(tmp_root, "work")
+        self.stdout_path = os.path.join(tmp_root, "stdout")
+        self.stderr_path = os.path.join(tmp_root, "stderr")
+        self.pid = None
+        self.pidfd = None
+        self.start = None
+
+
+class ForkServer:
+    """
+    A warm interpreter that forks one child per script.
+
+    Args:
+        jobs (int | None): Maximum number of children running at once
+            (default: CPU count).
+        timeout (float): Seconds before a child is killed.
+        modules (tuple[str]): Modules to import before forking.
+    """
+
+    def __init__(self, jobs=None, timeout=DEFAULT_TIMEOUT, modules=PRELOAD_MODULES):
+        if not hasattr(os, "fork"):
+            raise OSError("fork_server needs os.fork(), which is only available on Unix")
+        self.jobs = jobs or os.cpu_count() or 1
+        self.timeout = timeout
+        self.preloaded = preload(modules)
+
+    def _start(self, script):
+        job = _Job(str(script), tempfile.mkdtemp(prefix="fork-server-"))
+        os.mkdir(job.workdir)
+        # Anything still sitting in our buffers would be written twice.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        job.start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            _child(job.script, job.workdir, job.stdout_path, job.stderr_path)
+        job.pid = pid
+        if hasattr(os, "pidfd_open"):
+            job.pidfd = os.pidfd_open(pid)
+        return job
+
+    def _finish(self, job, wait_status, rusage, timed_out=False):
+        wall_time = time.perf_counter() - job.start
+        if job.pidfd is not None:
+            os.close(job.pidfd)
+        outputs = []
+        for path in (job.stdout_path, job.stderr_path):
+            try:
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    outputs.append(f.read())
+            except FileNotFoundError:
+                outputs.append("")
+        shutil.rmtree(job.tmp_root, ignore_errors=True)
+        return ScriptResult(
+            script=relative_name(job.script),
+            returncode=os.waitstatus_to_exitcode(wait_status),
+            wall_time=wall_time,
+            cpu_time=rusage.ru_utime + rusage.ru_stime,
+            stdout=outputs[0],
+            stderr=outputs[1],
+            timed_out=timed_out,
+        )
+
+    def _collect(self, pid, wait_status, rusage, running, results, selector, timed_out=False):
+        index, job = running.pop(pid)
+        if selector is not None:
+            selector.unregister(job.pidfd)
+        results[index] = self._finish(job, wait_status, rusage, timed_out)
+
+    def run(self, scripts):
+        """
+        Runs `scripts`, at most `jobs` at a time.
+
+        Returns:
+            list[ScriptResult]: One result per script, in the order given.
+        """
+        pending = list(enumerate(scripts))
+        running = {}  # pid -> (index, job)
+        results = [None] * len(pending)
+        selector = selectors.DefaultSelector() if hasattr(os, "pidfd_open") else None
+
+        while pending or running:
+            while pending and len(running) < self.jobs:
+                index, script = pending.pop(0)
+                job = self._start(script)
+                running[job.pid] = (index, job)
+                if selector is not None:
+                    selector.register(job.pidfd, selectors.EVENT_READ, job.pid)
+
+            now = time.perf_counter()
+            for pid, (index, job) in list(running.items()):
+                if now - job.start > self.timeout:
+                    os.kill(pid, signal.SIGKILL)
+                    _, wait_status, rusage = os.wait4(pid, 0)
+                    self._collect(pid, wait_status, rusage, running, results, selector, timed_out=True)
+            if not running:
+                continue
+
+            # Wait until a child exits or the next deadline passes. With
+            # pidfds we can sleep in select(); otherwise poll every millisecond.
+            next_deadline = min(job.start for _, job in running.values()) + self.timeout
+            wait = max(0.0, next_deadline - time.perf_counter())
+            if selector is not None:
+                for key, _ in selector.select(wait):
+                    _, wait_status, rusage = os.wait4(key.data, 0)
+                    self._collect(key.data, wait_status, rusage, running, results, selector)
+            else:
+                pid, wait_status, rusage = os.wait4(-1, os.WNOHANG)
+                if pid == 0:
+                    time.sleep(min(wait, 0.001))
+                else:
+                    self._collect(pid, wait_status, rusage, running, results, selector)
+
+        if selector is not None:
+            selector.close()
+        return results
+
+
+def measure_overhead(server, samples=20):
+    """
+    Times an empty script through the fork server and through script_runner.
+
+    Returns:
+        tuple[float, float]: Mean seconds per script (fork server, fresh interpreter).
+    """
+    tmp = tempfile.mkdtemp(prefix="fork-server-empty-")
+    empty = os.path.join(tmp, "source.py")
+    open(empty, "w").close()
+    try:
+        start = time.perf_counter()
+        for _ in range(samples):
+            server.run([empty])
+        forked = (time.perf_counter() - start) / samples
+        start = time.perf_counter()
+        for _ in range(samples):
+            run_script(empty)
+        fresh = (time.perf_counter() - start) / samples
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return forked, fresh
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Python/ tutorial scripts from a warm, forking interpreter.")
+    parser.add_argument("paths", nargs="*", help="only run scripts below these paths (relative to Python/)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="children running at once (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-script timeout in seconds")
+    parser.add_argument("--measure-overhead", action="store_true",
+                        help="time an empty script here and in a fresh interpreter, then exit")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print stderr of failing scripts")
+    args = parser.parse_args(argv)
+
+    preload_start = time.perf_counter()
+    server = ForkServer(jobs=args.jobs, timeout=args.timeout)
+    print(f"Preloaded {len(server.preloaded)} modules in {time.perf_counter() - preload_start:.3f}s: "
+          f"{', '.join(server.preloaded)}")
+
+    if args.measure_overhead:
+        forked, fresh = measure_overhead(server)
+        print(f"Per-script startup: fork server {forked * 1000:.2f} ms, fresh interpreter {fresh * 1000:.2f} ms")
+        return 0
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    start = time.perf_counter()
+    results = server.run(scripts)
+    elapsed = time.perf_counter() - start
+
+    print(format_report(results, elapsed))
+    if args.verbose:
+        for r in results:
+            if not r.ok:
+                print(f"\n--- {r.script} ({r.status}) ---\n{r.stderr.rstrip()}")
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+import_profile.py
+
+Shows how much of each tutorial script's run time goes into imports.
+
+Every script is run with `python -X importtime`, which makes the interpreter
+print one line per imported module to stderr:
+
+    import time: self [us] | cumulative | imported package
+    import time:       412 |        412 |   _datetime
+    import time:       978 |       1390 | datetime
+
+The indentation of the module name gives the nesting. This tool parses those
+lines into a tree and reports, per script, the total import time, the part
+that comes from the script itself (anything a bare `python -c pass` does not
+import) and the most expensive top-level imports.
+
+With --lazy the scripts are also run through lazy_imports.py, so you can see
+what deferring rarely used imports saves. Lazy modules that do get used are
+executed outside the import statement and so no longer show up in the import
+time, which is why the wall time of both runs is printed as well.
+
+Usage:
+    python Tools/import_profile.py                       # summary for every script
+    python Tools/import_profile.py Tutorials/PIP --tree  # full import tree
+    python Tools/import_profile.py Tutorials/PIP Modules --lazy
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+
+from script_runner import DEFAULT_TIMEOUT, TOOLS_DIR, discover_scripts, relative_name, run_script, script_env
+
+LAZY_BOOTSTRAP = TOOLS_DIR / "lazy_imports.py"
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportNode:
+    """One imported module; times are in microseconds."""
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    children: list = field(default_factory=list)
+
+
+def parse_importtime(stderr):
+    """
+    Parses `-X importtime` output into a list of top-level ImportNodes.
+
+    The interpreter prints a module after all the modules it imported, so
+    children come before their parent. We keep a stack of finished nodes and
+    let each new node adopt the deeper nodes printed just before it.
+    """
+    pending = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        # One space separates the '|' from depth 0; every level adds two more.
+        depth = (len(indent) - 1) // 2
+        node = ImportNode(name, int(self_us), int(cumulative_us), depth)
+        while pending and pending[-1].depth > depth:
+            node.children.insert(0, pending.pop())
+        pending.append(node)
+    return pending
+
+
+def startup_imports(python=sys.executable):
+    """The top-level modules the interpreter imports before any script code runs."""
+    completed = subprocess.run(
+        [python, "-X", "importtime", "-c", "pass"],
+        capture_output=True, text=True, env=script_env(),
+    )
+    return {node.name for node in parse_importtime(completed.stderr)}
+
+
+def profile_script(script, lazy=False, timeout=DEFAULT_TIMEOUT, lazy_modules=None):
+    """
+    Runs one script with -X importtime.
+
+    Args:
+        script (Path): The script to profile.
+        lazy (bool): Run it through lazy_imports.py.
+        timeout (float): Seconds before the script is killed.
+        lazy_modules (str | None): Value for LAZY_IMPORTS when `lazy` is set.
+
+    Returns:
+        tuple[ScriptResult, list[ImportNode]]: The run and its import tree.
+    """
+    interpreter_args = ["-X", "importtime"]
+    env = {}
+    if lazy:
+        interpreter_args.append(str(LAZY_BOOTSTRAP))
+        if lazy_modules:
+            env["LAZY_IMPORTS"] = lazy_modules
+    result = run_script(script, timeout=timeout, interpreter_args=interpreter_args, env=env)
+    return result, parse_importtime(result.stderr)
+
+
+def summarize(tree, startup):
+    """Returns (total_us, script_us, top-level script nodes sorted by cost)."""
+    total = sum(node.cumulative_us for node in tree)
+    own = [node for node in tree if node.name not in startup]
+    own.sort(key=lambda node: node.cumulative_us, reverse=True)
+    return total, sum(node.cumulative_us for node in own), own
+
+
+def format_tree(nodes, min_us=0, indent=0):
+    """Renders an import tree, hiding modules cheaper than `min_us`."""
+    lines = []
+    for node in nodes:
+        if node.cumulative_us < min_us:
+            continue
+        lines.append(f"{node.cumulative_us / 1000:>9.2f} ms {node.self_us / 1000:>8.2f} ms  {'  ' * indent}{node.name}")
+        lines.extend(format_tree(node.children, min_us, indent + 1))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the import time of the Python/ tutorial scripts.")
+    parser.add_argument("paths", nargs="*", help="only profile scripts below these paths (relative to Python/)")
+    parser.add_argument("--top", type=int, default=3, help="how many top-level imports to list per script")
+    parser.add_argument("--tree", action="store_true", help="print the import tree of the script's own imports")
+    parser.add_argument("--min-ms", type=float, default=0.5, help="hide tree nodes cheaper than this (default: 0.5)")
+    parser.add_argument("--lazy", action="store_true", help="also run each script with lazy imports and compare")
+    parser.add_argument("--lazy-modules", default=os.environ.get("LAZY_IMPORTS"),
+                        help="modules to make lazy, comma-separated or '*' (default: lazy_imports.DEFAULT_LAZY_MODULES)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-script timeout in seconds")
+    args = parser.parse_args(argv)
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    startup = startup_imports()
+    header = f"{'total ms':>9} {'script ms':>9}"
+    if args.lazy:
+        header += f" {'lazy ms':>9} {'wall s':>7} {'lazy s':>7}"
+    print(f"{header}  script (top imports)")
+
+    for script in scripts:
+        result, tree = profile_script(script, timeout=args.timeout)
+        total, own_total, own = summarize(tree, startup)
+        line = f"{total / 1000:>9.2f} {own_total / 1000:>9.2f}"
+        if args.lazy:
+            lazy_result, lazy_tree = profile_script(script, lazy=True, timeout=args.timeout,
+                                                    lazy_modules=args.lazy_modules)
+            _, lazy_own_total, _ = summarize(lazy_tree, startup)
+            line += f" {lazy_own_total / 1000:>9.2f} {result.wall_time:>7.3f} {lazy_result.wall_time:>7.3f}"
+        top = ", ".join(f"{node.name} {node.cumulative_us / 1000:.1f}" for node in own[:args.top])
+        status = "" if result.ok else f" [{result.status}]"
+        print(f"{line}  {relative_name(script)}{status} ({top})")
+        if args.tree:
+            print("\n".join(format_tree(own, min_us=args.min_ms * 1000, indent=1)) or "      (no imports above threshold)")
+
+    print("\n'script ms' excludes the modules every interpreter imports at startup.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+lazy_imports.py
+
+Runs a tutorial script with some of its imports made lazy.
+
+A lazy module is created when the script imports it, but its code only runs
+the first time one of its attributes is used (importlib.util.LazyLoader).
+Scripts that import something expensive "just in case" - such as
+Tutorials/PIP, which imports pkg_resources for a fallback that is almost
+never taken - then stop paying for it.
+
+Which modules are lazy is read from the LAZY_IMPORTS environment variable:
+a comma-separated list of module names, or '*' for every module that is not
+already imported. Without the variable, DEFAULT_LAZY_MODULES is used.
+
+Usage:
+    python Tools/lazy_imports.py Tutorials/PIP/source.py
+    LAZY_IMPORTS='*' python Tools/lazy_imports.py Modules/JSON/source.py
+
+Caveat: a module with import-time side effects (registering plugins, patching
+other modules, printing) only has them when it is first used.
+"""
+
+import os
+import sys
+
+# Imports in the tree that are expensive and often unused.
+DEFAULT_LAZY_MODULES = ("pkg_resources", "zoneinfo")
+
+# The import machinery itself must stay eager, or LazyLoader ends up
+# loading lazily through a half-initialised importlib package.
+NEVER_LAZY = ("importlib",)
+
+
+class LazyFinder:
+    """
+    A meta path finder that wraps the loaders of selected modules in
+    importlib.util.LazyLoader. Finding the module is still done by the
+    regular finders, so a missing module still raises ImportError right away.
+
+    It deliberately does not subclass importlib.abc.MetaPathFinder, and only
+    imports importlib.util once a lazy module is actually requested: those
+    imports cost more than most scripts could save.
+    """
+
+    def __init__(self, names):
+        self.lazy_all = "*" in names
+        self.names = frozenset(n for n in names if n != "*")
+        self._lazy_loader = None
+
+    def wants(self, fullname):
+        if self._lazy_loader is False:
+            # We are importing importlib.util ourselves (see below).
+            return False
+        top_level = fullname.split(".", 1)[0]
+        if top_level in NEVER_LAZY:
+            return False
+        return self.lazy_all or fullname in self.names or top_level in self.names
+
+    def find_spec(self, fullname, path, target=None):
+        if not self.wants(fullname):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        # Built-in and frozen modules are cheap and do not support lazy loading.
+        if spec.loader is None or not hasattr(spec.loader, "exec_module") or spec.origin in ("built-in", "frozen"):
+            return spec
+        if self._lazy_loader is None:
+            self._lazy_loader = False
+            from importlib.util import LazyLoader
+            self._lazy_loader = LazyLoader
+        spec.loader = self._lazy_loader(spec.loader)
+        return spec
+
+
+def lazy_module_names(value=None):
+    """Parses LAZY_IMPORTS (or `value`) into a tuple of module names."""
+    if value is None:
+        value = os.environ.get("LAZY_IMPORTS")
+    if not value:
+        return DEFAULT_LAZY_MODULES
+    return tuple(name.strip() for name in value.split(",") if name.strip())
+
+
+def install(names=None):
+    """Puts a LazyFinder at the front of sys.meta_path and returns it."""
+    finder = LazyFinder(lazy_module_names() if names is None else names)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+def run(script, args=()):
+    """
+    Runs `script` as __main__, the same way `python script.py` would.
+
+    runpy.run_path() would do the same, but it imports pkgutil and typing,
+    which is slower than everything lazy imports save for a short script.
+    """
+    script = os.path.abspath(script)
+    with open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+    sys.argv[:] = [script, *args]
+    sys.path[0] = os.path.dirname(script)
+    main_module = type(sys)("__main__")
+    main_module.__file__ = script
+    main_module.__builtins__ = __builtins__
+    sys.modules["__main__"] = main_module
+    install()
+    exec(code, main_module.__dict__)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python lazy_imports.py SCRIPT [ARGS...]")
+    run(sys.argv[1], sys.argv[2:])
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+line_profile.py
+
+Shows which lines of a tutorial script its run time is spent on.
+
+cProfile works per function, but most tutorials are one long stretch of
+module-level code, so it can only say "<module> took 40 ms". This tool counts
+how often every line runs and how much time is spent on it, and can export
+the result as collapsed stacks for flame graph tools (flamegraph.pl,
+speedscope, ...).
+
+There are two ways to collect the numbers:
+
+- Sampling (default) interrupts the program every millisecond of CPU time
+  and records the current stack. It stays within about 10% of the plain run,
+  even for tight loops, but it gives estimates and no execution counts. The
+  kernel may only deliver a sample every few milliseconds, and most
+  tutorials finish in one, so a short script is run again and again (in a
+  fresh __main__, showing only the first run's output) until the runs add
+  up to about two seconds; the times are then totals over all runs, and a
+  line that takes under 1% of a run may not show up at all. Unix only;
+  elsewhere tracing is used.
+- Tracing (--trace) counts every line execution exactly. On Python 3.12+ it
+  uses sys.monitoring (PEP 669) with only LINE and function start/return
+  events enabled; with --only-script every line outside the script is
+  switched off at its first hit, so the rest of the program runs at full
+  speed. Older interpreters fall back to sys.settrace(). Each traced line
+  costs about a microsecond, as much as a simple line of module code takes
+  itself (even a callback that does nothing costs 1.8x on 3.13), so the
+  tutorials run 2-4x slower and tight loops many times slower.
+
+Time is charged to the line that was running: the time between two line
+events goes to the first of them. Calls into C code (print(), str methods,
+...) are therefore included in the calling line; calls into Python code are
+charged to the called function's own lines.
+
+Usage:
+    python Tools/line_profile.py Methods/String-Methods/source.py
+    python Tools/line_profile.py Methods/Keywords/source.py --quiet --top 30 --trace --only-script
+    python Tools/line_profile.py Methods/Built-In-Functions/source.py --quiet --collapsed stacks.txt
+    python Tools/line_profile.py Methods/String-Methods/source.py --overhead
+    python Tools/line_profile.py Methods/String-Methods/source.py --overhead --trace
+"""
+
+import argparse
+import contextlib
+import linecache
+import math
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+from script_runner import PYTHON_ROOT
+
+HAS_MONITORING = hasattr(sys, "monitoring")
+BACKEND = "sys.monitoring" if HAS_MONITORING else "sys.settrace"
+_now = time.perf_counter_ns
+CAN_SAMPLE = hasattr(signal, "setitimer")  # SIGPROF timers are Unix only
+DEFAULT_INTERVAL = 0.001
+SAMPLE_SECONDS = 2.0  # when sampling, short scripts are repeated until they ran this long
+MAX_REPEAT = 10_000
+
+# The profiler's own frames (and the `with` machinery around the script)
+# are never recorded.
+IGNORED_FILES = frozenset({os.path.abspath(__file__), contextlib.__file__})
+
+
+class _LineData:
+    """
+    Per-line results shared by both profilers.
+
+    `lines` maps (caller stack, id(code), line) to [count, ns]; a caller stack
+    is a tuple of (id(code), line) pairs, outermost first.
+    """
+
+    count_label = "hits"
+
+    def __init__(self):
+        self.lines = {}
+        self.codes = {}  # id(code) -> code, keeps the ids valid
+
+    def per_line(self):
+        """Returns {(filename, line): [count, ns]}, summed over all callers."""
+        totals = {}
+        for (_, code_id, line), (count, ns) in self.lines.items():
+            entry = totals.setdefault((self.codes[code_id].co_filename, line), [0, 0])
+            entry[0] += count
+            entry[1] += ns
+        return totals
+
+    def collapsed_stacks(self):
+        """Returns flame graph input lines: 'frame;frame;frame <microseconds>'."""
+        folded = {}
+        for (prefix, code_id, line), (_, ns) in self.lines.items():
+            frames = [_frame_label(self.codes[c], l) for c, l in prefix] + [_frame_label(self.codes[code_id], line)]
+            key = ";".join(frames)
+            folded[key] = folded.get(key, 0) + ns
+        return [f"{stack} {ns // 1000}" for stack, ns in sorted(folded.items()) if ns >= 1000]
+
+
+class LineProfiler(_LineData):
+    """
+    Counts every line execution and times it exactly.
+
+    Results are kept per (caller stack, code object, line) so the same data
+    gives both the flat per-line table and the collapsed stacks. A caller
+    stack is a tuple of (code, line) pairs that is built once per call, when
+    the function starts, not on every line.
+
+    Code objects are referred to by id() in all keys: hashing a code object
+    hashes its bytecode and constants, which for a 600-line module costs more
+    than everything else the profiler does per line.
+
+    Args:
+        only_files (set[str] | None): If given, lines in other files are not
+            counted; their time goes to the line that called into them.
+    """
+
+    def __init__(self, only_files=None):
+        super().__init__()
+        self.only_files = only_files
+        self._stack = []  # [id(code), current line, prefix] per running frame
+        self._current = None  # [count, ns] of the line that is running
+        self._since = 0
+
+    # --- event handlers shared by both back ends ---
+
+    def _push(self, code):
+        code_id = id(code)
+        if code_id not in self.codes:
+            self.codes[code_id] = code
+        if self._stack:
+            caller = self._stack[-1]
+            prefix = caller[2] + ((caller[0], caller[1]),)
+        else:
+            prefix = ()
+        self._stack.append([code_id, code.co_firstlineno, prefix])
+
+    def _pop(self):
+        if self._stack:
+            self._stack.pop()
+
+    def _line(self, code, line):
+        # Called for every line: names are looked up once and the running
+        # line's entry is kept itself, not its key.
+        now = _now()
+        current = self._current
+        if current is not None:
+            current[1] += now - self._since
+        stack = self._stack
+        if not stack or stack[-1][0] != id(code):
+            # Profiling started in the middle of this frame.
+            self._push(code)
+        frame = stack[-1]
+        frame[1] = line
+        key = (frame[2], frame[0], line)
+        entry = self.lines.get(key)
+        if entry is None:
+            entry = self.lines[key] = [0, 0]
+        entry[0] += 1
+        self._current = entry
+        self._since = _now()
+
+    def _wanted(self, code):
+        return self.only_files is None or code.co_filename in self.only_files
+
+    @staticmethod
+    def _ignored(code):
+        return code.co_filename in IGNORED_FILES
+
+    # --- sys.monitoring back end (Python 3.12+) ---
+
+    def _start_monitoring(self):
+        mon = sys.monitoring
+        # PROFILER_ID is also what cProfile uses; take any free id if it's busy.
+        ids = [mon.PROFILER_ID, *range(6)]
+        tool = self._tool = next((i for i in ids if mon.get_tool(i) is None), None)
+        if tool is None:
+            raise RuntimeError("all sys.monitoring tool ids are in use")
+        mon.use_tool_id(tool, "line_profile")
+        events = mon.events
+        disable = mon.DISABLE
+        line_event, only_files = self._line, self.only_files
+
+        # Returning DISABLE switches an event off for that code location
+        # for good, so code we don't care about costs nothing after its
+        # first event. Start and stop events are always disabled together
+        # (except PY_UNWIND, which can't be).
+        def on_line(code, line):
+            filename = code.co_filename
+            if filename in IGNORED_FILES or (only_files is not None and filename not in only_files):
+                return disable
+            line_event(code, line)
+
+        def on_start(code, offset):
+            if self._ignored(code):
+                return disable
+            self._push(code)
+
+        def on_stop(code, offset, value):
+            if self._ignored(code):
+                return disable
+            self._pop()
+
+        def on_unwind(code, offset, exception):
+            # PY_UNWIND can't be disabled (returning DISABLE raises
+            # ValueError in the profiled code and removes the callback).
+            if not self._ignored(code):
+                self._pop()
+
+        mon.register_callback(tool, events.LINE, on_line)
+        mon.register_callback(tool, events.PY_START, on_start)
+        mon.register_callback(tool, events.PY_RESUME, on_start)
+        mon.register_callback(tool, events.PY_RETURN, on_stop)
+        mon.register_callback(tool, events.PY_YIELD, on_stop)
+        mon.register_callback(tool, events.PY_UNWIND, on_unwind)
+        mon.set_events(tool, events.LINE | events.PY_START | events.PY_RESUME |
+                       events.PY_RETURN | events.PY_YIELD | events.PY_UNWIND)
+
+    def _stop_monitoring(self):
+        mon = sys.monitoring
+        mon.set_events(self._tool, 0)
+        for event in (mon.events.LINE, mon.events.PY_START, mon.events.PY_RESUME,
+                      mon.events.PY_RETURN, mon.events.PY_YIELD, mon.events.PY_UNWIND):
+            mon.register_callback(self._tool, event, None)
+        mon.free_tool_id(self._tool)
+
+    # --- sys.settrace back end (older Pythons) ---
+
+    def _trace(self, frame, event, arg):
+        if event == "call":
+            if self._ignored(frame.f_code):
+                return None
+            self._push(frame.f_code)
+            if not self._wanted(frame.f_code):
+                # Still pops on 'return', but no line events for this frame.
+                frame.f_trace_lines = False
+            return self._trace
+        if event == "line":
+            self._line(frame.f_code, frame.f_lineno)
+        elif event == "return":
+            self._pop()
+        return self._trace
+
+    # --- public API ---
+
+    @contextlib.contextmanager
+    def profiling(self):
+        """Profiles the code run inside the `with` block."""
+        if HAS_MONITORING:
+            self._start_monitoring()
+        else:
+            sys.settrace(self._trace)
+        try:
+            yield self
+        finally:
+            if HAS_MONITORING:
+                self._stop_monitoring()
+            else:
+                sys.settrace(None)
+            if self._current is not None:
+                self._current[1] += _now() - self._since
+                self._current = None
+
+
+class SamplingProfiler(_LineData):
+    """
+    Estimates time per line by sampling instead of tracing.
+
+    A SIGPROF timer interrupts the program every `interval` seconds of CPU
+    time and the handler records the current stack. Nothing runs between
+    samples, so the cost is a few percent no matter how tight the loops are,
+    but the numbers are estimates: the 'count' is a number of samples, not of
+    executions, and time spent sleeping or waiting is not seen. Unix only.
+
+    The kernel may deliver the signal less often than asked (every 4 ms with
+    HZ=250), so each sample is charged the CPU time since the previous one,
+    not `interval`.
+    """
+
+    count_label = "samples"
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        super().__init__()
+        self.interval = interval
+        self._last = 0  # CPU time of the previous sample
+
+    def _sample(self, signum, frame):
+        now = time.process_time_ns()
+        ns, self._last = now - self._last, now
+        stack = []
+        while frame is not None and frame.f_code.co_filename not in IGNORED_FILES:
+            code = frame.f_code
+            code_id = id(code)
+            if code_id not in self.codes:
+                self.codes[code_id] = code
+            stack.append((code_id, frame.f_lineno))
+            frame = frame.f_back
+        if not stack:
+            return
+        stack.reverse()
+        key = (tuple(stack[:-1]), *stack[-1])
+        entry = self.lines.get(key)
+        if entry is None:
+            self.lines[key] = [1, ns]
+        else:
+            entry[0] += 1
+            entry[1] += ns
+
+    @contextlib.contextmanager
+    def profiling(self):
+        """Samples the code run inside the `with` block."""
+        previous = signal.signal(signal.SIGPROF, self._sample)
+        self._last = time.process_time_ns()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        try:
+            yield self
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, previous)
+
+
+def _short_path(filename):
+    try:
+        return Path(filename).resolve().relative_to(PYTHON_ROOT).as_posix()
+    except ValueError:
+        return os.path.basename(filename)
+
+
+def _frame_label(code, line):
+    # ';' separates frames and ' ' the count in the collapsed format.
+    return f"{code.co_name} ({_short_path(code.co_filename)}:{line})".replace(";", ":").replace(" ", "_")
+
+
+def profile_script(script, profiler=None, quiet=False, repeat=1):
+    """
+    Runs `script` as __main__ in this process, in a temporary working
+    directory, with `profiler` attached.
+
+    Args:
+        script (str | Path): The script to run.
+        profiler (LineProfiler | SamplingProfiler | None): The profiler to
+            attach; None gives a plain timed run.
+        quiet (bool): Send the script's stdout to /dev/null.
+        repeat (int): Run the script this many times, each in a fresh
+            __main__, with the profiler attached once around all runs. Only
+            the first run's output and traceback are shown.
+
+    Returns:
+        float: The wall time of all runs in seconds.
+    """
+    script = os.path.abspath(script)
+    with open(script, "rb") as f:
+        code = compile(f.read(), script, "exec")
+
+    saved = sys.modules["__main__"], list(sys.argv), list(sys.path), os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="line-profile-")
+    sys.argv[:] = [script]
+    sys.path[0] = os.path.dirname(script)
+    os.chdir(workdir)
+
+    stdout = sys.stdout
+    start = time.perf_counter()
+    try:
+        profiling = profiler.profiling() if profiler is not None else contextlib.nullcontext()
+        with open(os.devnull, "w") as devnull, profiling:
+            for run in range(repeat):
+                main_module = type(sys)("__main__")
+                main_module.__file__ = script
+                main_module.__builtins__ = __builtins__
+                sys.modules["__main__"] = main_module
+                with contextlib.redirect_stdout(devnull if quiet or run else stdout):
+                    try:
+                        exec(code, main_module.__dict__)
+                    except SystemExit:
+                        pass
+                    except BaseException:
+                        if not run:
+                            traceback.print_exc()
+    finally:
+        elapsed = time.perf_counter() - start
+        sys.modules["__main__"], sys.argv[:], sys.path[:], cwd = saved
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return elapsed
+
+
+def format_table(profiler, top=20):
+    totals = profiler.per_line()
+    grand_total = sum(ns for _, ns in totals.values()) or 1
+    rows = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    lines = [f"{'time ms':>9} {'%':>6} {profiler.count_label:>8}  location", "-" * 78]
+    for (filename, line), (hits, ns) in rows:
+        source = linecache.getline(filename, line).strip()
+        if len(source) > 40:
+            source = source[:37] + "..."
+        lines.append(f"{ns / 1e6:>9.3f} {ns / grand_total:>6.1%} {hits:>8}  {_short_path(filename)}:{line}  {source}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Line-level time profile of a tutorial script.")
+    parser.add_argument("script", help="the script to profile, e.g. Methods/String-Methods/source.py")
+    parser.add_argument("--top", type=int, default=20, help="number of lines to list (default: 20)")
+    method = parser.add_mutually_exclusive_group()
+    method.add_argument("--sample", type=float, default=DEFAULT_INTERVAL, metavar="SECONDS",
+                        help="sample the stack every SECONDS of CPU time (default: 0.001)")
+    method.add_argument("--trace", action="store_true",
+                        help="count and time every line exactly instead of sampling (2-4x slower)")
+    parser.add_argument("--only-script", action="store_true", help="with --trace, only time lines of the script itself")
+    parser.add_argument("--repeat", type=int, metavar="N",
+                        help="run the script N times and add up the results (default: 1 with --trace; "
+                             f"when sampling, enough runs for about {SAMPLE_SECONDS:g}s)")
+    parser.add_argument("--quiet", action="store_true", help="hide the script's own output")
+    parser.add_argument("--collapsed", metavar="FILE", help="write collapsed stacks (microseconds) to FILE")
+    parser.add_argument("--overhead", action="store_true",
+                        help="compare the wall time of plain and profiled runs of the script")
+    args = parser.parse_args(argv)
+    trace = args.trace or not CAN_SAMPLE
+    if args.only_script and not trace:
+        parser.error("--only-script needs --trace")
+
+    script = Path(args.script)
+    if not script.is_absolute() and not script.exists():
+        script = PYTHON_ROOT / script
+
+    def new_profiler():
+        if trace:
+            return LineProfiler(only_files={str(script.resolve())} if args.only_script else None)
+        return SamplingProfiler(args.sample)
+
+    method = BACKEND if trace else f"sampling every {args.sample * 1000:g} ms"
+    repeat = args.repeat or 1
+    if args.repeat is None and not trace:
+        # Most tutorials run for a millisecond or two, less than the time
+        # between two samples, so they are run until there are enough. The
+        # first run also pays for the script's imports.
+        once = min(profile_script(script, quiet=True) for _ in range(2))
+        repeat = min(MAX_REPEAT, max(1, math.ceil(SAMPLE_SECONDS / once)))
+
+    runs = f", {repeat} runs" if repeat > 1 else ""
+
+    if args.overhead:
+        # The first run pays for the script's imports; after that, plain and
+        # profiled runs of the module code can be compared fairly.
+        profile_script(script, quiet=True)
+        plain = min(profile_script(script, quiet=True, repeat=repeat) for _ in range(3))
+        profiled = min(profile_script(script, new_profiler(), quiet=True, repeat=repeat) for _ in range(3))
+        print(f"plain {plain / repeat * 1000:.2f} ms, profiled {profiled / repeat * 1000:.2f} ms per run "
+              f"({method}{runs}): {profiled / plain:.2f}x")
+        return 0
+
+    profiler = new_profiler()
+    elapsed = profile_script(script, profiler, quiet=args.quiet, repeat=repeat)
+    print(f"\n--- Line profile of {_short_path(str(script))} ({elapsed:.3f}s, {method}{runs}) ---")
+    print(format_table(profiler, args.top))
+    if not profiler.lines:
+        print("No samples: the script ran for less than the interval. Use --trace or a larger --repeat.")
+    if args.collapsed:
+        with open(args.collapsed, "w", encoding="utf-8") as f:
+            f.write("\n".join(profiler.collapsed_stacks()) + "\n")
+        print(f"\nCollapsed stacks written to '{args.collapsed}'.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
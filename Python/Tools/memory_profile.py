@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+"""
+memory_profile.py
+
+Shows how much memory a tutorial script needs and what it is spent on.
+
+A script is run in this process with tracemalloc switched on, and the report
+gives:
+- the peak of the memory traced while the script ran (its high-water mark),
+- the allocation sites (file:line) of the memory still alive when it ends,
+- the objects it created that are still alive, counted by type.
+
+Most tutorials keep their data in module globals, so the memory alive at
+the end is usually what made up the peak. A line that builds a large
+temporary and drops it again shows up in the peak but not in the table.
+
+Given a directory (or several scripts) instead of one script, every script
+is measured in a fresh interpreter and only the summary is printed, including
+the maximum RSS of the process. RSS covers the whole interpreter plus
+tracemalloc's own bookkeeping, so it overestimates what the script needs on
+its own; that makes it a safe number to size a memory limit with.
+
+Usage:
+    python Tools/memory_profile.py File-Handling/Read-File/source.py
+    python Tools/memory_profile.py Tutorials/Dictionaries/source.py --quiet --top 20 --frames 3
+    python Tools/memory_profile.py Tutorials Methods            # summary, one interpreter per script
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import linecache
+import os
+import sys
+import tracemalloc
+from pathlib import Path
+
+from line_profile import profile_script
+from script_runner import DEFAULT_TIMEOUT, PYTHON_ROOT, discover_scripts, relative_name, run_all
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Allocations made by the harness itself are left out of the sites table.
+IGNORED_FILES = (os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "line_profile.py"),
+                 contextlib.__file__, tracemalloc.__file__)
+
+
+def max_rss():
+    """The peak resident set size of this process in bytes, or None without `resource`."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _type_name(cls):
+    if cls.__module__ == "builtins":
+        return cls.__qualname__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def count_objects(exclude=None):
+    """
+    Counts the live objects by type.
+
+    gc only tracks containers, so the objects they refer to directly (str,
+    int, float, bytes, ...) are counted as well.
+
+    Args:
+        exclude (dict | None): An earlier result of count_objects(); it is
+            alive while counting again and must not count itself.
+
+    Returns:
+        dict: {type name: [count, shallow size in bytes]}
+    """
+    counts = {}
+    seen = set()
+    # The bookkeeping of this function (and of the earlier count) is skipped
+    # together with everything it refers to.
+    skip = {id(counts), id(seen)}
+    if exclude is not None:
+        skip.add(id(exclude))
+        skip.update(id(entry) for entry in exclude.values())
+    skip.add(id(skip))
+    for container in gc.get_objects():
+        if id(container) in skip:
+            continue
+        for obj in (container, *gc.get_referents(container)):
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            entry = counts.setdefault(_type_name(type(obj)), [0, 0])
+            entry[0] += 1
+            entry[1] += sys.getsizeof(obj, 0)
+    return counts
+
+
+class MemoryProfiler:
+    """
+    Collects peak memory, allocation sites and object counts for the code run
+    inside profiling().
+
+    Args:
+        frames (int): Stack frames stored per allocation; more frames give
+            'traceback' grouping something to show but cost more memory.
+        group_by (str): How allocation sites are grouped: 'lineno',
+            'filename' or 'traceback'.
+    """
+
+    def __init__(self, frames=1, group_by="lineno"):
+        self.frames = frames
+        self.group_by = group_by
+        self.peak = 0
+        self.current = 0
+        self.snapshot = None
+        self.objects = {}  # type name -> [count, bytes], created and still alive
+
+    @contextlib.contextmanager
+    def profiling(self):
+        """Traces the memory allocated inside the `with` block."""
+        gc.collect()
+        before = count_objects()
+        tracemalloc.start(self.frames)
+        try:
+            yield self
+        finally:
+            self.current, self.peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            self.snapshot = snapshot.filter_traces([tracemalloc.Filter(False, f) for f in IGNORED_FILES])
+            # Still inside the run: the script's globals are alive here.
+            gc.collect()
+            after = count_objects(exclude=before)
+            self.objects = {}
+            for name, (count, size) in after.items():
+                old_count, old_size = before.get(name, (0, 0))
+                if count > old_count:
+                    self.objects[name] = [count - old_count, max(size - old_size, 0)]
+
+    def top_sites(self, top=10):
+        """Returns the `top` tracemalloc.Statistic entries with the most memory."""
+        return self.snapshot.statistics(self.group_by)[:top]
+
+    def top_types(self, top=10):
+        """Returns [(type name, count, bytes)] sorted by size."""
+        rows = [(name, count, size) for name, (count, size) in self.objects.items()]
+        rows.sort(key=lambda row: (row[2], row[1]), reverse=True)
+        return rows[:top]
+
+    def as_dict(self, top=10):
+        return {
+            "peak": self.peak,
+            "current": self.current,
+            "max_rss": max_rss(),
+            "objects": sum(count for count, _ in self.objects.values()),
+            "sites": [{"site": _site_label(stat.traceback), "size": stat.size, "count": stat.count}
+                      for stat in self.top_sites(top)],
+            "types": [{"type": name, "count": count, "size": size} for name, count, size in self.top_types(top)],
+        }
+
+
+def _short_path(filename):
+    try:
+        return Path(filename).resolve().relative_to(PYTHON_ROOT).as_posix()
+    except ValueError:
+        return filename
+
+
+def _site_label(traceback):
+    # Innermost frame first; the harness frames below the script are dropped.
+    return " <- ".join(f"{_short_path(frame.filename)}:{frame.lineno}"
+                       for frame in traceback if frame.filename not in IGNORED_FILES)
+
+
+def format_size(size):
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_report(profiler, top=10):
+    """Builds the detailed report for one script."""
+    lines = [
+        f"peak traced memory  {format_size(profiler.peak):>12}",
+        f"traced at exit      {format_size(profiler.current):>12}",
+    ]
+    rss = max_rss()
+    if rss is not None:
+        lines.append(f"max RSS             {format_size(rss):>12}  (whole process, including tracemalloc)")
+
+    lines += ["", f"Top allocation sites alive at exit (by {profiler.group_by}):",
+              f"{'size':>12} {'blocks':>8}  location", "-" * 78]
+    for stat in profiler.top_sites(top):
+        frame = stat.traceback[0]
+        source = linecache.getline(frame.filename, frame.lineno).strip() if profiler.group_by == "lineno" else ""
+        if len(source) > 40:
+            source = source[:37] + "..."
+        lines.append(f"{format_size(stat.size):>12} {stat.count:>8}  {_site_label(stat.traceback)}  {source}".rstrip())
+
+    lines += ["", "Objects created by the script and alive at exit:",
+              f"{'size':>12} {'count':>8}  type", "-" * 78]
+    for name, count, size in profiler.top_types(top):
+        lines.append(f"{format_size(size):>12} {count:>8}  {name}")
+    return "\n".join(lines)
+
+
+def summarize(scripts, jobs=None, timeout=DEFAULT_TIMEOUT, frames=1):
+    """
+    Measures every script in a fresh interpreter.
+
+    Returns:
+        list[tuple[ScriptResult, dict | None]]: The run and the memory report
+        of each script; the report is None if the script could not be measured.
+    """
+    results = run_all(scripts, jobs=jobs, timeout=timeout,
+                      interpreter_args=[os.path.abspath(__file__), "--quiet", "--frames", str(frames), "--json", "-"])
+    summary = []
+    for result in results:
+        try:
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            report = None
+        summary.append((result, report))
+    return summary
+
+
+def format_summary(summary):
+    width = max([len(result.script) for result, _ in summary] + [6])
+    lines = [f"{'peak':>12} {'at exit':>12} {'max RSS':>12} {'objects':>8}  script", "-" * (50 + width)]
+    for result, report in summary:
+        if report is None:
+            lines.append(f"{'-':>12} {'-':>12} {'-':>12} {'-':>8}  {result.script} [{result.status}]")
+            continue
+        rss = format_size(report["max_rss"]) if report["max_rss"] is not None else "-"
+        # The script's exceptions are printed, not propagated: flag partial runs.
+        note = " [raised]" if "Traceback (most recent call last)" in result.stderr else ""
+        lines.append(f"{format_size(report['peak']):>12} {format_size(report['current']):>12} {rss:>12} "
+                     f"{report['objects']:>8}  {result.script}{note}")
+    measured = [report for _, report in summary if report is not None]
+    if measured:
+        lines.append("-" * (50 + width))
+        biggest = max(measured, key=lambda report: report["peak"])
+        lines.append(f"{len(summary)} scripts, largest peak {format_size(biggest['peak'])}, "
+                     f"largest max RSS {format_size(max(r['max_rss'] or 0 for r in measured))}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak memory, allocation sites and object counts of tutorial scripts.")
+    parser.add_argument("paths", nargs="*",
+                        help="one script for a detailed report, or directories (relative to Python/) for a summary")
+    parser.add_argument("--top", type=int, default=10, help="number of sites and types to list (default: 10)")
+    parser.add_argument("--group-by", choices=("lineno", "filename", "traceback"), default="lineno",
+                        help="how allocation sites are grouped (default: lineno)")
+    parser.add_argument("--frames", type=int, default=1, help="stack frames stored per allocation (default: 1)")
+    parser.add_argument("--quiet", action="store_true", help="hide the script's own output")
+    parser.add_argument("--json", metavar="FILE", help="write the report as JSON to FILE ('-' for stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for a summary (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-script timeout for a summary")
+    args = parser.parse_args(argv)
+
+    script = None
+    if len(args.paths) == 1:
+        script = Path(args.paths[0])
+        if not script.is_absolute() and not script.exists():
+            script = PYTHON_ROOT / script
+        if not script.is_file():
+            script = None
+
+    if script is None:
+        scripts = discover_scripts(args.paths)
+        if not scripts:
+            print("No scripts found.")
+            return 1
+        print(format_summary(summarize(scripts, args.jobs, args.timeout, args.frames)))
+        return 0
+
+    profiler = MemoryProfiler(frames=args.frames, group_by=args.group_by)
+    elapsed = profile_script(script, profiler, quiet=args.quiet or args.json == "-")
+    if args.json:
+        report = json.dumps({"script": relative_name(script), "elapsed": elapsed, **profiler.as_dict(args.top)})
+        if args.json == "-":
+            print(report)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f:
+                f.write(report + "\n")
+        return 0
+
+    print(f"\n--- Memory profile of {relative_name(script)} ({elapsed:.3f}s, {args.frames} frame(s) per allocation) ---")
+    print(format_report(profiler, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+script_runner.py
+
+Runs every tutorial script under Python/ as a smoke suite.
+
+Each script is executed in a fresh interpreter inside its own temporary
+working directory, so the scripts that write fixed file names into the
+current directory (my_new_file_w.txt, output.txt, sample.txt, data.json, ...)
+never collide when they run side by side. Scripts are dispatched to a
+process pool and the wall time, CPU time and exit status of each one is
+reported.
+
+Usage:
+    python Tools/script_runner.py                    # run the whole tree
+    python Tools/script_runner.py -j 8 Modules       # only Python/Modules/**
+    python Tools/script_runner.py --json report.json # also save a JSON report
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+# `resource` only exists on Unix. Without it we still run the scripts,
+# we just can't report CPU time.
+try:
+    import resource
+except ImportError:
+    resource = None
+
+TOOLS_DIR = Path(__file__).resolve().parent
+PYTHON_ROOT = TOOLS_DIR.parent
+
+# Most tutorials are called 'source.py'; Tutorials/Sets uses 'src.py'.
+SCRIPT_NAMES = ("source.py", "src.py")
+DEFAULT_TIMEOUT = 60.0
+
+
+@dataclass
+class ScriptResult:
+    """The outcome of running one tutorial script."""
+    script: str  # path relative to PYTHON_ROOT, using forward slashes
+    returncode: int
+    wall_time: float
+    cpu_time: float
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+    @property
+    def status(self):
+        if self.timed_out:
+            return "TIMEOUT"
+        return "ok" if self.returncode == 0 else f"FAIL({self.returncode})"
+
+
+def relative_name(script):
+    """Returns the tutorial path of a script, e.g. 'Modules/JSON/source.py'."""
+    script = Path(script).resolve()
+    try:
+        return script.relative_to(PYTHON_ROOT).as_posix()
+    except ValueError:
+        # Not part of the tree (e.g. a temporary script); keep the full path.
+        return script.as_posix()
+
+
+def discover_scripts(only=None, root=PYTHON_ROOT):
+    """
+    Finds the tutorial scripts below `root`.
+
+    Args:
+        only (list[str] | None): Optional path prefixes relative to `root`
+            (e.g. ['Modules', 'File-Handling/Read-File']). When given, only
+            scripts below one of them are returned.
+        root (Path): The directory to search.
+
+    Returns:
+        list[Path]: The scripts, sorted by path. Tools/ itself is skipped.
+    """
+    root = Path(root).resolve()
+    found = set()
+    for name in SCRIPT_NAMES:
+        for path in root.rglob(name):
+            if TOOLS_DIR not in path.parents:
+                found.add(path)
+    scripts = sorted(found)
+    if only:
+        prefixes = [p.strip("/") for p in only]
+        scripts = [
+            s for s in scripts
+            if any(s.relative_to(root).as_posix().startswith(p + "/") or
+                   s.relative_to(root).as_posix() == p
+                   for p in prefixes)
+        ]
+    return scripts
+
+
+def script_env(extra=None):
+    """The environment every script runs with: UTF-8 output, no bytecode writes."""
+    env = dict(os.environ)
+    env["PYTHONIOENCODING"] = "utf-8"
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    if extra:
+        env.update(extra)
+    return env
+
+
+def _children_cpu_time():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_script(script, timeout=DEFAULT_TIMEOUT, python=sys.executable,
+               interpreter_args=(), stdin_data=None, keep_workdir=False,
+               env=None):
+    """
+    Runs one script in a fresh interpreter inside a private temporary directory.
+
+    Args:
+        script (str | Path): The script to run.
+        timeout (float): Seconds before the script is killed.
+        python (str): The interpreter to use.
+        interpreter_args (list[str]): Arguments placed between the interpreter
+            and the script, e.g. ['-X', 'importtime'] or the path of a
+            bootstrap script that runs the tutorial itself.
+        stdin_data (str | None): Text fed to the script's stdin. When None,
+            stdin is /dev/null, so scripts calling input() fail fast
+            with EOFError instead of hanging.
+        keep_workdir (bool): Leave the temporary directory behind.
+        env (dict | None): Extra environment variables.
+
+    Returns:
+        ScriptResult: Exit status, timings and captured output.
+    """
+    script = Path(script).resolve()
+    workdir = tempfile.mkdtemp(prefix=script.parent.name + "-")
+    command = [python, *interpreter_args, str(script)]
+    timed_out = False
+
+    # CPU time of a child is only known once it has been reaped, so we take
+    # the difference of RUSAGE_CHILDREN around the run. This is exact as long
+    # as the calling process runs one script at a time (true for pool workers).
+    cpu_before = _children_cpu_time()
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(
+            command,
+            cwd=workdir,
+            env=script_env(env),
+            input=stdin_data,
+            stdin=subprocess.DEVNULL if stdin_data is None else None,
+            capture_output=True,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+            timeout=timeout,
+        )
+        returncode, stdout, stderr = completed.returncode, completed.stdout, completed.stderr
+    except subprocess.TimeoutExpired as e:
+        timed_out = True
+        returncode = -9
+        stdout = _as_text(e.stdout)
+        stderr = _as_text(e.stderr)
+    wall_time = time.perf_counter() - start
+    cpu_time = _children_cpu_time() - cpu_before
+
+    if not keep_workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return ScriptResult(
+        script=relative_name(script),
+        returncode=returncode,
+        wall_time=wall_time,
+        cpu_time=cpu_time,
+        stdout=stdout,
+        stderr=stderr,
+        timed_out=timed_out,
+    )
+
+
+def _as_text(data):
+    if data is None:
+        return ""
+    if isinstance(data, bytes):
+        return data.decode("utf-8", errors="replace")
+    return data
+
+
+def run_all(scripts, jobs=None, **run_kwargs):
+    """
+    Runs many scripts in a process pool.
+
+    Args:
+        scripts (list[Path]): The scripts to run.
+        jobs (int | None): Number of worker processes (default: CPU count).
+        **run_kwargs: Passed through to run_script().
+
+    Returns:
+        list[ScriptResult]: One result per script, in the order given.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        return [run_script(s, **run_kwargs) for s in scripts]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run_script, s, **run_kwargs) for s in scripts]
+        return [f.result() for f in futures]
+
+
+def format_report(results, elapsed):
+    """Builds the plain-text table printed at the end of a run."""
+    width = max([len(r.script) for r in results] + [6])
+    lines = [f"{'status':<10} {'wall(s)':>8} {'cpu(s)':>8}  script", "-" * (30 + width)]
+    for r in results:
+        lines.append(f"{r.status:<10} {r.wall_time:>8.3f} {r.cpu_time:>8.3f}  {r.script}")
+    failed = sum(not r.ok for r in results)
+    lines.append("-" * (30 + width))
+    lines.append(
+        f"{len(results)} scripts, {failed} failed | "
+        f"elapsed {elapsed:.2f}s, "
+        f"sum of wall {sum(r.wall_time for r in results):.2f}s, "
+        f"sum of cpu {sum(r.cpu_time for r in results):.2f}s"
+    )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Python/ tutorial scripts as a parallel smoke suite.")
+    parser.add_argument("paths", nargs="*", help="only run scripts below these paths (relative to Python/)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-script timeout in seconds")
+    parser.add_argument("--lazy-imports", action="store_true",
+                        help="run scripts through lazy_imports.py, with its default lazy list unless --lazy-modules is given")
+    parser.add_argument("--lazy-modules", metavar="MODULES",
+                        help="with --lazy-imports: a comma-separated module list to make lazy, or '*'")
+    parser.add_argument("--batched-output", action="store_true",
+                        help="run scripts through batched_output.py: stdout and stderr go out in large ordered blocks")
+    parser.add_argument("--keep-workdirs", action="store_true", help="do not delete the per-script temp directories")
+    parser.add_argument("--json", metavar="FILE", help="write the full results (including output) to FILE")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print stderr of failing scripts")
+    args = parser.parse_args(argv)
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    run_kwargs = {"timeout": args.timeout, "keep_workdir": args.keep_workdirs}
+    # Bootstraps chain: each one runs the next path on the command line.
+    bootstraps = []
+    if args.batched_output:
+        bootstraps.append(str(TOOLS_DIR / "batched_output.py"))
+    if args.lazy_modules is not None and not args.lazy_imports:
+        parser.error("--lazy-modules requires --lazy-imports")
+    if args.lazy_imports:
+        bootstraps.append(str(TOOLS_DIR / "lazy_imports.py"))
+        if args.lazy_modules:
+            run_kwargs["env"] = {"LAZY_IMPORTS": args.lazy_modules}
+    if bootstraps:
+        run_kwargs["interpreter_args"] = bootstraps
+
+    start = time.perf_counter()
+    results = run_all(scripts, jobs=args.jobs, **run_kwargs)
+    elapsed = time.perf_counter() - start
+
+    print(format_report(results, elapsed))
+    if args.verbose:
+        for r in results:
+            if not r.ok:
+                print(f"\n--- {r.script} ({r.status}) ---\n{r.stderr.rstrip()}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": elapsed, "results": [asdict(r) for r in results]}, f, indent=4)
+
+    return 0 if all(r.ok for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
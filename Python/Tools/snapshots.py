@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+snapshots.py
+
+Checks the output of the tutorial scripts against stored "golden" copies and
+only re-runs the scripts that changed.
+
+Each script's stdout is stored as a golden file under Tools/snapshots/. On a
+check run the script is executed again and its output compared with the
+golden copy; any difference is reported as a mismatch with a diff.
+
+Results are cached in Tools/snapshots/index.json, keyed by a hash of
+  - the script's source,
+  - the interpreter version,
+  - the golden file and the masks in effect.
+A script is only executed again when its key changed, so a run after editing
+one or two scripts only executes those. Use --all to ignore the cache.
+
+Some lines change on every run (datetime.now(), id(), random numbers). Masks
+are regular expressions applied line by line before comparing: if a pattern
+has groups only the groups are replaced by <MASKED>, otherwise the whole
+match is. DEFAULT_MASKS apply to every script; snapshot_masks.json adds masks
+per script. Scripts also run with PYTHONHASHSEED=0, which makes set ordering
+and hash() of strings repeatable.
+
+Usage:
+    python Tools/snapshots.py --update           # record golden files
+    python Tools/snapshots.py                    # check; re-runs changed scripts only
+    python Tools/snapshots.py Modules --all --diff
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+from script_runner import DEFAULT_TIMEOUT, TOOLS_DIR, discover_scripts, relative_name, run_all
+
+DEFAULT_SNAPSHOT_DIR = TOOLS_DIR / "snapshots"
+DEFAULT_MASKS_FILE = TOOLS_DIR / "snapshot_masks.json"
+MASK = "<MASKED>"
+
+DEFAULT_MASKS = (
+    # 2024-05-01 12:30:45.123456, 2024-05-01T12:30:45+00:00, ...
+    r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:[+-]\d{2}:?\d{2}|Z)?",
+    # datetime.datetime(2024, 5, 1, 12, 30, 45, 123456)
+    r"datetime\.datetime\([^)]*\)",
+    # <object at 0x7f3a2c1b9e50>
+    r"0x[0-9a-fA-F]{8,}",
+)
+
+SCRIPT_ENV = {"PYTHONHASHSEED": "0"}
+
+
+def load_masks(path=DEFAULT_MASKS_FILE):
+    """Reads the per-script masks: {script: [pattern, ...]}."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compile_masks(patterns):
+    return [re.compile(p) for p in patterns]
+
+
+def apply_masks(text, masks):
+    """Replaces the non-deterministic parts of `text` with <MASKED>."""
+
+    def replace(match):
+        if not match.re.groups:
+            return MASK
+        # Keep the text around the groups, mask only the groups themselves.
+        value, offset = match.group(0), match.start(0)
+        for i in range(match.re.groups, 0, -1):
+            if match.start(i) != -1:
+                start, end = match.start(i) - offset, match.end(i) - offset
+                value = value[:start] + MASK + value[end:]
+        return value
+
+    lines = []
+    for line in text.splitlines(keepends=True):
+        for mask in masks:
+            line = mask.sub(replace, line)
+        lines.append(line)
+    return "".join(lines)
+
+
+def golden_path(snapshot_dir, name):
+    return Path(snapshot_dir) / (name + ".out")
+
+
+def cache_key(script, golden, patterns):
+    """Hashes everything a cached result depends on."""
+    digest = hashlib.sha256()
+    digest.update(Path(script).read_bytes())
+    digest.update(b"\0" + sys.version.encode())
+    digest.update(b"\0" + json.dumps(patterns).encode())
+    digest.update(b"\0" + (golden.read_bytes() if golden.exists() else b"<no golden>"))
+    return digest.hexdigest()
+
+
+def load_index(snapshot_dir):
+    try:
+        with open(Path(snapshot_dir) / "index.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_index(snapshot_dir, index):
+    Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+    with open(Path(snapshot_dir) / "index.json", "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=4, sort_keys=True)
+
+
+def check(scripts, snapshot_dir=DEFAULT_SNAPSHOT_DIR, masks_file=DEFAULT_MASKS_FILE, extra_masks=(),
+          update=False, run_everything=False, jobs=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Runs the scripts whose cache key changed and compares them with their golden files.
+
+    Args:
+        scripts (list[Path]): The scripts to check.
+        snapshot_dir (Path): Where golden files and index.json live.
+        masks_file (Path): JSON file with per-script masks.
+        extra_masks (list[str]): Additional masks for every script.
+        update (bool): Write the (masked) output as the new golden file.
+        run_everything (bool): Ignore the cache.
+        jobs (int | None): Worker processes for script_runner.run_all().
+        timeout (float): Per-script timeout.
+
+    Returns:
+        list[dict]: One entry per script with 'script', 'status' ('match',
+        'MISMATCH', 'NO GOLDEN' or 'updated'), 'cached', 'returncode' and,
+        for fresh mismatches, 'diff'.
+    """
+    per_script = load_masks(masks_file)
+    index = load_index(snapshot_dir)
+
+    patterns, keys, to_run = {}, {}, []
+    for script in scripts:
+        name = relative_name(script)
+        patterns[name] = [*DEFAULT_MASKS, *extra_masks, *per_script.get(name, [])]
+        keys[name] = cache_key(script, golden_path(snapshot_dir, name), patterns[name])
+        if update or run_everything or index.get(name, {}).get("key") != keys[name]:
+            to_run.append(script)
+
+    fresh = {r.script: r for r in run_all(to_run, jobs=jobs, timeout=timeout, env=SCRIPT_ENV)} if to_run else {}
+
+    report = []
+    for script in scripts:
+        name = relative_name(script)
+        if name not in fresh:
+            report.append({"script": name, "cached": True, **index[name]})
+            continue
+
+        result = fresh[name]
+        output = apply_masks(result.stdout, compile_masks(patterns[name]))
+        golden = golden_path(snapshot_dir, name)
+        entry = {"script": name, "cached": False, "returncode": result.returncode}
+        if update:
+            golden.parent.mkdir(parents=True, exist_ok=True)
+            golden.write_text(output, encoding="utf-8")
+            entry["status"] = "updated"
+        elif not golden.exists():
+            entry["status"] = "NO GOLDEN"
+        else:
+            expected = golden.read_text(encoding="utf-8")
+            if expected == output:
+                entry["status"] = "match"
+            else:
+                entry["status"] = "MISMATCH"
+                entry["diff"] = "".join(difflib.unified_diff(
+                    expected.splitlines(keepends=True), output.splitlines(keepends=True),
+                    fromfile=f"golden/{name}", tofile=f"current/{name}"))
+        report.append(entry)
+
+        # Re-hash: writing a golden file changes the key. A golden that was
+        # just written is a match from now on.
+        status = "match" if entry["status"] == "updated" else entry["status"]
+        index[name] = {"key": cache_key(script, golden, patterns[name]),
+                       "status": status, "returncode": result.returncode}
+
+    save_index(snapshot_dir, index)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare tutorial script output with golden snapshots.")
+    parser.add_argument("paths", nargs="*", help="only check scripts below these paths (relative to Python/)")
+    parser.add_argument("--update", action="store_true", help="run the scripts and store their output as golden files")
+    parser.add_argument("--all", action="store_true", help="re-run every script, ignoring the cache")
+    parser.add_argument("--diff", action="store_true", help="print a diff for every mismatch")
+    parser.add_argument("--dir", default=str(DEFAULT_SNAPSHOT_DIR), help="snapshot directory (default: Tools/snapshots)")
+    parser.add_argument("--masks", default=str(DEFAULT_MASKS_FILE), help="per-script masks file")
+    parser.add_argument("--mask", action="append", default=[], metavar="REGEX", help="extra mask for every script")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="per-script timeout in seconds")
+    args = parser.parse_args(argv)
+
+    scripts = discover_scripts(args.paths)
+    if not scripts:
+        print("No scripts found.")
+        return 1
+
+    report = check(scripts, args.dir, args.masks, args.mask, args.update, args.all, args.jobs, args.timeout)
+    for entry in report:
+        source = "cached" if entry["cached"] else "ran"
+        print(f"{entry['status']:<10} {source:<7} {entry['script']}")
+        if args.diff and entry.get("diff"):
+            print(entry["diff"])
+
+    ran = sum(not e["cached"] for e in report)
+    bad = [e for e in report if e["status"] in ("MISMATCH", "NO GOLDEN")]
+    print(f"\n{len(report)} scripts, {ran} executed, {len(report) - ran} from cache, {len(bad)} not matching.")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
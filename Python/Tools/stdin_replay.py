@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+stdin_replay.py
+
+Runs a script that reads from input() with recorded answers instead of a
+person at the keyboard, many answer sets at a time, and reports which branch
+each set took.
+
+An answer set is the list of lines typed in, one per input() call. Sets are
+read from a JSON Lines file (one JSON list of strings per line) or generated
+at random with --generate, which makes it easy to try thousands of
+combinations.
+
+Each set is replayed in a worker process: the script is compiled once per
+worker and executed with sys.stdin reading the answers and sys.stdout
+captured. While it runs, a trace function limited to the script's own frames
+records every exception raised in it with its line number, so the outcome of
+a run reads like
+
+    ValueError@66 (price_float = float(price_str)) -> NameError@85 (total_cost = ...) -> ok
+
+Sets that produce the same sequence took the same branch and are grouped
+together in the report, with one example each.
+
+Usage:
+    python Tools/stdin_replay.py Tutorials/User-Input/source.py Tools/user_input_answers.jsonl
+    python Tools/stdin_replay.py Tutorials/User-Input/source.py --generate 5000 --seed 1
+    python Tools/stdin_replay.py Tutorials/Loops/While-Loops/source.py --generate 200 --answers 4
+"""
+
+import argparse
+import ast
+import builtins
+import io
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from script_runner import PYTHON_ROOT, relative_name
+
+# Values --generate picks answers from: valid and invalid ints and floats,
+# blanks, text and the odd corner case.
+FUZZ_VALUES = ("", " ", "0", "1", "42", "-7", " 12 ", "3.5", "-0.25", "1e3", "nan", "inf",
+               "1,000", "abc", "Ada", "12abc", "٣")
+
+DEFAULT_TIMEOUT = 5.0
+CHUNK_SIZE = 64
+
+
+class ReplayTimeout(BaseException):
+    """Raised inside a replay that ran longer than its timeout."""
+
+
+@dataclass
+class ReplayResult:
+    """The outcome of replaying one answer set."""
+    answers: list
+    events: list = field(default_factory=list)  # [(exception name, line)], in the order raised
+    outcome: str = "ok"  # 'ok', 'exit(N)', 'TIMEOUT' or the name of an uncaught exception
+    consumed: int = 0  # how many answers were read
+    stdout: str = ""
+
+    def branch(self, source_lines=None):
+        """A readable key for the path the run took; equal keys mean the same branch."""
+        steps = []
+        for name, line in self.events:
+            step = f"{name}@{line}"
+            if source_lines and 0 < line <= len(source_lines):
+                source = source_lines[line - 1].strip()
+                if len(source) > 40:
+                    source = source[:37] + "..."
+                step += f" ({source})"
+            steps.append(step)
+        return " -> ".join(steps + [self.outcome])
+
+
+def count_input_calls(source):
+    """Counts the input() calls in a script's source; the default length of a generated set."""
+    return sum(
+        isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "input"
+        for node in ast.walk(ast.parse(source))
+    )
+
+
+def load_answer_sets(path):
+    """Reads answer sets from a JSON Lines file; blank lines and '#' comments are skipped."""
+    sets = []
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            answers = json.loads(line)
+            if not isinstance(answers, list) or not all(isinstance(a, str) for a in answers):
+                raise ValueError(f"{path}:{number}: expected a JSON list of strings")
+            sets.append(answers)
+    return sets
+
+
+def generate_answer_sets(count, length, seed=None, values=FUZZ_VALUES):
+    """Returns `count` random answer sets of `length` answers each."""
+    rng = random.Random(seed)
+    return [[rng.choice(values) for _ in range(length)] for _ in range(count)]
+
+
+# --- Worker side ---
+
+_worker = {}
+
+
+def _init_worker(script, work_dir):
+    with open(script, "rb") as f:
+        _worker["code"] = compile(f.read(), script, "exec")
+    _worker["script"] = script
+    sys.argv[:] = [script]
+    sys.path[0] = os.path.dirname(script)
+    # Scripts that write files do so in a private directory, inside the
+    # parent's `work_dir`, which the parent removes when the pool is done.
+    os.chdir(tempfile.mkdtemp(prefix="worker-", dir=work_dir))
+
+
+def _on_timeout(signum, frame):
+    raise ReplayTimeout()
+
+
+def replay(code, script, answers, timeout=DEFAULT_TIMEOUT):
+    """
+    Runs compiled `code` once, in this process, with `answers` as its stdin.
+
+    Args:
+        code (code): The compiled script.
+        script (str): The script's file name, used to pick its frames.
+        answers (list[str]): One line per input() call.
+        timeout (float): Seconds before the run is interrupted (Unix only).
+
+    Returns:
+        ReplayResult: The exceptions raised in the script and how it ended.
+    """
+    result = ReplayResult(answers=list(answers))
+    stdin = io.StringIO("".join(answer + "\n" for answer in answers))
+    stdout = io.StringIO()
+
+    def trace_line(frame, event, arg):
+        if event == "exception":
+            result.events.append((arg[0].__name__, frame.f_lineno))
+        return trace_line
+
+    def trace_call(frame, event, arg):
+        return trace_line if frame.f_code.co_filename == script else None
+
+    globals_ = {"__name__": "__main__", "__file__": script, "__builtins__": builtins}
+    saved = sys.stdin, sys.stdout
+    sys.stdin, sys.stdout = stdin, stdout
+    use_timer = hasattr(signal, "setitimer")
+    if use_timer:
+        previous = signal.signal(signal.SIGALRM, _on_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    sys.settrace(trace_call)
+    try:
+        exec(code, globals_)
+    except SystemExit as e:
+        result.outcome = f"exit({e.code})" if e.code not in (None, 0) else "ok"
+    except ReplayTimeout:
+        result.outcome = "TIMEOUT"
+    except BaseException as e:
+        result.outcome = type(e).__name__
+    finally:
+        sys.settrace(None)
+        if use_timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+        sys.stdin, sys.stdout = saved
+
+    # Answers left unread are still in the buffer, one per line.
+    result.consumed = len(answers) - stdin.read().count("\n")
+    result.stdout = stdout.getvalue()
+    return result
+
+
+def _replay_chunk(answer_sets, timeout):
+    return [replay(_worker["code"], _worker["script"], answers, timeout) for answers in answer_sets]
+
+
+def replay_all(script, answer_sets, jobs=None, timeout=DEFAULT_TIMEOUT, chunk_size=CHUNK_SIZE):
+    """
+    Replays many answer sets against `script` in a process pool.
+
+    Sets are sent to the workers in chunks, so the cost of a task is spread
+    over many replays and each worker compiles the script only once.
+
+    Returns:
+        list[ReplayResult]: One result per answer set, in the order given.
+    """
+    script = os.path.abspath(script)
+    jobs = jobs or os.cpu_count() or 1
+    chunks = [answer_sets[i:i + chunk_size] for i in range(0, len(answer_sets), chunk_size)]
+    with tempfile.TemporaryDirectory(prefix="stdin-replay-") as work_dir, \
+            ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(script, work_dir)) as pool:
+        futures = [pool.submit(_replay_chunk, chunk, timeout) for chunk in chunks]
+        return [result for future in futures for result in future.result()]
+
+
+def group_by_branch(results, source_lines=None):
+    """Returns [(branch, [ReplayResult, ...])], the most common branch first."""
+    groups = {}
+    for result in results:
+        groups.setdefault(result.branch(source_lines), []).append(result)
+    return sorted(groups.items(), key=lambda item: len(item[1]), reverse=True)
+
+
+def format_report(groups, total, elapsed):
+    lines = []
+    for branch, results in groups:
+        example = results[0]
+        lines.append(f"{len(results):>7}  {branch}")
+        lines.append(f"{'':>7}  e.g. {json.dumps(example.answers[:example.consumed], ensure_ascii=False)}")
+    lines.append("")
+    lines.append(f"{total} answer sets, {len(groups)} branches, {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} sets/s)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay recorded stdin answers against a script that calls input().")
+    parser.add_argument("script", help="the script to run, e.g. Tutorials/User-Input/source.py")
+    parser.add_argument("answers", nargs="?", help="JSON Lines file with one list of answers per line")
+    parser.add_argument("--generate", type=int, metavar="N", help="replay N random answer sets instead of (or as well as) a file")
+    parser.add_argument("--answers", dest="length", type=int, default=None,
+                        help="answers per generated set (default: the number of input() calls in the script)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for --generate")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per replay (default: 5)")
+    parser.add_argument("--json", metavar="FILE", help="write every result, including output, to FILE as JSON Lines")
+    args = parser.parse_args(argv)
+
+    script = Path(args.script)
+    if not script.is_absolute() and not script.exists():
+        script = PYTHON_ROOT / script
+    source = script.read_text(encoding="utf-8")
+
+    answer_sets = load_answer_sets(args.answers) if args.answers else []
+    if args.generate:
+        length = args.length if args.length is not None else count_input_calls(source)
+        answer_sets += generate_answer_sets(args.generate, length, args.seed)
+    if not answer_sets:
+        parser.error("give an answers file, --generate N, or both")
+
+    start = time.perf_counter()
+    results = replay_all(script, answer_sets, jobs=args.jobs, timeout=args.timeout)
+    elapsed = time.perf_counter() - start
+
+    print(f"--- {relative_name(script)} ---")
+    print(format_report(group_by_branch(results, source.splitlines()), len(results), elapsed))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps({**asdict(result), "branch": result.branch()}, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())